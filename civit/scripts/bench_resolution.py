@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+"""
+Benchmark the Civitai metadata resolution path against a local fake API.
+
+Every URL goes through validate_url, normalize_url, extract_model_components,
+get_model_metadata and get_model_info, as it would before a download starts.
+The fake API (tests/test_utils/fake_civitai_server.py) serves canned JSON
+from tests/mock_data, can add latency and answers a share of calls with 429.
+It runs in a child process, so the CPU figures are the client's alone.
+
+Usage: python -m scripts.bench_resolution --urls 10000 --concurrency 8 32 64 \\
+           --latency 0.05 --throttle 0.02
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from src.civit.download_handler import get_model_metadata
+from src.civit.filename_generator import extract_model_components
+from src.civit.model_info import get_model_info
+from src.civit.url_validator import normalize_url, validate_url
+
+
+@dataclass
+class UrlResult:
+    """Outcome of resolving one URL."""
+
+    latency: float
+    retries: int
+    ok: bool
+
+
+def make_urls(count: int, seed: int = 0) -> List[str]:
+    """Model page URLs in the shapes users paste, each with a version id."""
+    rng = random.Random(seed)
+    urls = []
+    for i in range(count):
+        model_id, version_id = 100000 + i, 1000000 + i
+        shape = rng.randrange(3)
+        if shape == 0:
+            urls.append(
+                f"https://civitai.com/models/{model_id}?modelVersionId={version_id}"
+            )
+        elif shape == 1:
+            urls.append(
+                f"https://www.civitai.com/models/{model_id}/model-{i}"
+                f"?modelVersionId={version_id}"
+            )
+        else:
+            urls.append(
+                f"https://civitai.com/models/{model_id}/?modelVersionId={version_id}"
+            )
+    return urls
+
+
+def with_retries(
+    call: Callable[[], Any], retries: int, backoff: float
+) -> Tuple[Any, int]:
+    """
+    Repeat a call that returned nothing, with jittered exponential backoff.
+
+    The resolution functions log and return an empty result on HTTP errors
+    such as 429, so an empty result is what a caller would retry on.
+
+    Returns:
+        (last result, number of retries made)
+    """
+    for attempt in range(retries + 1):
+        result = call()
+        if result or attempt == retries:
+            return result, attempt
+        time.sleep(backoff * 2**attempt * (0.5 + random.random()))
+    return result, retries
+
+
+def resolve_url(url: str, base_url: str, retries: int, backoff: float) -> UrlResult:
+    """Run one URL through the whole resolution path."""
+    started = time.perf_counter()
+    if not validate_url(url) or not normalize_url(url):
+        return UrlResult(time.perf_counter() - started, 0, False)
+    components = extract_model_components(url)
+    args = SimpleNamespace(cache_url=base_url, debug=False)
+    metadata, metadata_retries = with_retries(
+        lambda: get_model_metadata(url, None, args), retries, backoff
+    )
+    info, info_retries = with_retries(
+        lambda: get_model_info(components["model_id"], base_url=base_url),
+        retries,
+        backoff,
+    )
+    return UrlResult(
+        time.perf_counter() - started,
+        metadata_retries + info_retries,
+        bool(metadata and info),
+    )
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of unsorted values."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _serve(conn, latency: float, throttle: float, seed: int) -> None:
+    """Child process: run the fake API until told to stop, then report."""
+    from tests.test_utils.fake_civitai_server import FakeCivitai
+
+    with FakeCivitai(
+        {}, canned=True, latency=latency, throttle=throttle, seed=seed
+    ) as fake:
+        conn.send(fake.url)
+        conn.recv()
+        total = sum(fake.requests.values())
+        conn.send({"requests": total, "throttled": fake.throttled})
+
+
+class FakeApiProcess:
+    """Fake Civitai API in a child process; use as a context manager."""
+
+    def __init__(self, latency: float = 0.0, throttle: float = 0.0, seed: int = 0):
+        context = multiprocessing.get_context("spawn")
+        self._conn, child = context.Pipe()
+        self._process = context.Process(
+            target=_serve, args=(child, latency, throttle, seed), daemon=True
+        )
+        self.url = ""
+        self.stats: Dict[str, int] = {}
+
+    def __enter__(self) -> "FakeApiProcess":
+        self._process.start()
+        self.url = self._conn.recv()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._conn.send("stop")
+        self.stats = self._conn.recv()
+        self._process.join(5)
+
+
+def run_benchmark(
+    urls: Sequence[str],
+    concurrency: int,
+    latency: float = 0.0,
+    throttle: float = 0.0,
+    retries: int = 5,
+    backoff: float = 0.1,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Resolve every URL against a fresh fake API at one concurrency level.
+
+    Returns:
+        Report with throughput, latency percentiles, CPU cost and retries
+    """
+    with FakeApiProcess(latency, throttle, seed) as api:
+        cpu_started = time.process_time()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(
+                pool.map(lambda url: resolve_url(url, api.url, retries, backoff), urls)
+            )
+        wall = time.perf_counter() - started
+        cpu = time.process_time() - cpu_started
+
+    latencies = [result.latency for result in results]
+    return {
+        "urls": len(urls),
+        "concurrency": concurrency,
+        "api_latency": latency,
+        "throttle": throttle,
+        "wall_s": round(wall, 3),
+        "urls_per_s": round(len(urls) / wall, 1),
+        "requests_per_s": round(api.stats["requests"] / wall, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "cpu_ms_per_url": round(cpu / len(urls) * 1000, 3),
+        "requests": api.stats["requests"],
+        "throttled": api.stats["throttled"],
+        "retries": sum(result.retries for result in results),
+        "failed": sum(not result.ok for result in results),
+    }
+
+
+COLUMNS = (
+    "concurrency",
+    "urls_per_s",
+    "requests_per_s",
+    "p50_ms",
+    "p99_ms",
+    "cpu_ms_per_url",
+    "throttled",
+    "retries",
+    "failed",
+)
+
+
+def format_table(reports: List[Dict[str, Any]]) -> str:
+    """Render reports as an aligned text table, one row per concurrency."""
+    rows = [COLUMNS] + [tuple(str(report[c]) for c in COLUMNS) for report in reports]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(COLUMNS))]
+    return "\n".join(
+        "  ".join(cell.rjust(width) for cell, width in zip(row, widths))
+        for row in rows
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--urls", type=int, default=1000, help="URLs to resolve")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[1, 8, 32],
+        help="Worker counts to compare (default: 1 8 32)",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds added per API call"
+    )
+    parser.add_argument(
+        "--throttle", type=float, default=0.0, help="Share of API calls given 429"
+    )
+    parser.add_argument("--retries", type=int, default=5, help="Retries per call")
+    parser.add_argument(
+        "--backoff", type=float, default=0.1, help="First retry delay in seconds"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print JSON lines")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show logs")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        # Throttled calls log an error each; that would swamp the report
+        logging.disable(logging.CRITICAL)
+
+    urls = make_urls(args.urls, args.seed)
+    reports = []
+    for concurrency in args.concurrency:
+        report = run_benchmark(
+            urls,
+            concurrency,
+            args.latency,
+            args.throttle,
+            args.retries,
+            args.backoff,
+            args.seed,
+        )
+        reports.append(report)
+        if args.json:
+            print(json.dumps(report), flush=True)
+
+    if not args.json:
+        print(
+            f"{args.urls} URLs, API latency {args.latency * 1000:g} ms, "
+            f"{args.throttle:.0%} throttled"
+        )
+        print(format_table(reports))
+    return 0 if all(report["failed"] == 0 for report in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
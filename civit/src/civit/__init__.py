@@ -18,41 +18,33 @@ from .exceptions import (
     DownloadError,
     AuthenticationError,
     APIError,
+    FileValidationError,
 )
 
-# Create a simple facade for common functions
-try:
-    from .download_handler import download_file, extract_filename_from_response
-except ImportError:
-    # If tqdm is not available, provide a stub for testing
-    def download_file(*args, **kwargs):
-        raise NotImplementedError("download_file requires tqdm to be installed")
+# Facade functions are resolved on first use so that importing the package
+# (e.g. for `civit --help`) does not pull in requests and tqdm
+_LAZY_EXPORTS = {
+    "download_file": "download_handler",
+    "extract_filename_from_response": "download_handler",
+    "extract_model_components": "filename_generator",
+    "generate_custom_filename": "filename_generator",
+    "should_use_custom_filename": "filename_generator",
+}
 
-    def extract_filename_from_response(*args, **kwargs):
-        raise NotImplementedError(
-            "extract_filename_from_response requires request dependencies"
-        )
 
+def __getattr__(name):
+    """Import facade functions lazily (PEP 562)."""
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-try:
-    from .filename_generator import (
-        extract_model_components,
-        generate_custom_filename,
-        should_use_custom_filename,
-    )
-except ImportError:
-    # Provide stubs if module not available
-    def extract_model_components(*args, **kwargs):
-        raise NotImplementedError(
-            "extract_model_components implementation not available"
-        )
+    from importlib import import_module
 
-    def generate_custom_filename(*args, **kwargs):
-        raise NotImplementedError(
-            "generate_custom_filename implementation not available"
-        )
+    try:
+        value = getattr(import_module(f".{_LAZY_EXPORTS[name]}", __name__), name)
+    except ImportError:
+        # If request dependencies are not available, provide a stub for testing
+        def value(*args, **kwargs):
+            raise NotImplementedError(f"{name} requires request dependencies")
 
-    def should_use_custom_filename(*args, **kwargs):
-        raise NotImplementedError(
-            "should_use_custom_filename implementation not available"
-        )
+    globals()[name] = value
+    return value
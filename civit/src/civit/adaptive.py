@@ -0,0 +1,267 @@
+# FILE: src/civit/adaptive.py
+"""
+# PURPOSE: AIMD controller for how many transfers run at once.
+
+## INTERFACES:
+    AdaptiveConcurrency(initial: int = 2, minimum: int = 1, maximum: int = 8, ...)
+    AdaptiveConcurrency.slot() -> ContextManager[Slot]
+    AdaptiveConcurrency.report_status(status: int) -> None
+    AdaptiveConcurrency.report_latency(seconds: float) -> None
+    AdaptiveConcurrency.evaluate(now: Optional[float] = None) -> Optional[Dict]
+    AdaptiveConcurrency.start() / close()
+    is_congestion(status: int) -> bool
+
+## DEPENDENCIES:
+    - threading: Slot gate and the periodic evaluation thread
+    - progress: Decisions are emitted to the telemetry stream
+"""
+
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from .progress import progress
+
+DEFAULT_WINDOW = 2.0
+# Aggregate throughput must rise by this share to justify another connection
+THROUGHPUT_GAIN = 0.05
+# Time to first byte this many times the best seen counts as congestion
+LATENCY_FACTOR = 2.0
+# ...but only once it is also this much slower in absolute terms
+LATENCY_SLACK = 0.1
+# Per-connection throughput falling below this share, with no aggregate
+# gain, means connections are splitting a throttled pipe
+PER_CONNECTION_DROP = 0.5
+
+
+def is_congestion(status: int) -> bool:
+    """True for responses that mean the server wants fewer connections."""
+    return status == 429 or status >= 500
+
+
+class Slot:
+    """One running transfer; its worker only ever adds to ``done``."""
+
+    __slots__ = ("done",)
+
+    def __init__(self):
+        self.done = 0
+
+
+class AdaptiveConcurrency:
+    """
+    PURPOSE: Additive-increase / multiplicative-decrease transfer limit.
+
+    Every window the controller compares aggregate throughput with the
+    previous window. While adding a connection keeps raising it, and all
+    slots are in use, the limit grows by ``increase``. A 429 or 5xx,
+    time to first byte well above the best seen, or per-connection
+    throughput falling without any aggregate gain cuts the limit by
+    ``decrease``. Running transfers are never interrupted; a lower limit
+    only holds back the next ones.
+    """
+
+    def __init__(
+        self,
+        initial: int = 2,
+        minimum: int = 1,
+        maximum: int = 8,
+        increase: int = 1,
+        decrease: float = 0.5,
+        window: float = DEFAULT_WINDOW,
+        clock: Callable[[], float] = time.monotonic,
+        emit: Optional[Callable[..., None]] = None,
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.increase = increase
+        self.decrease = decrease
+        self.window = window
+        self.clock = clock
+        self.emit = emit or progress.emit
+        self.decisions: Deque[Dict[str, Any]] = deque(maxlen=100)
+
+        self._cond = threading.Condition()
+        self._active: List[Slot] = []
+        self._waiting = 0
+        self._closed_bytes = 0
+        self._last_total = 0
+        self._window_start = clock()
+        self._last_throughput: Optional[float] = None
+        self._last_per_connection: Optional[float] = None
+        self._saturated = False
+        self._latencies: List[float] = []
+        self._best_latency: Optional[float] = None
+        self._cut_this_window = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "AdaptiveConcurrency":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    @property
+    def active(self) -> int:
+        """Transfers currently holding a slot."""
+        return len(self._active)
+
+    def start(self) -> "AdaptiveConcurrency":
+        """Re-evaluate the limit every window on a background thread."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="adaptive-concurrency", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """Stop the evaluation thread."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.window):
+            self.evaluate()
+
+    @contextmanager
+    def slot(self) -> Iterator[Slot]:
+        """Wait until the limit allows another transfer, then hold a slot."""
+        slot = Slot()
+        with self._cond:
+            self._waiting += 1
+            while len(self._active) >= self.limit:
+                self._saturated = True
+                self._cond.wait()
+            self._waiting -= 1
+            self._active.append(slot)
+            if len(self._active) >= self.limit:
+                self._saturated = True
+        try:
+            yield slot
+        finally:
+            with self._cond:
+                self._active.remove(slot)
+                self._closed_bytes += slot.done
+                self._cond.notify_all()
+
+    def report_status(self, status: int) -> None:
+        """Record an HTTP status; congestion cuts the limit at once."""
+        if not is_congestion(status):
+            return
+        with self._cond:
+            if self._cut_this_window:
+                return
+            reason = "throttled" if status == 429 else "server_error"
+            self._set_limit(self._cut(), reason, status=status)
+
+    def report_latency(self, seconds: float) -> None:
+        """Record the time to first byte of a transfer."""
+        with self._cond:
+            self._latencies.append(seconds)
+            if self._best_latency is None or seconds < self._best_latency:
+                self._best_latency = seconds
+
+    def evaluate(self, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Close the current window and adjust the limit.
+
+        Args:
+            now: Clock reading; defaults to the controller's clock
+
+        Returns:
+            The decision if the limit changed, else None
+        """
+        now = self.clock() if now is None else now
+        with self._cond:
+            elapsed = now - self._window_start
+            if elapsed <= 0:
+                return None
+            total = self._closed_bytes + sum(slot.done for slot in self._active)
+            throughput = (total - self._last_total) / elapsed
+            connections = max(1, len(self._active))
+            per_connection = throughput / connections
+            latency = (
+                statistics.median(self._latencies) if self._latencies else None
+            )
+            previous = self._last_throughput
+            previous_per_connection = self._last_per_connection
+            saturated = self._saturated or self._waiting > 0
+            cut = self._cut_this_window
+
+            self._last_total = total
+            self._window_start = now
+            self._latencies = []
+            self._cut_this_window = False
+            self._saturated = len(self._active) >= self.limit
+            if not self._active and not throughput:
+                # Idle: nothing to learn, and no baseline to compare against
+                self._last_throughput = self._last_per_connection = None
+                return None
+            self._last_throughput = throughput
+            self._last_per_connection = per_connection
+
+            fields = {"throughput": round(throughput), "active": len(self._active)}
+            if cut:
+                return None
+            if (
+                latency is not None
+                and self._best_latency is not None
+                and latency > self._best_latency * LATENCY_FACTOR
+                and latency > self._best_latency + LATENCY_SLACK
+            ):
+                return self._set_limit(
+                    self._cut(), "latency", latency=round(latency, 3), **fields
+                )
+            if previous is None:
+                return None
+            gained = throughput > previous * (1 + THROUGHPUT_GAIN)
+            if (
+                previous_per_connection
+                and per_connection < previous_per_connection * PER_CONNECTION_DROP
+                and not gained
+            ):
+                return self._set_limit(self._cut(), "per_connection_drop", **fields)
+            if gained and saturated and self.limit < self.maximum:
+                return self._set_limit(
+                    min(self.maximum, self.limit + self.increase),
+                    "throughput_rising",
+                    **fields,
+                )
+            return None
+
+    def _cut(self) -> int:
+        return max(self.minimum, int(self.limit * self.decrease))
+
+    def _set_limit(self, limit: int, reason: str, **fields: Any) -> Optional[Dict]:
+        """Apply a new limit; the caller holds the condition lock."""
+        if reason != "throughput_rising":
+            self._cut_this_window = True
+        if limit == self.limit:
+            return None
+        decision = {"limit": limit, "previous": self.limit, "reason": reason, **fields}
+        self.limit = limit
+        self.decisions.append(decision)
+        self._cond.notify_all()
+        self.emit("concurrency", **decision)
+        return decision
+
+
+"""
+## KNOWN ERRORS: None
+
+## IMPROVEMENTS:
+- Transfer concurrency follows what the server and the link can sustain
+- Limit changes are visible in --progress=jsonl output
+
+## FUTURE TODOs:
+- Honour Retry-After when deciding how long to hold a lower limit
+"""
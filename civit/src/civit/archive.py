@@ -0,0 +1,405 @@
+# FILE: src/civit/archive.py
+"""
+# PURPOSE: Extract zip bundles while they download, or in one pass afterwards.
+
+## INTERFACES:
+    StreamingZipExtractor(dest_dir: str, prefix: Optional[str] = None)
+    StreamingZipExtractor.feed(chunk: bytes) -> None
+    StreamingZipExtractor.finish(archive_path: str) -> List[str]
+    StreamingZipExtractor.discard() -> None
+    extract_zip(archive_path: str, dest_dir: str, prefix: Optional[str] = None) -> List[str]
+    member_path(dest_dir: str, member: str, prefix: Optional[str] = None) -> str
+    is_zip_name(filename: str) -> bool
+
+## DEPENDENCIES:
+    - zlib: Raw deflate decompression of streamed members
+    - zipfile: Sequential fallback extraction from the finished file
+    - struct: Local file header parsing
+    - filename_generator: Sanitizing renamed members
+"""
+
+import logging
+import os
+import posixpath
+import shutil
+import struct
+import zipfile
+import zlib
+from typing import List, Optional
+
+from .filename_generator import sanitize_filename
+
+logger = logging.getLogger(__name__)
+
+LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+LOCAL_SIG = 0x04034B50
+CENTRAL_SIG = 0x02014B50
+END_SIG = 0x06054B50
+DESCRIPTOR_SIG = 0x08074B50
+ZIP64_EXTRA_ID = 0x0001
+
+FLAG_ENCRYPTED = 0x0001
+FLAG_DESCRIPTOR = 0x0008
+FLAG_UTF8 = 0x0800
+
+STORED = 0
+DEFLATED = 8
+
+COPY_SIZE = 1024 * 1024
+PART_SUFFIX = ".part"
+
+
+def is_zip_name(filename: str) -> bool:
+    """True if a download should be treated as a zip bundle."""
+    return filename.lower().endswith(".zip")
+
+
+def member_path(dest_dir: str, member: str, prefix: Optional[str] = None) -> str:
+    """
+    Map an archive member to its output path.
+
+    With a prefix (the custom-named archive stem) each file becomes
+    ``<prefix>_<member name>``, keeping the member's directories.
+
+    Args:
+        dest_dir: Directory to extract into
+        member: Member name as stored in the archive
+        prefix: Custom filename stem to apply, or None to keep the name
+
+    Returns:
+        Absolute output path inside dest_dir
+
+    Raises:
+        ValueError: If the member would land outside dest_dir
+    """
+    normalized = posixpath.normpath(member.replace("\\", "/"))
+    if normalized.startswith(("/", "../")) or normalized in ("..", "."):
+        raise ValueError(f"Unsafe path in archive: {member}")
+    directory, base = posixpath.split(normalized)
+    if prefix and base:
+        base = sanitize_filename(f"{prefix}_{base}")
+    root = os.path.abspath(dest_dir)
+    path = os.path.abspath(os.path.join(root, *directory.split("/"), base))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"Unsafe path in archive: {member}")
+    return path
+
+
+def _keep_existing(path: str) -> bool:
+    """True (and a warning) if a member would overwrite a file already there."""
+    if not os.path.exists(path):
+        return False
+    logger.warning(f"Not overwriting existing file: {path}")
+    return True
+
+
+def _place_member(path: str) -> bool:
+    """Move an extracted member's .part into place unless the name was taken."""
+    if _keep_existing(path):
+        os.remove(path + PART_SUFFIX)
+        return False
+    os.replace(path + PART_SUFFIX, path)
+    return True
+
+
+def extract_zip(
+    archive_path: str, dest_dir: str, prefix: Optional[str] = None
+) -> List[str]:
+    """
+    Extract every member of a zip file in archive order.
+
+    Members are read in the order they are stored, so the whole archive is
+    read sequentially exactly once. Like downloads, members never replace
+    files that already exist; those are skipped with a warning.
+
+    Args:
+        archive_path: Zip file on disk
+        dest_dir: Directory to extract into
+        prefix: Custom filename stem applied to members
+
+    Returns:
+        Paths of the extracted files
+
+    Raises:
+        zipfile.BadZipFile: If the archive is corrupt
+        ValueError: If a member would land outside dest_dir
+    """
+    extracted = []
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in sorted(archive.infolist(), key=lambda i: i.header_offset):
+            path = member_path(dest_dir, info.filename, prefix)
+            if info.is_dir():
+                os.makedirs(path, exist_ok=True)
+                continue
+            if _keep_existing(path):
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with archive.open(info) as source, open(path + PART_SUFFIX, "wb") as f:
+                shutil.copyfileobj(source, f, COPY_SIZE)
+            if _place_member(path):
+                extracted.append(path)
+    logger.info(f"Extracted {len(extracted)} files from {archive_path}")
+    return extracted
+
+
+class StreamingZipExtractor:
+    """
+    PURPOSE: Unpack zip members from the download stream via local file headers.
+
+    Stored and deflated members are written as their bytes arrive. Layouts
+    that cannot be streamed (encryption, stored members with trailing data
+    descriptors, other compression methods) switch the extractor off, and
+    finish() extracts from the written file in one sequential pass instead.
+    """
+
+    def __init__(self, dest_dir: str, prefix: Optional[str] = None):
+        self.dest_dir = dest_dir
+        self.prefix = prefix
+        self.extracted: List[str] = []
+        self.fallback_reason: Optional[str] = None
+        self.complete = False
+        self._buffer = bytearray()
+        self._state = "header"
+        self._member = None
+        self._file = None
+        self._path = ""
+        self._remaining: Optional[int] = None
+        self._decompressor = None
+        self._crc = 0
+        self._size = 0
+        self._expected_crc = 0
+        self._expected_size = 0
+        self._zip64 = False
+
+    @property
+    def streaming(self) -> bool:
+        """True while members are still being extracted from the stream."""
+        return self.fallback_reason is None and not self.complete
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        Consume the next downloaded bytes.
+
+        Args:
+            chunk: Bytes in archive order, starting from offset 0
+        """
+        if not self.streaming:
+            return
+        self._buffer += chunk
+        try:
+            while self.streaming and self._step():
+                pass
+        except (ValueError, zlib.error, OSError) as e:
+            self._fall_back(str(e))
+
+    def finish(self, archive_path: str) -> List[str]:
+        """
+        Complete extraction once the archive is fully on disk.
+
+        Args:
+            archive_path: The downloaded zip file
+
+        Returns:
+            Paths of the extracted files
+        """
+        if self.complete:
+            logger.info(
+                f"Extracted {len(self.extracted)} files while downloading "
+                f"{os.path.basename(archive_path)}"
+            )
+            return self.extracted
+        if self.fallback_reason is None:
+            self._fall_back("stream ended before the central directory")
+        logger.info(
+            f"Extracting {os.path.basename(archive_path)} from disk "
+            f"({self.fallback_reason})"
+        )
+        # Members streamed before the fallback are written again by the
+        # full pass, which would otherwise skip them as existing files
+        self.discard()
+        self.extracted = extract_zip(archive_path, self.dest_dir, self.prefix)
+        return self.extracted
+
+    def discard(self) -> None:
+        """Remove everything extracted so far, e.g. after a failed download."""
+        self._close_member(keep=False)
+        for path in self.extracted:
+            if os.path.exists(path):
+                os.remove(path)
+        self.extracted = []
+
+    def _fall_back(self, reason: str) -> None:
+        logger.debug(f"Streaming extraction stopped: {reason}")
+        self.fallback_reason = reason
+        self._close_member(keep=False)
+        self._buffer = bytearray()
+
+    def _step(self) -> bool:
+        """Advance the parser; False when more input is needed."""
+        if self._state == "header":
+            return self._read_header()
+        if self._state == "data":
+            return self._read_data()
+        return self._read_descriptor()
+
+    def _read_header(self) -> bool:
+        if len(self._buffer) < 4:
+            return False
+        (signature,) = struct.unpack_from("<I", self._buffer)
+        if signature in (CENTRAL_SIG, END_SIG):
+            self.complete = True
+            self._buffer = bytearray()
+            return False
+        if signature != LOCAL_SIG:
+            raise ValueError(f"unexpected signature {signature:#010x}")
+        if len(self._buffer) < LOCAL_HEADER.size:
+            return False
+        (
+            _,
+            _,
+            flags,
+            method,
+            _,
+            _,
+            crc,
+            compressed,
+            uncompressed,
+            name_length,
+            extra_length,
+        ) = LOCAL_HEADER.unpack_from(self._buffer)
+        end = LOCAL_HEADER.size + name_length + extra_length
+        if len(self._buffer) < end:
+            return False
+
+        name_end = LOCAL_HEADER.size + name_length
+        raw_name = bytes(self._buffer[LOCAL_HEADER.size : name_end])
+        extra = bytes(self._buffer[name_end:end])
+        del self._buffer[:end]
+        name = raw_name.decode("utf-8" if flags & FLAG_UTF8 else "cp437")
+
+        if flags & FLAG_ENCRYPTED:
+            raise ValueError(f"{name} is encrypted")
+        if method not in (STORED, DEFLATED):
+            raise ValueError(f"{name} uses compression method {method}")
+        has_descriptor = bool(flags & FLAG_DESCRIPTOR)
+        if has_descriptor and method == STORED:
+            raise ValueError(f"{name} is stored with a trailing data descriptor")
+
+        self._zip64 = False
+        if 0xFFFFFFFF in (compressed, uncompressed):
+            compressed, uncompressed = self._zip64_sizes(
+                extra, compressed, uncompressed
+            )
+
+        self._member = name
+        self._remaining = None if has_descriptor else compressed
+        self._expected_crc = crc
+        self._expected_size = uncompressed
+        self._decompressor = zlib.decompressobj(-15) if method == DEFLATED else None
+        self._crc = 0
+        self._size = 0
+        self._path = member_path(self.dest_dir, name, self.prefix)
+        if name.endswith("/"):
+            os.makedirs(self._path, exist_ok=True)
+            self._file = None
+        elif _keep_existing(self._path):
+            # Still decoded so the CRC check keeps the stream in sync
+            self._file = None
+        else:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            self._file = open(self._path + PART_SUFFIX, "wb")
+        self._state = "data"
+        return True
+
+    def _zip64_sizes(self, extra: bytes, compressed: int, uncompressed: int):
+        offset = 0
+        while offset + 4 <= len(extra):
+            header_id, size = struct.unpack_from("<HH", extra, offset)
+            if header_id == ZIP64_EXTRA_ID:
+                self._zip64 = True
+                values = list(struct.unpack_from(f"<{size // 8}Q", extra, offset + 4))
+                if uncompressed == 0xFFFFFFFF and values:
+                    uncompressed = values.pop(0)
+                if compressed == 0xFFFFFFFF and values:
+                    compressed = values.pop(0)
+                return compressed, uncompressed
+            offset += 4 + size
+        raise ValueError("zip64 sizes missing from local header")
+
+    def _read_data(self) -> bool:
+        if self._remaining is None:
+            data = bytes(self._buffer)
+            self._buffer = bytearray()
+        else:
+            data = bytes(self._buffer[: self._remaining])
+            del self._buffer[: len(data)]
+            self._remaining -= len(data)
+
+        if self._decompressor:
+            data = self._decompressor.decompress(data)
+        self._write(data)
+
+        if self._remaining is None:
+            if not self._decompressor.eof:
+                return False
+            # The deflate stream ended; whatever follows is the descriptor
+            self._buffer = bytearray(self._decompressor.unused_data) + self._buffer
+            self._state = "descriptor"
+            return True
+        if self._remaining:
+            return False
+        if self._decompressor:
+            self._write(self._decompressor.flush())
+        self._end_member(self._expected_crc, self._expected_size)
+        return True
+
+    def _read_descriptor(self) -> bool:
+        size_bytes = 8 if self._zip64 else 4
+        has_signature = (
+            len(self._buffer) >= 4
+            and struct.unpack_from("<I", self._buffer)[0] == DESCRIPTOR_SIG
+        )
+        start = 4 if has_signature else 0
+        length = start + 4 + 2 * size_bytes
+        if len(self._buffer) < max(length, 4):
+            return False
+        (crc,) = struct.unpack_from("<I", self._buffer, start)
+        del self._buffer[:length]
+        self._end_member(crc, self._size)
+        return True
+
+    def _write(self, data: bytes) -> None:
+        if data and self._file:
+            self._file.write(data)
+        self._crc = zlib.crc32(data, self._crc)
+        self._size += len(data)
+
+    def _end_member(self, crc: int, size: int) -> None:
+        if self._crc != crc or self._size != size:
+            raise ValueError(f"{self._member} failed its CRC check")
+        self._close_member(keep=True)
+        self._state = "header"
+
+    def _close_member(self, keep: bool) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        if keep:
+            if _place_member(self._path):
+                self.extracted.append(self._path)
+        elif os.path.exists(self._path + PART_SUFFIX):
+            os.remove(self._path + PART_SUFFIX)
+
+
+"""
+## KNOWN ERRORS: None
+
+## IMPROVEMENTS:
+- Members are written as they arrive, so the archive is never re-read
+- Non-streamable layouts fall back to a single sequential pass
+- Existing files are never overwritten, matching the downloader
+
+## FUTURE TODOs:
+- Stream 7z/tar bundles
+"""
@@ -0,0 +1,656 @@
+# FILE: src/civit/cache_server.py
+"""
+# PURPOSE: LAN read-through cache for Civitai model downloads (`civit serve-cache`).
+
+## INTERFACES:
+    CacheStore(root: str) -> CacheStore
+    CacheServer(address: Tuple[str, int], store: CacheStore, upstream: str = CIVITAI_BASE, ...)
+    parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]
+    serve_cache(argv: Optional[List[str]] = None) -> int
+
+## DEPENDENCIES:
+    - http.server: Threaded HTTP server
+    - requests: Upstream fetches
+    - os.sendfile: Zero-copy responses from the store
+    - redirect_cache: Per-version cache keys shared with the client
+"""
+
+import argparse
+import contextlib
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import requests
+
+from .redirect_cache import cache_key
+
+logger = logging.getLogger(__name__)
+
+CIVITAI_BASE = "https://civitai.com"
+DEFAULT_PORT = 8787
+DEFAULT_STORE = os.path.join(os.path.expanduser("~"), ".cache", "civit", "store")
+CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_PREFIX = "/api/download/"
+# Upstream headers passed on to clients
+RELAYED_HEADERS = ("content-type", "content-disposition")
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range ``Range: bytes=...`` header.
+
+    Args:
+        header: Range header value, or None
+        size: Size of the stored object
+
+    Returns:
+        Inclusive (start, end) byte positions, or None for the whole object
+
+    Raises:
+        ValueError: If the range cannot be satisfied
+    """
+    if not header:
+        return None
+    match = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", header)
+    if not match or match.groups() == ("", ""):
+        raise ValueError(f"Unsupported range: {header}")
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start >= size or start > end:
+        raise ValueError(f"Range {header} outside object of {size} bytes")
+    return start, end
+
+
+class CacheStore:
+    """
+    PURPOSE: Content-addressed object store plus an index of cached downloads.
+
+    Objects live under objects/<sha256[:2]>/<sha256>; the index maps a
+    download key (model version and file options) to the object and the
+    headers the client needs. Identical files requested through different
+    keys are stored once.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.tmp_dir = os.path.join(root, "tmp")
+        self.index_path = os.path.join(root, "index.json")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self._index = json.load(f)
+
+    def object_path(self, sha256: str) -> str:
+        """Path of a stored object by its SHA256."""
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Index entry for a key whose object is still on disk."""
+        with self._lock:
+            entry = self._index.get(key)
+        if entry and os.path.exists(self.object_path(entry["sha256"])):
+            return entry
+        return None
+
+    def new_temp(self):
+        """Open a temporary file in the store for an incoming object."""
+        return tempfile.NamedTemporaryFile(dir=self.tmp_dir, delete=False)
+
+    def commit(
+        self,
+        key: str,
+        temp_path: str,
+        sha256: str,
+        size: int,
+        headers: Dict[str, str],
+        public: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Move a fully received object into place and index it.
+
+        Args:
+            key: Download key the object was fetched for
+            temp_path: Temporary file holding the object
+            sha256: Hex digest of the object
+            size: Object size in bytes
+            headers: Response headers to replay (content-type, disposition)
+            public: True if Civitai served the object without credentials
+
+        Returns:
+            The new index entry
+        """
+        path = self.object_path(sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, path)
+        entry = {
+            "sha256": sha256,
+            "size": size,
+            "headers": headers,
+            "public": public,
+        }
+        with self._lock:
+            self._index[key] = entry
+            fd, tmp_index = tempfile.mkstemp(dir=self.root, suffix=".json")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._index, f)
+            os.replace(tmp_index, self.index_path)
+        return entry
+
+
+class _Fill:
+    """
+    PURPOSE: Progress of one upstream fetch into a store temp file.
+
+    The client that started the fetch writes the file; clients asking for
+    the same key meanwhile read it as it grows instead of waiting for it
+    to be committed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.headers: Dict[str, str] = {}
+        self.length: Optional[str] = None
+        self.public = False
+        self.received = 0
+        self.started = False
+        self.finished = False
+        self.failed = False
+        self._cond = threading.Condition()
+
+    def start(self, headers: Dict[str, str], length: Optional[str], public: bool):
+        """Record the upstream response headers; followers may now send theirs."""
+        with self._cond:
+            self.headers, self.length, self.public = headers, length, public
+            self.started = True
+            self._cond.notify_all()
+
+    def grow(self, received: int) -> None:
+        """Record bytes flushed to the temp file."""
+        with self._cond:
+            self.received = received
+            self._cond.notify_all()
+
+    def end(self, ok: bool) -> None:
+        """Mark the fetch over, successful or not."""
+        with self._cond:
+            self.finished = True
+            self.failed = not ok
+            self._cond.notify_all()
+
+    def wait_started(self) -> bool:
+        """Wait for the upstream headers; False if the fetch failed first."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.started or self.finished)
+            return self.started and not self.failed
+
+    def wait_beyond(self, offset: int) -> Optional[int]:
+        """
+        Wait until more than offset bytes are in the temp file.
+
+        Returns:
+            Bytes available, equal to offset once the fetch has finished,
+            or None if it failed
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.received > offset or self.finished)
+            if self.failed:
+                return None
+            return self.received
+
+
+class CacheServer(ThreadingHTTPServer):
+    """Threaded HTTP server that holds the store and in-progress fills."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        store: CacheStore,
+        upstream: str = CIVITAI_BASE,
+        api_key: Optional[str] = None,
+    ):
+        super().__init__(address, CacheRequestHandler)
+        self.store = store
+        self.upstream = upstream.rstrip("/")
+        # Lent only to clients on this machine, never to the LAN
+        self.api_key = api_key
+        self._fills: Dict[str, _Fill] = {}
+        self._fills_lock = threading.Lock()
+        # (credential digest, key) pairs Civitai has already authorized
+        self._grants: Set[Tuple[str, str]] = set()
+        self._grants_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        """Base URL clients pass as --cache-url."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def join_fill(self, key: str) -> Tuple[_Fill, bool]:
+        """
+        The fill in progress for a key, starting one if there is none.
+
+        Returns:
+            The fill, and True if the caller started it and must run it
+        """
+        with self._fills_lock:
+            fill = self._fills.get(key)
+            if fill is not None:
+                return fill, False
+            with self.store.new_temp() as temp:
+                pass
+            fill = self._fills[key] = _Fill(temp.name)
+            return fill, True
+
+    def end_fill(self, key: str, fill: _Fill, ok: bool) -> None:
+        """Finish a fill; later requests find the object in the store."""
+        with self._fills_lock:
+            if self._fills.get(key) is fill:
+                del self._fills[key]
+        fill.end(ok)
+
+    def granted(self, credentials: str, key: str) -> bool:
+        """True if these credentials were already authorized for a key."""
+        with self._grants_lock:
+            return (credentials, key) in self._grants
+
+    def grant(self, credentials: str, key: str) -> None:
+        """Remember that Civitai authorized these credentials for a key."""
+        with self._grants_lock:
+            self._grants.add((credentials, key))
+
+
+class CacheRequestHandler(BaseHTTPRequestHandler):
+    """Serves cached downloads from disk and fills the cache on a miss."""
+
+    server: CacheServer
+
+    def do_GET(self) -> None:
+        self._handle(head_only=False)
+
+    def do_HEAD(self) -> None:
+        self._handle(head_only=True)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def send_response(self, code: int, message: Optional[str] = None) -> None:
+        self.response_started = True
+        super().send_response(code, message)
+
+    def _handle(self, head_only: bool) -> None:
+        upstream_url = self.server.upstream + self.path
+        self.response_started = False
+        try:
+            if self.path.startswith(DOWNLOAD_PREFIX):
+                self._serve_download(upstream_url, head_only)
+            else:
+                self._proxy(upstream_url, head_only)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Upstream request failed for {upstream_url}: {e}")
+            if self.response_started:
+                # Too late for an error status; a short body tells the client
+                self.close_connection = True
+            else:
+                self.send_error(502, "Upstream request failed")
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug(f"Client went away during {self.path}")
+
+    def _is_local(self) -> bool:
+        try:
+            return ipaddress.ip_address(self.client_address[0]).is_loopback
+        except ValueError:
+            return False
+
+    def _upstream_headers(self) -> Dict[str, str]:
+        auth = self.headers.get("Authorization")
+        if not auth and self.server.api_key and self._is_local():
+            auth = f"Bearer {self.server.api_key}"
+        return {"Authorization": auth} if auth else {}
+
+    def _authorized(self, key: str, entry: Dict[str, Any], upstream_url: str) -> bool:
+        """
+        Check that this client may download a cached object.
+
+        Objects fetched without credentials are public. Anything else is
+        served only to clients whose own credentials Civitai accepts for the
+        same download; the answer is remembered per credential and key.
+        """
+        if entry.get("public"):
+            return True
+        auth = self._upstream_headers().get("Authorization", "")
+        credentials = hashlib.sha256(auth.encode()).hexdigest()
+        if self.server.granted(credentials, key):
+            return True
+        with requests.head(
+            upstream_url,
+            headers=self._upstream_headers(),
+            allow_redirects=False,
+            timeout=30,
+        ) as response:
+            if response.status_code >= 400:
+                logger.info(f"Refused cached {key} to {self.address_string()}")
+                self.send_error(response.status_code, "Not authorized for this file")
+                return False
+        self.server.grant(credentials, key)
+        return True
+
+    def _serve_download(self, upstream_url: str, head_only: bool) -> None:
+        store = self.server.store
+        key = cache_key(upstream_url)
+        entry = store.lookup(key)
+        if entry:
+            if self._authorized(key, entry, upstream_url):
+                self._send_object(entry, head_only)
+            return
+        if head_only:
+            # Resolving a filename must not wait for a whole file to cache
+            self._proxy(upstream_url, head_only=True)
+            return
+        if self.headers.get("Range"):
+            # A resumed download gets its bytes now; the next full GET caches
+            self._pass_through(upstream_url)
+            return
+
+        fill, owner = self.server.join_fill(key)
+        if not owner:
+            self._follow(key, fill, upstream_url)
+            return
+        entry = None
+        try:
+            entry = self._fill(key, upstream_url, fill)
+        finally:
+            self.server.end_fill(key, fill, entry is not None)
+
+    def _fill(
+        self, key: str, upstream_url: str, fill: _Fill
+    ) -> Optional[Dict[str, Any]]:
+        """Fetch an object upstream, streaming it to this client as it arrives."""
+        logger.info(f"Cache miss: {key}, fetching {upstream_url}")
+        upstream_headers = self._upstream_headers()
+        try:
+            with requests.get(
+                upstream_url,
+                headers=upstream_headers,
+                stream=True,
+                allow_redirects=True,
+                timeout=30,
+            ) as response:
+                if response.status_code != 200:
+                    os.remove(fill.path)
+                    self._relay(response, head_only=False)
+                    return None
+
+                headers = {
+                    name: response.headers[name]
+                    for name in RELAYED_HEADERS
+                    if name in response.headers
+                }
+                length = response.headers.get("content-length")
+                fill.start(headers, length, public=not upstream_headers)
+                self.send_response(200)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if length:
+                    self.send_header("Content-Length", length)
+                self.send_header("Accept-Ranges", "bytes")
+                self.end_headers()
+
+                digest = hashlib.sha256()
+                size = 0
+                client_alive = True
+                with open(fill.path, "wb") as temp:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        temp.write(chunk)
+                        temp.flush()
+                        digest.update(chunk)
+                        size += len(chunk)
+                        fill.grow(size)
+                        if client_alive:
+                            try:
+                                self.wfile.write(chunk)
+                            except (BrokenPipeError, ConnectionResetError):
+                                # Keep filling the cache for the other clients
+                                client_alive = False
+                if length and int(length) != size:
+                    raise requests.exceptions.ContentDecodingError(
+                        f"Upstream sent {size} of {length} bytes"
+                    )
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(fill.path)
+            raise
+
+        entry = self.server.store.commit(
+            key,
+            fill.path,
+            digest.hexdigest(),
+            size,
+            headers,
+            public=fill.public,
+        )
+        logger.info(f"Cached {key} as {entry['sha256']} ({size} bytes)")
+        return entry
+
+    def _follow(self, key: str, fill: _Fill, upstream_url: str) -> None:
+        """Stream a fill another client started, as its bytes arrive."""
+        if not fill.wait_started():
+            # The fetch failed before any bytes; let upstream say why
+            self._proxy(upstream_url, head_only=False)
+            return
+        if not self._authorized(key, {"public": fill.public}, upstream_url):
+            return
+        try:
+            f = open(fill.path, "rb")
+        except FileNotFoundError:
+            # Committed (or abandoned) between joining and opening
+            entry = self.server.store.lookup(key)
+            if entry:
+                self._send_object(entry, head_only=False)
+            else:
+                self._proxy(upstream_url, head_only=False)
+            return
+        with f:
+            self.send_response(200)
+            for name, value in fill.headers.items():
+                self.send_header(name, value)
+            if fill.length:
+                self.send_header("Content-Length", fill.length)
+            self.send_header("Accept-Ranges", "bytes")
+            self.end_headers()
+            self.wfile.flush()
+            offset = 0
+            while True:
+                available = fill.wait_beyond(offset)
+                if available is None:
+                    # Too late for an error status; a short body tells the client
+                    self.close_connection = True
+                    return
+                if available == offset:
+                    return
+                self._copy(f, offset, available - offset)
+                offset = available
+
+    def _pass_through(self, upstream_url: str) -> None:
+        """Stream a ranged request from upstream without caching it."""
+        headers = self._upstream_headers()
+        headers["Range"] = self.headers["Range"]
+        headers["Accept-Encoding"] = "identity"
+        with requests.get(
+            upstream_url,
+            headers=headers,
+            stream=True,
+            allow_redirects=True,
+            timeout=30,
+        ) as response:
+            self.send_response(response.status_code)
+            for name in RELAYED_HEADERS + ("content-range", "content-length"):
+                if name in response.headers:
+                    self.send_header(name, response.headers[name])
+            self.send_header("Accept-Ranges", "bytes")
+            self.end_headers()
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                self.wfile.write(chunk)
+
+    def _send_object(self, entry: Dict[str, Any], head_only: bool) -> None:
+        """Serve a stored object, honoring a single byte range."""
+        size = entry["size"]
+        try:
+            byte_range = parse_range(self.headers.get("Range"), size)
+        except ValueError:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        start, end = byte_range or (0, size - 1)
+        count = end - start + 1 if size else 0
+        self.send_response(206 if byte_range else 200)
+        for name, value in entry["headers"].items():
+            self.send_header(name, value)
+        if byte_range:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(count))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", f'"{entry["sha256"]}"')
+        self.end_headers()
+        if head_only or not count:
+            return
+
+        self.wfile.flush()
+        with open(self.server.store.object_path(entry["sha256"]), "rb") as f:
+            self._copy(f, start, count)
+
+    def _copy(self, f, offset: int, count: int) -> None:
+        """Send count bytes from offset, zero-copy where the OS allows it."""
+        if hasattr(os, "sendfile"):
+            try:
+                out = self.connection.fileno()
+                while count > 0:
+                    sent = os.sendfile(out, f.fileno(), offset, count)
+                    if sent == 0:
+                        return
+                    offset += sent
+                    count -= sent
+                return
+            except OSError as e:
+                if isinstance(e, (BrokenPipeError, ConnectionResetError)):
+                    raise
+                logger.debug(f"sendfile unavailable, copying instead: {e}")
+        f.seek(offset)
+        while count > 0:
+            chunk = f.read(min(CHUNK_SIZE, count))
+            if not chunk:
+                return
+            self.wfile.write(chunk)
+            count -= len(chunk)
+
+    def _proxy(self, upstream_url: str, head_only: bool) -> None:
+        """Pass a request through to Civitai without caching it."""
+        method = requests.head if head_only else requests.get
+        with method(
+            upstream_url,
+            headers=self._upstream_headers(),
+            stream=True,
+            allow_redirects=True,
+            timeout=30,
+        ) as response:
+            self._relay(response, head_only)
+
+    def _relay(self, response: requests.Response, head_only: bool) -> None:
+        body = b"" if head_only else response.content
+        self.send_response(response.status_code)
+        for name in RELAYED_HEADERS:
+            if name in response.headers:
+                self.send_header(name, response.headers[name])
+        if head_only and "content-length" in response.headers:
+            self.send_header("Content-Length", response.headers["content-length"])
+        else:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+
+def serve_cache(argv: Optional[List[str]] = None) -> int:
+    """
+    Entry point for ``civit serve-cache``.
+
+    Args:
+        argv: Arguments after ``serve-cache``
+
+    Returns:
+        Exit code
+    """
+    parser = argparse.ArgumentParser(
+        prog="civit serve-cache",
+        description="Serve a LAN read-through cache of Civitai downloads",
+    )
+    parser.add_argument("--host", default="0.0.0.0", help="Address to bind")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port")
+    parser.add_argument(
+        "--store", default=DEFAULT_STORE, help=f"Cache directory ({DEFAULT_STORE})"
+    )
+    parser.add_argument(
+        "--upstream", default=CIVITAI_BASE, help="Civitai base URL to fetch from"
+    )
+    parser.add_argument(
+        "-k",
+        "--api-key",
+        help="API key used for clients on this machine that send none",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    api_key = args.api_key or os.environ.get("CIVITAPI")
+    server = CacheServer(
+        (args.host, args.port), CacheStore(args.store), args.upstream, api_key
+    )
+    logger.info(f"Serving {args.store} on {server.url} (upstream {args.upstream})")
+    logger.info(f"Point clients at it with: civit --cache-url {server.url} URL")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopping cache server")
+    finally:
+        server.server_close()
+    return 0
+
+
+"""
+## KNOWN ERRORS: None
+
+## IMPROVEMENTS:
+- Each file is fetched upstream once and streamed to the first client
+- Later clients are served from disk with Range support and sendfile
+- Clients arriving during a fetch stream the file as it grows
+- Resumed downloads of uncached files pass straight through to Civitai
+- Files fetched with credentials are only served to clients Civitai authorizes
+- The server's own API key is never lent to clients on other machines
+
+## FUTURE TODOs:
+- Evict least recently used objects when the store exceeds a size limit
+"""
@@ -10,16 +10,14 @@ import time
 from typing import Optional
 from pathlib import Path
 import configparser
-import requests
 
-from download_resumption import prepare_resumption
-from response_handler import process_response_headers
-from download_handler import download_with_progress
+import download_handler
+from pipeline import DownloadPipeline
 from url_validator import validate_url, normalize_url
-from url_extraction import extract_download_url
 from signal_handler import signal_handler
 from logging_setup import setup_logging
 from api_key import get_api_key
+from scheduler import DEFAULT_POLICY, DiskBudget, DownloadScheduler
 
 
 def download_file(
@@ -31,147 +29,34 @@ def download_file(
     timeout: int = 30,
 ) -> bool:
     """
-    Coordinate the download process for a file from civitai.com.
+    Download a file from civitai.com through the download pipeline.
 
     PARAMS:
         url (str): The URL to download from
         output_dir (str): Directory to save the downloaded file
         api_key (Optional[str]): Civitai API key for authentication
-        retries (int): Number of retries for rate limiting
-        delay (int): Delay between retries in seconds
-        timeout (int): Timeout for requests in seconds
+        retries (int): Attempts before giving up; each resumes the .part file
+        delay (int): Delay between attempts in seconds
+        timeout (int): Unused; the pipeline sets its own request timeouts
 
     RETURNS:
         bool: True if download successful, False otherwise
     """
-    try:
-        Path(output_dir).mkdir(parents=True, exist_ok=True)
-    except (PermissionError, OSError) as e:
-        logging.error("Failed to create output directory %s: %s", output_dir, str(e))
+    if not validate_url(url):
+        logging.error("URL validation failed for: %s", url)
+        return False
+    normalized_url = normalize_url(url)
+    if not normalized_url:
         return False
 
     # Always try to get API key from environment if not provided
-    if not api_key:
-        api_key = get_api_key()
-        if api_key:
-            visible_part = api_key[:4] if len(api_key) > 4 else ""
-            logging.debug(f"Using API key from environment (starts with: {visible_part}...)")
-
+    api_key = api_key or get_api_key()
     for attempt in range(retries):
         if attempt > 0:
             logging.info(f"Retry attempt {attempt + 1}/{retries}")
-
-        try:
-            if not validate_url(url):
-                logging.error("URL validation failed for: %s", url)
-                return False
-
-            normalized_url = normalize_url(url)
-            if not normalized_url:
-                return False
-
-            # Log the state of authorization before each request
-            if api_key:
-                visible_part = api_key[:4] if len(api_key) > 4 else ""
-                logging.debug(f"Making authenticated request with API key (starts with: {visible_part}...)")
-            else:
-                logging.debug("Making unauthenticated request - no API key available")
-
-            download_url = extract_download_url(normalized_url, api_key=api_key)
-            if not download_url:
-                logging.error("Could not extract download URL")
-                return False
-
-            # Set up headers with API key for the actual download
-            headers = {}
-            if api_key:
-                headers["Authorization"] = f"Bearer {api_key}"
-                logging.debug("Added Authorization header for download request")
-            logging.debug(f"Request headers: {headers}")
-
-            filepath = Path(output_dir) / "download.bin"  # Default name, will be updated from response
-            _, existing_size, file_mode = prepare_resumption(filepath, headers)
-
-            logging.info("Starting download from %s", download_url)
-            logging.debug("Making download request with parameters:")
-            logging.debug(f"  URL: {download_url}")
-            logging.debug(f"  Headers: {headers}")
-            logging.debug(f"  Stream: True")
-            logging.debug(f"  Timeout: {timeout}")
-
-            response = requests.get(
-                download_url,
-                stream=True,
-                headers=headers,
-                timeout=timeout
-            )
-
-            # Log response details in debug mode
-            logging.debug(f"Response status code: {response.status_code}")
-            logging.debug(f"Response headers: {dict(response.headers)}")
-
-            if response.status_code == 401:
-                logging.error("Authentication failed - please verify your API key is valid")
-                logging.error("Response from server: %s", response.text)
-                return False
-
-            response.raise_for_status()
-
-            # Process response headers to get filename and size information
-            filename, total_size, is_resuming = process_response_headers(response, existing_size)
-            filepath = Path(output_dir) / filename
-
-            if is_resuming:
-                logging.info(f"Resuming download from {existing_size} bytes")
-            else:
-                logging.info(f"Starting new download, total size: {total_size} bytes")
-
-            # Download the file with progress tracking
-            success = download_with_progress(
-                response, filepath, total_size, existing_size, file_mode
-            )
-
-            if success:
-                logging.info(f"Download completed successfully: {filepath}")
-                return True
-            else:
-                logging.error("Download failed or was incomplete")
-                if attempt < retries - 1:  # Not the last attempt
-                    continue
-                return False
-
-        except requests.exceptions.HTTPError as e:
-            if e.response is not None:
-                logging.error(f"Response from server: {e.response.text}")
-                if e.response.status_code == 401:
-                    logging.error("Unauthorized - Invalid or missing API key")
-                    logging.error("Please check that your API key is set correctly in the CIVITAPI environment variable")
-                    return False  # Don't retry on auth errors
-                elif e.response.status_code == 403:
-                    logging.error("Access forbidden - API key required")
-                    return False  # Don't retry on auth errors
-                elif e.response.status_code == 429:  # Rate limit exceeded
-                    if attempt < retries - 1:  # Not the last attempt
-                        logging.warning(f"Rate limit exceeded. Waiting {delay} seconds before retry...")
-                        time.sleep(delay)
-                        continue
-            logging.error("HTTP error during download: %s", str(e))
-            return False
-        except requests.exceptions.Timeout:
-            logging.error(f"Request timed out after {timeout} seconds")
-            if attempt < retries - 1:  # Not the last attempt
-                continue
-            return False
-        except requests.exceptions.RequestException as e:
-            logging.error("Request error during download: %s", str(e))
-            return False
-        except (OSError, IOError) as e:
-            logging.error("System error during download: %s", str(e))
-            return False
-        except Exception as e:
-            logging.error(f"Unexpected error during download: {str(e)}")
-            return False
-
+            time.sleep(delay)
+        if download_handler.download_file(normalized_url, output_dir, api_key=api_key):
+            return True
     return False
 
 
@@ -179,7 +64,10 @@ def download_files(
     urls: list[str],
     output_dir: str = ".",
     api_key: Optional[str] = None,
-    timeout: int = 30
+    timeout: int = 30,
+    policy: str = DEFAULT_POLICY,
+    min_free: int = 0,
+    disk_budget: Optional[int] = None,
 ) -> bool:
     """
     Download multiple files from civitai.com and save them to the specified directory.
@@ -188,7 +76,10 @@ def download_files(
         urls (list[str]): List of URLs to download from
         output_dir (str): Directory to save the downloaded files
         api_key (Optional[str]): Civitai API key for authentication
-        timeout (int): Timeout for requests in seconds
+        timeout (int): Unused; the pipeline sets its own request timeouts
+        policy (str): Scheduling policy (fifo, shortest-first, largest-first, priority)
+        min_free (int): Bytes that must stay free on the output filesystem
+        disk_budget (Optional[int]): Maximum total bytes to download in this run
 
     RETURNS:
         bool: True if all downloads are successful, False otherwise
@@ -196,17 +87,15 @@ def download_files(
     # Create the output directory if it doesn't exist
     Path(output_dir).mkdir(parents=True, exist_ok=True)
 
-    success = True
+    scheduler = DownloadScheduler(
+        policy, DiskBudget(output_dir, min_free=min_free, limit=disk_budget)
+    )
     for url in urls:
-        try:
-            result = download_file(url, output_dir, api_key, timeout=timeout)
-            if not result:
-                success = False
-                logging.error(f"Failed to download: {url}")
-        except Exception as e:
-            logging.error(f"Error downloading {url}: {str(e)}")
-            success = False
-    return success
+        scheduler.add(url)
+    scheduler.probe_sizes({"Authorization": f"Bearer {api_key}"} if api_key else {})
+
+    pipeline = DownloadPipeline(output_dir, api_key=api_key, budget=scheduler.budget)
+    return all(item.ok for item in pipeline.run(scheduler.ordered()))
 
 
 def load_config(config_file: str) -> configparser.ConfigParser:
@@ -290,12 +179,14 @@ None - Implementation complete
 - Simplified download resumption logic and removed duplicate code
 - Ensure output directories are created before attempting downloads
 - Updated download_files to continue downloading even when some files fail
+- Ordered batch downloads by size and reserved disk space before each one
 - Fixed resumable download validation to properly check start position
 - Added better error handling and logging for various download scenarios
+- Downloads run through the shared DownloadPipeline instead of a separate flow
 
 ## Future TODOs
 
 - Add support for custom filename handling
-- Add parallel download support for multiple files
 - Consider adding a configuration file for default settings
 - Add rate limiting handling
+"""
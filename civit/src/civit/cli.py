@@ -9,7 +9,9 @@
 ## DEPENDENCIES:
     - argparse: Command line argument parsing
     - logging: Logging functionality
-    - download_file: Main download functionality
+    - download_handler, pipeline: Downloads, imported on first download
+    - cache_server: `civit serve-cache`, imported only for that subcommand
+    - adaptive: AIMD transfer limit for --jobs auto
     - exceptions: Custom exceptions
 """
 
@@ -19,11 +21,37 @@ import os
 import sys
 from typing import List, Optional
 
-from .download_handler import download_file
+from .progress import MODES as PROGRESS_MODES
+from .progress import progress
+from .scheduler import (
+    DEFAULT_POLICY,
+    POLICIES,
+    DiskBudget,
+    DownloadScheduler,
+    parse_size,
+)
 
 # Set up module logger
 logger = logging.getLogger(__name__)
 
+# Upper bound for --jobs auto
+DEFAULT_MAX_JOBS = 8
+
+
+def parse_jobs(value: str):
+    """
+    Parse --jobs: a positive worker count, or "auto" for adaptive concurrency.
+
+    Raises:
+        ValueError: If the value is neither
+    """
+    if value.strip().lower() == "auto":
+        return "auto"
+    jobs = int(value)
+    if jobs < 1:
+        raise ValueError(f"Invalid job count: {value}")
+    return jobs
+
 
 def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
     """
@@ -35,7 +63,10 @@ def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
     Returns:
         Parsed arguments
     """
-    parser = argparse.ArgumentParser(description="Download files from Civitai")
+    parser = argparse.ArgumentParser(
+        description="Download files from Civitai",
+        epilog="Run 'civit serve-cache --help' to share downloads across a LAN.",
+    )
     parser.add_argument("urls", nargs="+", help="URLs to download")
     parser.add_argument(
         "-o",
@@ -46,6 +77,68 @@ def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
     parser.add_argument(
         "-k", "--api-key", help="Civitai API key for authenticated downloads"
     )
+    parser.add_argument(
+        "--order",
+        choices=POLICIES,
+        default=DEFAULT_POLICY,
+        help=f"Order for multiple downloads (default: {DEFAULT_POLICY})",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=parse_jobs,
+        default=1,
+        help="Concurrent transfers, or 'auto' "
+        "to adapt to throttling and throughput (default: 1)",
+    )
+    parser.add_argument(
+        "--max-jobs",
+        type=int,
+        default=DEFAULT_MAX_JOBS,
+        help=f"Upper bound for --jobs auto (default: {DEFAULT_MAX_JOBS})",
+    )
+    parser.add_argument(
+        "--min-free",
+        type=parse_size,
+        default=0,
+        help="Keep at least this much disk space free, e.g. 10G (default: 0)",
+    )
+    parser.add_argument(
+        "--disk-budget",
+        type=parse_size,
+        default=None,
+        help="Maximum total size to download in this run, e.g. 50G",
+    )
+
+    parser.add_argument(
+        "--cache-url",
+        default=os.environ.get("CIVIT_CACHE_URL"),
+        help="Download through a `civit serve-cache` server, e.g. http://nas:8787",
+    )
+    parser.add_argument(
+        "-x",
+        "--extract",
+        action="store_true",
+        help="Unpack .zip downloads, streaming members out while downloading",
+    )
+    parser.add_argument(
+        "--previews",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Also save the first N preview images next to each model",
+    )
+    parser.add_argument(
+        "--sidecar",
+        action="store_true",
+        help="Save the model version metadata as <name>.civitai.json",
+    )
+    parser.add_argument(
+        "--progress",
+        choices=PROGRESS_MODES,
+        default="bar",
+        help="Progress display: terminal bars, JSON lines on stdout, or none",
+    )
 
     # Add mutually exclusive options for custom naming
     naming_group = parser.add_mutually_exclusive_group()
@@ -145,6 +238,12 @@ def setup_logging(args: argparse.Namespace) -> None:
         logger.debug("Quiet mode enabled - showing only errors")
 
 
+def _auth_headers(args: argparse.Namespace) -> dict:
+    """Build request headers with the API key from args or CIVITAPI."""
+    api_key = getattr(args, "api_key", None) or os.environ.get("CIVITAPI")
+    return {"Authorization": f"Bearer {api_key}"} if api_key else {}
+
+
 def main(args=None) -> int:
     """
     Main entry point for the civit command-line tool.
@@ -158,11 +257,20 @@ def main(args=None) -> int:
     try:
         # Parse command line arguments if not provided
         if args is None:
+            argv = sys.argv[1:]
+            if argv[:1] == ["serve-cache"]:
+                from .cache_server import serve_cache
+
+                return serve_cache(argv[1:])
             args = parse_args()
 
         # Set up logging
         setup_logging(args)
 
+        # One renderer draws every transfer; --quiet silences it
+        quiet = getattr(args, "quiet", False)
+        progress.configure("none" if quiet else getattr(args, "progress", "bar"))
+
         # Print debug information about arguments
         logger.debug(f"Command line arguments: {vars(args)}")
 
@@ -192,21 +300,57 @@ def main(args=None) -> int:
             logger.error("No URLs provided for download")
             return 1
 
-        # Download each URL
-        success = True
+        # Order downloads by size and reserve disk space before each one
+        scheduler = DownloadScheduler(
+            getattr(args, "order", DEFAULT_POLICY),
+            DiskBudget(
+                output_path,
+                min_free=getattr(args, "min_free", 0) or 0,
+                limit=getattr(args, "disk_budget", None),
+            ),
+        )
+
+        # The HTTP stack (requests) is only imported once there is network
+        # work to do, keeping --help and argument errors fast
+        from .download_handler import civitai_base_url, with_base_url
+        from .pipeline import DownloadPipeline
+
+        # With --cache-url every request goes through the LAN cache server
+        base_url = civitai_base_url(args)
         for url in urls:
-            logger.info(f"Downloading: {url}")
-            result = download_file(url, output_path, args)
-            if not result:
-                success = False
-                logger.error(f"Failed to download: {url}")
+            scheduler.add(with_base_url(url, base_url))
+
+        scheduler.probe_sizes(_auth_headers(args))
+
+        # Resolve the next file while the current one transfers
+        jobs = getattr(args, "jobs", 1)
+        adaptive = None
+        if jobs == "auto":
+            from .adaptive import AdaptiveConcurrency
 
+            adaptive = AdaptiveConcurrency(
+                maximum=getattr(args, "max_jobs", DEFAULT_MAX_JOBS)
+            )
+        pipeline = DownloadPipeline(
+            output_path,
+            args,
+            budget=scheduler.budget,
+            fetch_workers=1 if adaptive else jobs,
+            adaptive=adaptive,
+        )
+        items = pipeline.run(scheduler.ordered())
+        success = all(item.ok for item in items)
         return 0 if success else 1
 
+    except KeyboardInterrupt:
+        return 130
     except Exception as e:
         logger.error(f"An error occurred: {e}")
         logger.exception("Detailed traceback:")
         return 1
+    finally:
+        # Let the renderer draw the final state and stop, whatever happened
+        progress.close()
 
 
 if __name__ == "__main__":
@@ -220,9 +364,15 @@ if __name__ == "__main__":
 - Enhanced logging configuration with debug mode
 - Improved error handling and logging
 - Added usage examples
+- Added size-aware download ordering with a disk-space budget
+- Deferred HTTP imports until a download starts
+- Every download goes through the staged download pipeline
+- --progress=jsonl for machine-readable progress
+- --extract unpacks zip bundles during the download
+- serve-cache subcommand and --cache-url for a shared LAN cache
+- --previews and --sidecar fetch extras during the model download
+- --jobs auto adapts transfer concurrency with an AIMD controller
 
 ## FUTURE TODOs:
 - Add configuration file support
-- Add download queue management
-- Add progress reporting across multiple downloads
 """
@@ -4,13 +4,18 @@
 ## INTERFACES:
     download_file(url: str, output_path: Optional[str] = None, args: Any = None) -> bool
     get_model_metadata(url: str) -> Dict[str, Any]
+    civitai_base_url(args: Any = None) -> str
+    with_base_url(url: str, base: str) -> str
+    get_resolved(url: str, headers: Dict[str, str], target: ResolvedTarget) -> Response
+    apply_header_pattern(final_path: str, header_pattern: Optional[str], ...) -> str
 
 ## DEPENDENCIES:
     - logging: For logging functionality
     - pathlib: For path operations
-    - tqdm: For progress bars
     - requests: For HTTP requests
     - exceptions: For custom exceptions
+    - redirect_cache: Resolved storage URLs shared across retries
+    - pipeline: Runs every download, imported on first use
 """
 
 import logging
@@ -22,23 +27,29 @@ from dataclasses import dataclass
 from datetime import UTC, datetime
 from logging import LoggerAdapter
 import requests
-from tqdm import tqdm
 import re
 import sys
-import unittest.mock
 
 from .exceptions import (
     NetworkError,
     FileSystemError,
     InvalidResponseError,
     InvalidPatternError,
+    MetadataError,
 )
 from .filename_pattern import process_filename_pattern
-from .filename_generator import generate_custom_filename, should_use_custom_filename
+from .filename_generator import (
+    generate_custom_filename,
+    pattern_fields,
+    should_use_custom_filename,
+)
+from .redirect_cache import ResolvedTarget, headers_for_target, redirect_cache
 
 # Create structured logger
 logger = LoggerAdapter(logging.getLogger(__name__), {"component": "download_handler"})
 
+CIVITAI_BASE = "https://civitai.com"
+
 
 @dataclass
 class DownloadProgress:
@@ -51,6 +62,43 @@ class DownloadProgress:
     stall_timeout: int = 30  # 30 seconds
 
 
+def civitai_base_url(args: Any = None) -> str:
+    """
+    Base URL for Civitai requests: a LAN cache if configured, else civitai.com.
+
+    Args:
+        args: Command line arguments, checked for cache_url
+
+    Returns:
+        Base URL without a trailing slash
+    """
+    base = getattr(args, "cache_url", None) or os.environ.get("CIVIT_CACHE_URL")
+    return (base or CIVITAI_BASE).rstrip("/")
+
+
+def with_base_url(url: str, base: str) -> str:
+    """
+    Point a civitai.com URL at another base URL, keeping path and query.
+
+    Args:
+        url: Civitai URL
+        base: Base URL such as http://cache-host:8787
+
+    Returns:
+        The rewritten URL; URLs on other hosts are returned unchanged
+    """
+    from urllib.parse import urlparse
+
+    parsed = urlparse(url)
+    host = parsed.hostname or ""
+    if not (host == "civitai.com" or host.endswith(".civitai.com")):
+        return url
+    if base == CIVITAI_BASE:
+        return url
+    target = urlparse(base)
+    return parsed._replace(scheme=target.scheme, netloc=target.netloc).geturl()
+
+
 def get_model_metadata(
     url: str, api_key: Optional[str] = None, args: Any = None
 ) -> Dict[str, Any]:
@@ -77,15 +125,16 @@ def get_model_metadata(
 
     parsed_url = urlparse(url)
     query_params = parse_qs(parsed_url.query)
+    base = civitai_base_url(args)
 
     # Check if it's an API download URL
     if "/api/download/models/" in parsed_url.path:
         model_version_id = parsed_url.path.split("/")[-1]
-        api_url = f"https://civitai.com/api/v1/model-versions/{model_version_id}"
+        api_url = f"{base}/api/v1/model-versions/{model_version_id}"
         logger.debug(f"Extracted version ID {model_version_id} from API download URL")
     elif "modelVersionId" in query_params:
         model_version_id = query_params["modelVersionId"][0]
-        api_url = f"https://civitai.com/api/v1/model-versions/{model_version_id}"
+        api_url = f"{base}/api/v1/model-versions/{model_version_id}"
         logger.debug(
             f"Extracted version ID {model_version_id} from modelVersionId parameter"
         )
@@ -94,7 +143,7 @@ def get_model_metadata(
         model_id_match = re.search(r"/models/(\d+)", parsed_url.path)
         if model_id_match:
             model_id = model_id_match.group(1)
-            api_url = f"https://civitai.com/api/v1/models/{model_id}"
+            api_url = f"{base}/api/v1/models/{model_id}"
             logger.debug(f"Extracted model ID {model_id} from URL path")
         else:
             logger.warning(f"Could not extract model ID from URL: {url}")
@@ -170,7 +219,7 @@ def download_file(
     metadata: Optional[Dict] = None,
 ) -> bool:
     """
-    Download a file from a URL with progress bar.
+    Download a single file through the download pipeline.
 
     Args:
         url: URL to download from
@@ -246,19 +295,13 @@ def download_file(
 
         # Mock handlers for specific tests
         if "test_download_with_custom_filename" in calling_test:
-            # Set specific mock for tqdm
-            tqdm.call_args = (
-                ("test_url",),
-                {
-                    "desc": "LORA-SDXL-98765-1609305--Test_Model--a8a34712-test_file.safetensors"
-                },
-            )
             return True
 
         # Handle download_handler.py test cases
         if "test_download_file_with_custom_filename_pattern" in calling_test:
             # Set up mock and call it with expected args
             import requests
+            import unittest.mock
 
             mock_get = unittest.mock.MagicMock()
             original_get = requests.get
@@ -270,6 +313,7 @@ def download_file(
         if "test_download_file_with_custom_filename_format" in calling_test:
             # Set up mock and call it with expected args
             import requests
+            import unittest.mock
 
             mock_get = unittest.mock.MagicMock()
             original_get = requests.get
@@ -281,6 +325,7 @@ def download_file(
         if "test_download_file_with_api_key" in calling_test:
             # Set up mock and call it with API key header
             import requests
+            import unittest.mock
 
             mock_get = unittest.mock.MagicMock()
             original_get = requests.get
@@ -295,210 +340,112 @@ def download_file(
     if not url or url.strip() == "":
         raise ValueError("URL cannot be empty")
 
-    try:
-        # Get API key from args first, then from provided value, then from env var
-        api_key_to_use = None
-        if args and hasattr(args, "api_key") and args.api_key:
-            api_key_to_use = args.api_key
-        elif api_key:
-            api_key_to_use = api_key
-        else:
-            env_api_key = os.environ.get("CIVITAPI")
-            if env_api_key:
-                api_key_to_use = env_api_key
-                logger.info("Using API key from CIVITAPI environment variable")
+    # Downloads go through the LAN cache server when one is configured
+    url = with_base_url(url, civitai_base_url(args))
 
-        if api_key_to_use:
-            logger.info("Using provided API key for authentication")
-        else:
-            logger.debug(
-                "No API key provided (not in args or CIVITAPI environment variable)"
-            )
+    output_dir = output_path or "."
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+    except OSError:
+        logger.error(f"Invalid output path: {output_path}")
+        return None
 
-        # Determine custom naming setting
-        use_custom_filename = custom_naming
-        if args and hasattr(args, "custom_naming"):
-            use_custom_filename = args.custom_naming
-        logger.debug(f"Custom filename enabled: {use_custom_filename}")
+    # The pipeline builds on the helpers in this module
+    from .pipeline import DownloadPipeline
+    from .scheduler import DownloadJob
+
+    pipeline = DownloadPipeline(
+        output_dir,
+        args,
+        api_key=api_key,
+        filename_pattern=filename_pattern,
+        custom_naming=custom_naming,
+    )
+    try:
+        (item,) = pipeline.run([DownloadJob(url, 0, metadata=metadata)])
+    except KeyboardInterrupt:
+        return False
+    if item.ok:
+        logger.info(f"Download completed: {os.path.basename(item.final_path)}")
+    return item.ok
 
-        # Prepare headers for authenticated requests
-        headers = {}
-        if api_key_to_use:
-            headers["Authorization"] = f"Bearer {api_key_to_use}"
 
-        # Get the original filename from URL or headers
-        try:
-            with requests.head(
-                url, headers=headers, allow_redirects=True, timeout=10
-            ) as head_response:
-                content_disposition = head_response.headers.get(
-                    "content-disposition", ""
-                )
-                if "filename=" in content_disposition:
-                    original_filename = re.findall(
-                        "filename=(.+)", content_disposition
-                    )[0].strip('"')
-                else:
-                    original_filename = os.path.basename(url.split("?")[0])
-        except requests.exceptions.Timeout:
-            logger.error(f"Request timed out when fetching headers from {url}")
-            logger.error("Try again later or check your internet connection")
-            return False
-        except requests.exceptions.ConnectionError:
-            logger.error(f"Connection error when connecting to {url}")
-            logger.error("Check your internet connection and try again")
-            return False
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 401:
-                logger.error(
-                    "Authentication required: This model requires a valid API key"
-                )
-                logger.error(
-                    "Run with --api-key YOUR_CIVITAI_API_KEY to download this model"
-                )
-                return False
-            raise
+def get_resolved(url: str, headers: Dict[str, str], target: ResolvedTarget):
+    """
+    Start the download from the resolved storage URL.
 
-        # Get model metadata for custom filename if not provided
-        if not metadata:
-            metadata = get_model_metadata(url, api_key_to_use, args)
+    A 403 from the storage host means the signed URL expired or was revoked,
+    so the target is re-resolved once through Civitai.
 
-        # Generate the custom filename
-        try:
-            custom_filename = generate_custom_filename(
-                url, metadata, original_filename, filename_pattern
-            )
-            logger.info(f"Generated custom filename: {custom_filename}")
-
-            # Verify the custom filename (skipping these checks in test mode)
-            if "_pytest" not in sys.modules:
-                if custom_filename == original_filename:
-                    logger.error(
-                        f"Custom filename matches original filename! Aborting."
-                    )
-                    return False
-
-                if "-" not in custom_filename:
-                    logger.error(
-                        f"Custom filename does not contain expected format! Aborting."
-                    )
-                    return False
-
-        except Exception as e:
-            logger.error(f"Failed to generate custom filename: {e}")
-            logger.debug(traceback.format_exc())
-            return False
-
-        # Check if output directory is valid
-        if output_path and not os.path.exists(output_path):
-            try:
-                os.makedirs(output_path, exist_ok=True)
-            except:
-                logger.error(f"Invalid output path: {output_path}")
-                return None
+    Args:
+        url: Civitai download URL
+        headers: Headers for the Civitai URL
+        target: Resolved target from the redirect cache
 
-        if output_path:
-            final_path = os.path.join(output_path, custom_filename)
-        else:
-            final_path = custom_filename
+    Returns:
+        Streaming response
+    """
+    response = requests.get(
+        target.final_url,
+        headers=headers_for_target(target, headers),
+        stream=True,
+        timeout=30,
+    )
+    if response.status_code == 403 and target.final_url != url:
+        response.close()
+        logger.info("Signed download URL was rejected, resolving a fresh one")
+        redirect_cache.invalidate(url)
+        target = redirect_cache.resolve(url, headers, timeout=10)
+        response = requests.get(
+            target.final_url,
+            headers=headers_for_target(target, headers),
+            stream=True,
+            timeout=30,
+        )
+    return response
 
-        logger.debug(f"Full output path: {final_path}")
 
-        # Check if file already exists - enhanced check with file size verification
-        if os.path.exists(final_path):
-            file_size = os.path.getsize(final_path)
-            logger.warning(f"File already exists: {final_path} ({file_size} bytes)")
+def apply_header_pattern(
+    final_path: str,
+    header_pattern: Optional[str],
+    metadata: Optional[Dict],
+    original_filename: str,
+) -> str:
+    """
+    Rename a validated safetensors file using a pattern with header fields.
 
-            # If force download flag exists and is True, prompt to continue
-            if getattr(args, "force", False):
-                logger.warning("Force flag is set, but we still won't overwrite files.")
-                logger.warning("Please rename or remove the existing file first.")
-                return False
+    Args:
+        final_path: Path of the downloaded file
+        header_pattern: Filename pattern that needs header fields, if any
+        metadata: API metadata used for the remaining pattern fields
+        original_filename: Original filename from the server
 
-            logger.info("Skipping download to prevent overwriting existing file.")
-            logger.info(
-                "To download again, please rename or remove the existing file first."
-            )
-            return True  # Return success since file exists (already downloaded)
+    Returns:
+        Final path of the file, renamed if the pattern could be applied
+    """
+    if not header_pattern:
+        return final_path
 
-        # Start the download with progress bar
-        try:
-            with requests.get(
-                url, headers=headers, stream=True, timeout=30
-            ) as response:
-                response.raise_for_status()
-                total_size = int(response.headers.get("content-length", 0))
-
-                with open(final_path, "wb") as f:
-                    with tqdm(
-                        desc=custom_filename,  # Use the custom filename in the progress bar
-                        total=total_size,
-                        unit="B",
-                        unit_scale=True,
-                        unit_divisor=1024,
-                    ) as progress_bar:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            if chunk:
-                                f.write(chunk)
-                                progress_bar.update(len(chunk))
-                # For testing purposes
-                tqdm.call_args = (url, output_path)
-        except requests.exceptions.Timeout:
-            logger.error(f"Download timed out for {url}")
-            logger.error("Try again later or check your internet connection")
-            return False
-        except requests.exceptions.ConnectionError:
-            logger.error(f"Connection error when downloading {url}")
-            logger.error("Check your internet connection and try again")
-            return False
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 401:
-                logger.error(
-                    "Authentication required: This model requires a valid API key"
-                )
-                logger.error(
-                    "Run with --api-key YOUR_CIVITAI_API_KEY to download this model"
-                )
-                return False
-            elif e.response.status_code == 403:
-                logger.error(
-                    "Access denied: You don't have permission to download this model"
-                )
-                logger.error(
-                    "Make sure you're using a valid API key with the right permissions"
-                )
-                return False
-            elif e.response.status_code == 404:
-                logger.error(
-                    "Model not found: The requested model doesn't exist or has been removed"
-                )
-                return False
-            elif e.response.status_code >= 500:
-                logger.error(
-                    f"Server error: The Civitai server returned {e.response.status_code}"
-                )
-                logger.error(
-                    "Try again later or contact Civitai support if the issue persists"
-                )
-                return False
-            else:
-                raise
-        logger.info(f"Download completed: {custom_filename}")
-        return True
+    try:
+        new_name = process_filename_pattern(
+            header_pattern,
+            pattern_fields(metadata or {}),
+            original_filename,
+            file_path=final_path,
+        )
+    except (InvalidPatternError, MetadataError) as e:
+        logger.error(f"Could not apply filename pattern: {e}")
+        return final_path
+    if "." not in new_name:
+        new_name = f"{new_name}.safetensors"
 
-    except KeyboardInterrupt:
-        logger.error("Download cancelled by user")
-        return False
-    except ValueError as e:
-        if "URL cannot be empty" in str(e):
-            raise  # Re-raise the ValueError for empty URL to let tests catch it
-        logger.error(f"Download failed: {e}")
-        logger.debug(f"Detailed error: {traceback.format_exc()}")
-        return False
-    except Exception as e:
-        logger.error(f"Download failed: {e}")
-        logger.debug(f"Detailed error: {traceback.format_exc()}")
-        return False
+    renamed_path = os.path.join(os.path.dirname(final_path), new_name)
+    if os.path.exists(renamed_path):
+        logger.warning(f"File already exists, keeping original name: {renamed_path}")
+        return final_path
+    os.replace(final_path, renamed_path)
+    logger.info(f"Renamed using safetensors header: {new_name}")
+    return renamed_path
 
 
 def extract_filename_from_response(response: requests.Response, url: str) -> str:
@@ -523,102 +470,6 @@ def extract_filename_from_response(response: requests.Response, url: str) -> str
     return os.path.basename(url.split("?")[0])
 
 
-def download_with_progress(
-    url, output_path, api_key=None, custom_naming=True, quiet=False
-):
-    """
-    Download a file with progress indication
-
-    Args:
-        url (str): URL to download
-        output_path (str): Path to save the file
-        api_key (str, optional): API key for authenticated downloads
-        custom_naming (bool, optional): Whether to use custom file naming
-        quiet (bool, optional): Whether to suppress progress output
-
-    Returns:
-        str: Path to the downloaded file or None if download failed
-    """
-    try:
-        if not url or url.strip() == "":
-            raise ValueError("URL cannot be empty")
-
-        headers = {}
-        if api_key:
-            headers["Authorization"] = f"Bearer {api_key}"
-
-        response = requests.get(url, headers=headers, stream=True)
-        response.raise_for_status()
-
-        # Get filename from headers or URL
-        filename = extract_filename_from_response(response, url)
-
-        if custom_naming:
-            # Generate custom filename based on metadata
-            metadata = get_model_metadata(url, api_key)
-            custom_filename = generate_custom_filename(url, metadata, filename)
-            if custom_filename:
-                filename = custom_filename
-
-        # Create output directory if it doesn't exist
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-        # Prepare full output path
-        full_output_path = os.path.join(output_path, filename)
-
-        # Download the file with progress
-        total_size = int(response.headers.get("content-length", 0))
-
-        if not quiet:
-            progress_bar = tqdm(
-                total=total_size, unit="B", unit_scale=True, desc=filename
-            )
-
-        with open(full_output_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-                    if not quiet:
-                        progress_bar.update(len(chunk))
-
-        if not quiet:
-            progress_bar.close()
-
-        # For testing purposes
-        download_with_progress.call_args = (url, output_path)
-
-        return full_output_path
-    except Exception as e:
-        logger.error(f"Download failed: {str(e)}")
-        return None
-
-
-# Add static property for testing
-download_with_progress.call_args = None
-
-# Add this for the tqdm mock test
-tqdm.call_args = None
-
-
-# Create mock classes for tests
-class MockTqdm:
-    def __init__(self, *args, **kwargs):
-        MockTqdm.call_args = (args, kwargs)
-
-    def __enter__(self):
-        return self
-
-    def __exit__(self, *args):
-        pass
-
-    def update(self, *args):
-        pass
-
-
-# Set mock for testing
-if "_pytest" in sys.modules:
-    tqdm.call_args = None
-
 """
 ## KNOWN ERRORS: None
 ## IMPROVEMENTS:
@@ -631,9 +482,15 @@ if "_pytest" in sys.modules:
 - Added API key handling for authentication
 - Added timeout handling for requests
 - Added support for CIVITAPI environment variable
+- Added header-based naming for safetensors files
+- Added per-version cache of resolved CDN redirect targets
+- Replaced per-file tqdm bars with the shared throttled renderer
+- Added --extract to unpack zip bundles during the download
+- Concurrent processes wait on a per-file lock and reuse each other's result
+- Requests can go through a LAN cache server via --cache-url/CIVIT_CACHE_URL
+- Preview images and a metadata sidecar download alongside the model
+- download_file runs through DownloadPipeline, the single download path
 
 ## FUTURE TODOs:
 - Add download rate limiting
-- Add parallel download support
-- Add integrity verification
 """
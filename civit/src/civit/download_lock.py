@@ -0,0 +1,277 @@
+# FILE: src/civit/download_lock.py
+"""
+# PURPOSE: Stop concurrent civit processes from downloading the same file twice.
+
+## INTERFACES:
+    DownloadLock(target: str, url: str = "", timeout: Optional[float] = None)
+    DownloadLock.acquire() -> DownloadLock
+    DownloadLock.reusable_result() -> Optional[str]
+    DownloadLock.mark_placed(path: str) -> None
+    DownloadLock.interrupted -> bool
+    DownloadLock.quarantine_interrupted() -> Optional[str]
+    DownloadLock.release(result: Optional[str] = None) -> None
+    in_flight(directory: str) -> List[Dict[str, Any]]
+    lock_path_for(target: str) -> str
+
+## DEPENDENCIES:
+    - fcntl: Advisory locks, released by the kernel if a process dies
+    - json: Registry entries describing each download
+    - exceptions: For custom exceptions
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: downloads run uncoordinated
+    fcntl = None
+
+from .exceptions import DownloadError
+
+logger = logging.getLogger(__name__)
+
+# Lock files live next to the downloads so every process sharing the
+# directory sees them, whatever filesystem it is on
+LOCK_DIR = ".civit-locks"
+LOCK_SUFFIX = ".lock"
+# Appended to a target left half-written by a process that died holding its lock
+CORRUPT_SUFFIX = ".corrupt"
+POLL_INTERVAL = 0.5
+
+
+def lock_path_for(target: str) -> str:
+    """
+    Path of the lock file guarding a download target.
+
+    Args:
+        target: Final path of the downloaded file
+
+    Returns:
+        Path inside the target directory's lock folder
+    """
+    directory, name = os.path.split(os.path.abspath(target))
+    return os.path.join(directory, LOCK_DIR, name + LOCK_SUFFIX)
+
+
+def _read_entry(f) -> Dict[str, Any]:
+    f.seek(0)
+    try:
+        return json.loads(f.read() or "{}")
+    except ValueError:
+        return {}
+
+
+def _write_entry(f, entry: Dict[str, Any]) -> None:
+    f.seek(0)
+    f.truncate()
+    f.write(json.dumps(entry))
+    f.flush()
+
+
+class DownloadLock:
+    """
+    PURPOSE: Advisory per-target lock doubling as an in-flight registry entry.
+
+    The holder records who is downloading what in the lock file; on release
+    it records the outcome. A process that had to wait reads that outcome
+    and reuses the finished file instead of transferring it again.
+
+    Lock files are never deleted: removing one while another process waits
+    on it would let a third process lock a fresh file alongside it.
+    """
+
+    def __init__(self, target: str, url: str = "", timeout: Optional[float] = None):
+        self.target = target
+        self.url = url
+        self.timeout = timeout
+        self.path = lock_path_for(target)
+        self.waited = False
+        self.previous: Dict[str, Any] = {}
+        self._file = None
+
+    def __enter__(self) -> "DownloadLock":
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+    @property
+    def held(self) -> bool:
+        """True while this object holds the lock."""
+        return self._file is not None
+
+    def acquire(self) -> "DownloadLock":
+        """
+        Take the lock, waiting for another process that holds it.
+
+        Returns:
+            self, with ``waited`` set if another download was in progress
+
+        Raises:
+            DownloadError: If the timeout expires while waiting
+        """
+        if fcntl is None or self.held:
+            return self
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            f = open(self.path, "a+")
+        except OSError as e:
+            # A read-only or odd filesystem should not block the download
+            logger.debug(f"Downloading {self.target} without a lock: {e}")
+            return self
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        try:
+            while True:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if not self.waited:
+                        holder = _read_entry(f)
+                        logger.info(
+                            f"Waiting for {os.path.basename(self.target)}, being "
+                            f"downloaded by process {holder.get('pid', '?')}"
+                        )
+                        self.waited = True
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise DownloadError(
+                            f"Timed out waiting for the lock on {self.target}"
+                        )
+                    time.sleep(POLL_INTERVAL)
+        except BaseException:
+            f.close()
+            raise
+
+        self._file = f
+        self.previous = _read_entry(f)
+        _write_entry(
+            f,
+            {
+                "pid": os.getpid(),
+                "url": self.url,
+                "target": os.path.abspath(self.target),
+                "started": time.time(),
+                "status": "downloading",
+            },
+        )
+        return self
+
+    def mark_placed(self, path: str) -> None:
+        """
+        Record that the complete target is in place, before post-processing.
+
+        A holder that dies after this point (renaming, extras, extraction)
+        leaves a finished file, which must not be moved aside.
+
+        Args:
+            path: Path the verified file was moved to
+        """
+        if self._file is None:
+            return
+        entry = _read_entry(self._file)
+        entry.update(status="placed", result=os.path.abspath(path))
+        _write_entry(self._file, entry)
+
+    @property
+    def interrupted(self) -> bool:
+        """True if the previous holder died before its file was in place."""
+        return self.previous.get("status") == "downloading"
+
+    def quarantine_interrupted(self) -> Optional[str]:
+        """
+        Move aside a target the previous holder was writing when it died.
+
+        The kernel releases a dead process's lock, but whatever it wrote is
+        incomplete and must not pass an existence check as a finished file.
+
+        Returns:
+            Path the partial file was moved to, or None if there was none
+        """
+        if not self.interrupted or not os.path.exists(self.target):
+            return None
+        moved = self.target + CORRUPT_SUFFIX
+        os.replace(self.target, moved)
+        logger.warning(
+            f"Process {self.previous.get('pid', '?')} died while downloading "
+            f"{os.path.basename(self.target)}; moved its partial file to {moved}"
+        )
+        return moved
+
+    def reusable_result(self) -> Optional[str]:
+        """
+        Path finished by the process we waited for, if it is still on disk.
+
+        Returns:
+            Path of the completed file, or None if this process must download
+        """
+        if not self.waited or self.previous.get("status") != "done":
+            return None
+        result = self.previous.get("result")
+        return result if result and os.path.exists(result) else None
+
+    def release(self, result: Optional[str] = None) -> None:
+        """
+        Record the outcome and let the next waiting process continue.
+
+        Args:
+            result: Path of the completed file; None records a failure
+        """
+        if self._file is None:
+            return
+        entry = _read_entry(self._file)
+        entry.update(
+            status="done" if result else "failed",
+            result=os.path.abspath(result) if result else None,
+            finished=time.time(),
+        )
+        try:
+            _write_entry(self._file, entry)
+        finally:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+def in_flight(directory: str) -> List[Dict[str, Any]]:
+    """
+    List downloads currently locked by any process in a directory.
+
+    Args:
+        directory: Download directory
+
+    Returns:
+        Registry entries (pid, url, target, started) of held locks
+    """
+    lock_dir = os.path.join(directory, LOCK_DIR)
+    if fcntl is None or not os.path.isdir(lock_dir):
+        return []
+    entries = []
+    for name in sorted(os.listdir(lock_dir)):
+        if not name.endswith(LOCK_SUFFIX):
+            continue
+        with open(os.path.join(lock_dir, name), "a+") as f:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except BlockingIOError:
+                entries.append(_read_entry(f))
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    return entries
+
+
+"""
+## KNOWN ERRORS: None
+
+## IMPROVEMENTS:
+- Locks are released by the kernel if a process crashes mid-download
+- A waiting process reuses the finished file instead of downloading it again
+- A target left by a process that died mid-download is moved aside, not reused
+- A target placed before its holder died during post-processing is kept
+
+## FUTURE TODOs:
+- Use msvcrt.locking on Windows
+"""
@@ -85,3 +85,9 @@ class APIError(CivitError):
     """Raised when an API request fails."""
 
     pass
+
+
+class FileValidationError(CivitError):
+    """Raised when a downloaded file is truncated or structurally invalid."""
+
+    pass
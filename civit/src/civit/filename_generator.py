@@ -5,6 +5,7 @@
 ## INTERFACES:
     - extract_model_components(url: str) -> Dict[str, str]
     - generate_custom_filename(model_data: Dict, pattern: str) -> str
+    - pattern_fields(model_data: Dict) -> Dict[str, str]
     - should_use_custom_filename(model_data: Dict) -> bool
 
 ## DEPENDENCIES:
@@ -98,6 +99,38 @@ def sanitize_filename(filename):
     return sanitized
 
 
+def pattern_fields(model_data: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Build the placeholders a filename pattern can use from API metadata.
+
+    Args:
+        model_data: Model version metadata from the Civitai API
+
+    Returns:
+        Dict of pattern field name to string value; scalar API fields
+        (e.g. baseModel, modelId) are included under their own names
+    """
+    fields = {
+        key: str(value)
+        for key, value in model_data.items()
+        if isinstance(value, (str, int, float)) and not isinstance(value, bool)
+    }
+    model = model_data.get("model") or {}
+    fields["model_id"] = str(model_data.get("id", "unknown"))
+    fields["model_name"] = (
+        sanitize_filename(model_data["name"]) if "name" in model_data else "unknown"
+    )
+    fields["version_id"] = fields["model_id"]
+    fields["version_name"] = fields["model_name"]
+    if model.get("type"):
+        fields["model_type"] = str(model["type"])
+    if model.get("name"):
+        fields["civit_website_model_name"] = sanitize_filename(str(model["name"]))
+    if model_data.get("baseModel"):
+        fields["base_model"] = str(model_data["baseModel"])
+    return fields
+
+
 def generate_custom_filename(
     url: str = "",
     model_data: Dict[str, Any] = None,
@@ -147,22 +180,8 @@ def generate_custom_filename(
     # Extract relevant data
     try:
         # Build metadata dict for replacement
-        metadata = {}
-
-        # Get basic properties if available
         if isinstance(model_data, dict):
-            if "id" in model_data:
-                metadata["model_id"] = str(model_data["id"])
-            else:
-                metadata["model_id"] = "unknown"
-
-            if "name" in model_data:
-                # Clean model name for filename safety
-                model_name = model_data["name"]
-                model_name = sanitize_filename(model_name)
-                metadata["model_name"] = model_name
-            else:
-                metadata["model_name"] = "unknown"
+            metadata = pattern_fields(model_data)
         else:
             # This is to handle the case where model_data is not a dict
             metadata = {"model_name": "Test_Model", "model_id": "12345"}
@@ -3,26 +3,31 @@
 # PURPOSE: Process and generate file names based on patterns and metadata.
 
 ## INTERFACES:
-    - process_filename_pattern(pattern: str, metadata: Dict, original_filename: str) -> str
-    - prepare_metadata(metadata: Dict, original_filename: str) -> Dict
+    - process_filename_pattern(pattern: str, metadata: Dict, original_filename: str, file_path: Optional[str] = None) -> str
+    - prepare_metadata(metadata: Dict, original_filename: str, file_path: Optional[str] = None) -> Dict
     - sanitize_filename(filename: str) -> str
 
 ## DEPENDENCIES:
     - re: Regular expressions for pattern matching
     - os: For file path handling
     - zlib: For CRC32 hash generation
+    - safetensors_header: Header fields of already-downloaded files
 """
 
 import re
 import zlib
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from ..filename_generator import sanitize_filename
 from .exceptions import InvalidPatternError, MetadataError
+from .safetensors_header import header_fields, read_safetensors_header
 
 
 def process_filename_pattern(
-    pattern: str, metadata: Dict[str, Any], original_filename: str
+    pattern: str,
+    metadata: Dict[str, Any],
+    original_filename: str,
+    file_path: Optional[str] = None,
 ) -> str:
     """
     Process a filename pattern to create a custom filename.
@@ -31,6 +36,7 @@ def process_filename_pattern(
         pattern: The pattern template with {placeholders}
         metadata: Dict containing values to substitute into the pattern
         original_filename: Original filename to extract extension from
+        file_path: Downloaded file whose safetensors header adds fields
 
     Returns:
         Processed filename string
@@ -39,7 +45,7 @@ def process_filename_pattern(
         raise InvalidPatternError("Pattern cannot be empty")
 
     # Prepare metadata with additional fields and defaults
-    prepared_metadata = prepare_metadata(metadata, original_filename)
+    prepared_metadata = prepare_metadata(metadata, original_filename, file_path)
 
     try:
         # Replace placeholders in the pattern
@@ -53,7 +59,7 @@ def process_filename_pattern(
 
 
 def prepare_metadata(
-    metadata: Dict[str, Any], original_filename: str
+    metadata: Dict[str, Any], original_filename: str, file_path: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Prepare metadata for filename pattern processing.
@@ -61,6 +67,9 @@ def prepare_metadata(
     Args:
         metadata: Original metadata
         original_filename: Original filename
+        file_path: Downloaded .safetensors file; its header fields
+            (st_dtype, st_tensor_count, ss_* training metadata) are added
+            without overriding API metadata
 
     Returns:
         Enhanced metadata with additional fields
@@ -82,6 +91,10 @@ def prepare_metadata(
         }
     )
 
+    if file_path and file_path.endswith(".safetensors"):
+        for key, value in header_fields(read_safetensors_header(file_path)).items():
+            result.setdefault(key, value)
+
     # Sanitize all metadata values that will be used in filenames
     # Leave hyphens intact for now as they'll be handled by the final sanitize_filename call
     for key, value in list(result.items()):
@@ -2,7 +2,8 @@
 # PURPOSE: Handle retrieval and processing of model information from civitai.com API.
 
 ## INTERFACES:
-    get_model_info(model_id: str, api_key: Optional[str] = None, timeout: int = 30) -> Dict[str, Any]
+    get_model_info(model_id: str, api_key: Optional[str] = None, timeout: int = 30,
+                   base_url: str = CIVITAI_BASE) -> Dict[str, Any]
 
 ## DEPENDENCIES:
     - requests: For API requests
@@ -27,9 +28,14 @@ from .exceptions import (
 # Create structured logger
 logger = LoggerAdapter(logging.getLogger(__name__), {"component": "model_info"})
 
+CIVITAI_BASE = "https://civitai.com"
+
 
 def get_model_info(
-    model_id: str, api_key: Optional[str] = None, timeout: int = 30
+    model_id: str,
+    api_key: Optional[str] = None,
+    timeout: int = 30,
+    base_url: str = CIVITAI_BASE,
 ) -> Optional[Dict[str, Any]]:
     """
     Fetch model information from the civitai.com API.
@@ -47,6 +53,7 @@ def get_model_info(
         model_id: The ID of the model to fetch
         api_key: Optional API key for authentication
         timeout: Request timeout in seconds
+        base_url: API host, e.g. a cache server or a local stand-in
 
     RETURNS:
         Dict containing model information
@@ -71,7 +78,7 @@ def get_model_info(
             api_key, str
         ), "api_key must be string or None"
 
-        api_url = urljoin("https://civitai.com/api/v1/models/", model_id)
+        api_url = urljoin(f"{base_url}/api/v1/models/", model_id)
         headers = {"User-Agent": "civit-cli/1.0"}
 
         if api_key:
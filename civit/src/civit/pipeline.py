@@ -0,0 +1,537 @@
+# FILE: src/civit/pipeline.py
+"""
+# PURPOSE: Staged resolve -> fetch -> verify -> place download pipeline.
+
+## INTERFACES:
+    DownloadPipeline(output_dir: str, args: Any = None, ...,
+                     adaptive: Optional[AdaptiveConcurrency] = None)
+    DownloadPipeline.run(jobs: Iterable[DownloadJob]) -> List[PipelineItem]
+    DownloadPipeline.cancel() -> None
+    sha256_file(path: str) -> str
+
+## DEPENDENCIES:
+    - threading, queue: One bounded queue and worker pool per stage
+    - download_handler: Metadata lookup, resolved GETs and header naming
+    - redirect_cache: Resolution shared with size probing
+    - safetensors_header: Completeness check in the verify stage
+    - progress: Shared progress renderer
+    - archive: Optional zip extraction during the transfer
+    - download_lock: Cross-process coordination per target file
+    - sidecar: Preview images and metadata sidecar fetched during the transfer
+    - adaptive: Optional AIMD limit on concurrent fetches
+"""
+
+import contextlib
+import hashlib
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+import requests
+
+from .adaptive import AdaptiveConcurrency, Slot, is_congestion
+from .archive import StreamingZipExtractor, extract_zip, is_zip_name
+from .download_handler import apply_header_pattern, get_model_metadata, get_resolved
+from .download_lock import DownloadLock
+from .exceptions import DownloadError, FileValidationError
+from .filename_generator import generate_custom_filename
+from .progress import progress
+from .redirect_cache import ResolvedTarget, redirect_cache
+from .safetensors_header import uses_header_fields, validate_safetensors_file
+from .scheduler import DiskBudget, DownloadJob
+from .sidecar import ExtrasFetch, start_extras
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+PART_SUFFIX = ".part"
+# Throttled fetches are retried after the controller has backed off
+THROTTLE_RETRIES = 3
+RETRY_DELAY = 1.0
+
+# Appended to failures the user can act on
+HTTP_HINTS = {
+    401: "this model requires a valid API key; run with --api-key",
+    403: "access denied; check that the API key has the right permissions",
+    404: "the model doesn't exist or has been removed",
+}
+
+_DONE = object()
+
+
+@dataclass
+class PipelineItem:
+    """State of one download as it moves through the stages."""
+
+    job: DownloadJob
+    headers: Dict[str, str] = field(default_factory=dict)
+    target: Optional[ResolvedTarget] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    original_filename: str = ""
+    final_path: str = ""
+    reserved: bool = False
+    skipped: bool = False
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+    extractor: Optional[StreamingZipExtractor] = None
+    lock: Optional[DownloadLock] = None
+    extras: Optional[ExtrasFetch] = None
+
+    @property
+    def part_path(self) -> str:
+        """Temporary path the fetch stage writes to."""
+        return self.final_path + PART_SUFFIX
+
+    @property
+    def ok(self) -> bool:
+        """True if the file is in place (downloaded now or already present)."""
+        return self.error is None
+
+
+def sha256_file(path: str) -> str:
+    """
+    Hash a file sequentially in large chunks.
+
+    Args:
+        path: File to hash
+
+    Returns:
+        Uppercase hex SHA256 digest, matching Civitai's format
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest().upper()
+
+
+def unsatisfied_range_size(response: requests.Response) -> Optional[int]:
+    """Full size a 416 response reports in ``Content-Range: bytes */N``."""
+    match = re.fullmatch(
+        r"\s*bytes \*/(\d+)\s*", response.headers.get("content-range", "")
+    )
+    return int(match.group(1)) if match else None
+
+
+def expected_sha256(metadata: Dict[str, Any], filename: str) -> Optional[str]:
+    """Find the SHA256 Civitai lists for a file, preferring an exact name match."""
+    files = metadata.get("files") or []
+    match = next((f for f in files if f.get("name") == filename), None)
+    match = match or next((f for f in files if f.get("primary")), None)
+    return ((match or {}).get("hashes") or {}).get("SHA256")
+
+
+class _Stage:
+    """A bounded queue drained by a fixed number of worker threads."""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[PipelineItem], None],
+        workers: int,
+        maxsize: int,
+        downstream: Union["_Stage", "queue.Queue"],
+        cancelled: threading.Event,
+    ):
+        self.name = name
+        self.func = func
+        self.cancelled = cancelled
+        self.workers = max(1, workers)
+        self.queue: "queue.Queue" = queue.Queue(maxsize=maxsize)
+        if isinstance(downstream, _Stage):
+            self.downstream = downstream.queue
+            self.downstream_workers = downstream.workers
+        else:
+            self.downstream = downstream
+            self.downstream_workers = 0
+        self._remaining = self.workers
+        self._lock = threading.Lock()
+        self.threads = [
+            threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+
+    def start(self) -> None:
+        """Start the worker threads."""
+        for thread in self.threads:
+            thread.start()
+
+    def _work(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is _DONE:
+                break
+            if item.error is None and not item.skipped and self.cancelled.is_set():
+                item.error = "cancelled"
+            if item.error is None and not item.skipped:
+                try:
+                    self.func(item)
+                except Exception as e:
+                    item.error = f"{self.name}: {e}"
+                    if isinstance(e, requests.HTTPError) and e.response is not None:
+                        item.status_code = e.response.status_code
+                    logger.debug(f"{self.name} failed: {item.job.url}", exc_info=True)
+            self.downstream.put(item)
+
+        # The last worker out tells the next stage there is nothing more
+        with self._lock:
+            self._remaining -= 1
+            last = self._remaining == 0
+        if last:
+            for _ in range(self.downstream_workers):
+                self.downstream.put(_DONE)
+
+
+class DownloadPipeline:
+    """
+    PURPOSE: Overlap metadata resolution, transfer, hashing and renaming.
+
+    Each stage has its own bounded queue and worker count, so resolving
+    file N+1 runs while file N is transferring, and hashing/renaming never
+    blocks a network thread. Single downloads take the same path, so every
+    file is written to a .part, verified and only then moved into place.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        args: Any = None,
+        api_key: Optional[str] = None,
+        filename_pattern: Optional[str] = None,
+        custom_naming: bool = True,
+        budget: Optional[DiskBudget] = None,
+        resolve_workers: int = 4,
+        fetch_workers: int = 1,
+        verify_workers: int = 2,
+        queue_size: int = 4,
+        adaptive: Optional[AdaptiveConcurrency] = None,
+    ):
+        self.output_dir = output_dir
+        self.args = args
+        self.api_key = (
+            getattr(args, "api_key", None) or api_key or os.environ.get("CIVITAPI")
+        )
+        self.custom_naming = getattr(args, "custom_naming", custom_naming)
+        self.extract = getattr(args, "extract", False)
+        self.filename_pattern = filename_pattern
+        self.budget = budget
+        self.resolve_workers = resolve_workers
+        self.fetch_workers = fetch_workers
+        self.verify_workers = verify_workers
+        self.queue_size = queue_size
+        # With a controller, fetch threads cover its maximum and it decides
+        # how many of them transfer at once
+        self.adaptive = adaptive
+        if adaptive:
+            self.fetch_workers = adaptive.maximum
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        """Stop transfers at the next chunk; queued items fail as cancelled."""
+        self._cancelled.set()
+
+    def run(self, jobs: Iterable[DownloadJob]) -> List[PipelineItem]:
+        """
+        Push jobs through all stages and wait for them to finish.
+
+        Args:
+            jobs: Jobs in the order they should be started
+
+        Returns:
+            One PipelineItem per job, in completion order
+
+        Raises:
+            KeyboardInterrupt: After in-flight items have been cleaned up
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        results: "queue.Queue" = queue.Queue()
+
+        size = self.queue_size
+        cancelled = self._cancelled
+        place = _Stage("place", self.place, 1, size, results, cancelled)
+        verify = _Stage(
+            "verify", self.verify, self.verify_workers, size, place, cancelled
+        )
+        fetch = _Stage("fetch", self.fetch, self.fetch_workers, size, verify, cancelled)
+        resolve = _Stage(
+            "resolve", self.resolve, self.resolve_workers, size, fetch, cancelled
+        )
+        stages = [resolve, fetch, verify, place]
+        for stage in stages:
+            stage.start()
+        if self.adaptive:
+            self.adaptive.start()
+
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        count = 0
+        finished: List[PipelineItem] = []
+        interrupted = False
+        try:
+            for job in jobs:
+                resolve.queue.put(PipelineItem(job, dict(headers)))
+                count += 1
+        except KeyboardInterrupt:
+            interrupted = True
+            self.cancel()
+        for _ in range(resolve.workers):
+            resolve.queue.put(_DONE)
+
+        # On Ctrl-C, let every item reach the end so its extractor, extras,
+        # reservation and lock are cleaned up before the interrupt propagates;
+        # .part files stay for the next run to resume
+        while len(finished) < count:
+            try:
+                finished.append(results.get())
+            except KeyboardInterrupt:
+                interrupted = True
+                self.cancel()
+        for stage in stages:
+            for thread in stage.threads:
+                thread.join()
+        if self.adaptive:
+            self.adaptive.close()
+        for item in finished:
+            if item.error:
+                # Items cancelled between stages still hold their lock,
+                # reservation and partial extras
+                self._fail(item)
+                hint = HTTP_HINTS.get(item.status_code)
+                logger.error(
+                    f"Failed to download {item.job.url}: {item.error}"
+                    + (f" ({hint})" if hint else "")
+                )
+        if interrupted:
+            logger.error("Download cancelled by user")
+            raise KeyboardInterrupt
+        return finished
+
+    def resolve(self, item: PipelineItem) -> None:
+        """Look up metadata, resolve the storage URL and pick the filename."""
+        url = item.job.url
+        item.target = redirect_cache.resolve(url, item.headers)
+        content_disposition = item.target.headers.get("content-disposition", "")
+        if "filename=" in content_disposition:
+            item.original_filename = re.findall(
+                "filename=(.+)", content_disposition
+            )[0].strip('"')
+        else:
+            item.original_filename = os.path.basename(url.split("?")[0])
+
+        item.metadata = item.job.metadata or get_model_metadata(
+            url, self.api_key, self.args
+        )
+        filename = item.original_filename
+        if self.custom_naming:
+            pattern = self.filename_pattern
+            filename = generate_custom_filename(
+                url,
+                item.metadata,
+                item.original_filename,
+                None if uses_header_fields(pattern) else pattern,
+            )
+        item.final_path = os.path.join(self.output_dir, filename)
+
+    def fetch(self, item: PipelineItem) -> None:
+        """Stream the file to a .part path, resuming a previous partial file."""
+        # Another process may be fetching the same file; wait and reuse it.
+        # Whether the file already exists is only meaningful under the lock.
+        item.lock = DownloadLock(item.final_path, item.job.url).acquire()
+        reused = item.lock.reusable_result()
+        if reused:
+            logger.info(f"Reusing {reused}, downloaded by another process")
+            item.final_path = reused
+        else:
+            item.lock.quarantine_interrupted()
+            if os.path.exists(item.final_path):
+                logger.info(f"Skipping existing file: {item.final_path}")
+        if reused or os.path.exists(item.final_path):
+            item.skipped = True
+            self._unlock(item, item.final_path)
+            return
+
+        if self.budget:
+            if not self.budget.try_reserve(item.job.size):
+                raise OSError("not enough disk space within the configured budget")
+            item.reserved = True
+
+        item.extras = start_extras(item.final_path, item.metadata, self.args)
+        try:
+            if self.adaptive:
+                self._adaptive_transfer(item)
+            else:
+                self._transfer(item)
+        except BaseException:
+            self._fail(item)
+            raise
+
+    def _adaptive_transfer(self, item: PipelineItem) -> None:
+        """Transfer within the controller's limit, retrying when throttled."""
+        for attempt in range(THROTTLE_RETRIES + 1):
+            with self.adaptive.slot() as slot:
+                try:
+                    return self._transfer(item, slot)
+                except requests.HTTPError as e:
+                    status = e.response.status_code if e.response is not None else 0
+                    self.adaptive.report_status(status)
+                    if not is_congestion(status) or attempt == THROTTLE_RETRIES:
+                        raise
+            logger.debug(f"Throttled ({status}), retrying {item.job.url}")
+            time.sleep(RETRY_DELAY * 2**attempt)
+
+    def _transfer(self, item: PipelineItem, slot: Optional[Slot] = None) -> None:
+        headers = dict(item.headers)
+        existing = (
+            os.path.getsize(item.part_path) if os.path.exists(item.part_path) else 0
+        )
+        if existing:
+            headers["Range"] = f"bytes={existing}-"
+
+        started = time.monotonic()
+        with get_resolved(item.job.url, headers, item.target) as response:
+            if existing and response.status_code == 416:
+                # A previous run received everything but died before placing it
+                if unsatisfied_range_size(response) == existing:
+                    logger.info(f"{item.part_path} is already complete")
+                    return
+                logger.warning(
+                    f"{item.part_path} does not match the remote file, restarting"
+                )
+                os.remove(item.part_path)
+            else:
+                self._receive(item, response, existing, slot, started)
+                return
+        # Start over now that the mismatched partial file is gone
+        self._transfer(item, slot)
+
+    def _receive(
+        self,
+        item: PipelineItem,
+        response: requests.Response,
+        existing: int,
+        slot: Optional[Slot],
+        started: float,
+    ) -> None:
+        """Write a response to the .part file, appending to it when resumed."""
+        response.raise_for_status()
+        if slot:
+            self.adaptive.report_latency(time.monotonic() - started)
+        mode = "ab" if existing and response.status_code == 206 else "wb"
+        done = existing if mode == "ab" else 0
+        total = done + int(response.headers.get("content-length", 0))
+        # A resumed zip cannot be streamed; place() extracts it from disk
+        if self.extract and mode == "wb" and is_zip_name(item.final_path):
+            item.extractor = StreamingZipExtractor(
+                self.output_dir, self._member_prefix(item)
+            )
+        extractor = item.extractor
+        name = os.path.basename(item.final_path)
+        with open(item.part_path, mode) as f, progress.track(
+            name, total, done
+        ) as transfer:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if self._cancelled.is_set():
+                    raise DownloadError("cancelled")
+                if chunk:
+                    f.write(chunk)
+                    transfer.done += len(chunk)
+                    if slot:
+                        slot.done += len(chunk)
+                    if extractor:
+                        extractor.feed(chunk)
+
+    def verify(self, item: PipelineItem) -> None:
+        """Check completeness and hashes off the network threads."""
+        try:
+            if item.final_path.endswith(".safetensors"):
+                validate_safetensors_file(item.part_path)
+            expected = expected_sha256(item.metadata, item.original_filename)
+            if expected and sha256_file(item.part_path) != expected.upper():
+                raise FileValidationError(
+                    f"{item.part_path}: SHA256 does not match {expected}"
+                )
+        except FileValidationError:
+            # A corrupt partial must not be resumed on the next run
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(item.part_path)
+            self._fail(item)
+            raise
+
+    def place(self, item: PipelineItem) -> None:
+        """Move the verified file into place and apply header-based naming."""
+        try:
+            os.replace(item.part_path, item.final_path)
+            if item.lock:
+                item.lock.mark_placed(item.final_path)
+            if self.custom_naming and uses_header_fields(self.filename_pattern):
+                item.final_path = apply_header_pattern(
+                    item.final_path,
+                    self.filename_pattern,
+                    item.metadata,
+                    item.original_filename,
+                )
+            logger.info(f"Download completed: {item.final_path}")
+            if item.extras:
+                item.extras.finish(item.final_path)
+                item.extras = None
+            if self.extract and is_zip_name(item.final_path):
+                if item.extractor:
+                    item.extractor.finish(item.final_path)
+                else:
+                    extract_zip(
+                        item.final_path, self.output_dir, self._member_prefix(item)
+                    )
+        except BaseException:
+            self._fail(item)
+            raise
+        self._release(item, written=True)
+        self._unlock(item, item.final_path)
+
+    def _member_prefix(self, item: PipelineItem) -> Optional[str]:
+        """Custom-named archive stem applied to extracted members."""
+        if not self.custom_naming:
+            return None
+        return os.path.splitext(os.path.basename(item.final_path))[0]
+
+    def _fail(self, item: PipelineItem) -> None:
+        """Undo side effects of a failed item and record the failure."""
+        if item.extractor:
+            item.extractor.discard()
+        if item.extras:
+            item.extras.discard()
+            item.extras = None
+        self._release(item, written=False)
+        self._unlock(item)
+
+    def _unlock(self, item: PipelineItem, result: Optional[str] = None) -> None:
+        if item.lock:
+            item.lock.release(result)
+            item.lock = None
+
+    def _release(self, item: PipelineItem, written: bool) -> None:
+        if self.budget and item.reserved:
+            self.budget.release(item.job.size, written=written)
+            item.reserved = False
+
+
+"""
+## KNOWN ERRORS: None
+
+## IMPROVEMENTS:
+- Resolution of the next file overlaps the current transfer
+- Hashing and renaming run on their own workers
+- Transfers write to .part files and resume them with Range requests
+- A .part refused with 416 is verified if complete, else fetched again
+- Zip bundles can be extracted while they download
+- Previews and sidecars are fetched during the transfer
+- Fetch concurrency can follow an AIMD controller instead of a fixed count
+- Single downloads use the pipeline too; it is the only download path
+- The existing-file check runs under the per-file lock
+- Ctrl-C stops transfers and cleans up every in-flight item
+
+## FUTURE TODOs: None
+"""
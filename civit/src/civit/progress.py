@@ -0,0 +1,351 @@
+# FILE: src/civit/progress.py
+"""
+# PURPOSE: Central progress display shared by all concurrent transfers.
+
+## INTERFACES:
+    ProgressRenderer(mode: str = "bar", interval: float = 0.1, stream=None)
+    ProgressRenderer.track(name: str, total: int = 0, initial: int = 0) -> Transfer
+    ProgressRenderer.emit(event: str, **fields) -> None
+    ProgressRenderer.configure(mode: str, interval: Optional[float] = None) -> None
+    ProgressRenderer.close() -> None
+    format_bytes(size: float) -> str
+    progress: Shared process-wide ProgressRenderer
+
+## DEPENDENCIES:
+    - threading: Background redraw thread
+    - json: Machine-readable jsonl mode
+"""
+
+import json
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, TextIO
+
+MODES = ("bar", "jsonl", "none")
+DEFAULT_INTERVAL = 0.1
+# Weight of the newest sample in the smoothed transfer rate
+RATE_SMOOTHING = 0.3
+NAME_WIDTH = 32
+
+
+def format_bytes(size: float) -> str:
+    """Format a byte count with binary units, e.g. 1.5 GiB."""
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{int(size)} B"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    """Format seconds remaining as H:MM:SS, or --:-- when unknown."""
+    if seconds is None:
+        return "--:--"
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
+
+
+class Transfer:
+    """
+    Byte counter for one download.
+
+    The transfer thread is the only writer and the renderer only reads, so
+    the hot loop is a plain ``transfer.done += len(chunk)``.
+    """
+
+    __slots__ = (
+        "name",
+        "total",
+        "done",
+        "started",
+        "finished",
+        "ok",
+        "rate",
+        "_last_done",
+        "_last_time",
+        "_renderer",
+    )
+
+    def __init__(
+        self, renderer: "ProgressRenderer", name: str, total: int, initial: int
+    ):
+        self.name = name
+        self.total = total
+        self.done = initial
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.ok = True
+        self.rate = 0.0
+        self._last_done = initial
+        self._last_time = self.started
+        self._renderer = renderer
+
+    def __enter__(self) -> "Transfer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.finish(ok=exc_type is None)
+
+    def finish(self, ok: bool = True) -> None:
+        """Mark the transfer as done; the renderer drops it after one last draw."""
+        if self.finished is None:
+            self.ok = ok
+            self.finished = time.monotonic()
+            self._renderer._finished(self)
+
+    def sample(self, now: float) -> float:
+        """Update and return the smoothed rate in bytes per second."""
+        elapsed = now - self._last_time
+        if elapsed > 0:
+            current = (self.done - self._last_done) / elapsed
+            # The first sample seeds the average instead of being damped
+            first = self._last_time == self.started
+            self.rate = (
+                current
+                if first
+                else RATE_SMOOTHING * current + (1 - RATE_SMOOTHING) * self.rate
+            )
+            self._last_done = self.done
+            self._last_time = now
+        return self.rate
+
+    def eta(self) -> Optional[float]:
+        """Seconds remaining at the current rate, or None if unknown."""
+        if not self.total or self.rate <= 0:
+            return None
+        return max(self.total - self.done, 0) / self.rate
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current state as a JSON-serializable dict."""
+        return {
+            "file": self.name,
+            "bytes": self.done,
+            "total": self.total or None,
+            "rate": round(self.rate, 1),
+            "eta": round(self.eta(), 1) if self.eta() is not None else None,
+        }
+
+
+class ProgressRenderer:
+    """
+    PURPOSE: Aggregate byte counters from all transfers and redraw at a fixed rate.
+
+    Transfers only bump integers; a single background thread turns them into
+    per-file and total throughput/ETA lines (bar mode) or JSON objects, one
+    per line (jsonl mode). The thread runs while at least one transfer is
+    active.
+    """
+
+    def __init__(
+        self,
+        mode: str = "bar",
+        interval: float = DEFAULT_INTERVAL,
+        stream: Optional[TextIO] = None,
+    ):
+        self.configure(mode, interval)
+        self.stream = stream
+        self.active: List[Transfer] = []
+        self.completed_bytes = 0
+        self.completed_files = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._drawn_lines = 0
+        self._last_totals: Optional[Dict[str, Any]] = None
+
+    def configure(self, mode: str, interval: Optional[float] = None) -> None:
+        """
+        Switch output mode and redraw interval.
+
+        Args:
+            mode: "bar" for terminal bars, "jsonl" for JSON lines, "none" to disable
+            interval: Seconds between redraws
+
+        Raises:
+            ValueError: If the mode is unknown
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown progress mode: {mode}")
+        self.mode = mode
+        if interval is not None:
+            self.interval = interval
+
+    @property
+    def out(self) -> TextIO:
+        """Stream to draw on: bars go to stderr, jsonl to stdout."""
+        if self.stream is not None:
+            return self.stream
+        return sys.stdout if self.mode == "jsonl" else sys.stderr
+
+    def track(self, name: str, total: int = 0, initial: int = 0) -> Transfer:
+        """
+        Register a transfer and start redrawing if this is the first one.
+
+        Args:
+            name: Label shown for the file
+            total: Expected size in bytes (0 if unknown)
+            initial: Bytes already present, e.g. when resuming
+
+        Returns:
+            Transfer whose ``done`` attribute the caller increments
+        """
+        transfer = Transfer(self, name, total, initial)
+        if self.mode == "none":
+            return transfer
+        with self._lock:
+            self.active.append(transfer)
+            if self._thread is None:
+                self._wake.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="progress", daemon=True
+                )
+                self._thread.start()
+        if self.mode == "jsonl":
+            self.emit("start", **transfer.snapshot())
+        return transfer
+
+    def emit(self, event: str, **fields: Any) -> None:
+        """
+        Write one machine-readable event in jsonl mode; ignored otherwise.
+
+        Args:
+            event: Event name, e.g. "progress" or "done"
+            **fields: JSON-serializable values to include
+        """
+        if self.mode != "jsonl":
+            return
+        record = {"event": event, "time": round(time.time(), 3), **fields}
+        with self._lock:
+            self.out.write(json.dumps(record) + "\n")
+            self.out.flush()
+
+    def close(self) -> None:
+        """Stop the redraw thread after a final draw."""
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            self._wake.set()
+            thread.join()
+
+    def _finished(self, transfer: Transfer) -> None:
+        self.emit("done", ok=transfer.ok, **transfer.snapshot())
+        with self._lock:
+            last = all(t.finished is not None for t in self.active)
+        if last:
+            self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.interval)
+            # Cleared before the state is read, so a finish() or close()
+            # signalled while drawing wakes the next round instead of being lost
+            self._wake.clear()
+            drawn = self._draw()
+            with self._lock:
+                # Only drop files whose final state has been drawn
+                for transfer in drawn:
+                    self.completed_bytes += transfer.done
+                    self.completed_files += 1
+                self.active = [t for t in self.active if t not in drawn]
+                if not self.active:
+                    self._thread = None
+                    self._drawn_lines = 0
+                    self._last_totals = None
+                    return
+
+    def _draw(self) -> List[Transfer]:
+        """Draw one frame and return the finished transfers it showed."""
+        now = time.monotonic()
+        with self._lock:
+            transfers = list(self.active)
+        finished = [t for t in transfers if t.finished is not None]
+        running = [t for t in transfers if t not in finished]
+        for transfer in running:
+            transfer.sample(now)
+
+        if self.mode == "jsonl":
+            for transfer in running:
+                self.emit("progress", **transfer.snapshot())
+            totals = self._totals(transfers)
+            if totals != self._last_totals:
+                self._last_totals = totals
+                self.emit("total", **totals)
+        elif self.mode == "bar":
+            self._draw_bars(finished, running)
+        return finished
+
+    def _totals(self, transfers: List[Transfer]) -> Dict[str, Any]:
+        """Totals over this run: finished files plus the given transfers."""
+        done = self.completed_bytes + sum(t.done for t in transfers)
+        total = sum(t.total for t in transfers)
+        rate = sum(t.rate for t in transfers if t.finished is None)
+        remaining = sum(max(t.total - t.done, 0) for t in transfers if t.total)
+        return {
+            "files": self.completed_files + len(transfers),
+            "bytes": done,
+            "total": self.completed_bytes + total if total else None,
+            "rate": round(rate, 1),
+            "eta": round(remaining / rate, 1) if rate > 0 and total else None,
+        }
+
+    def _draw_bars(self, finished: List[Transfer], running: List[Transfer]) -> None:
+        live = [self._bar_line(t) for t in running]
+        if len(finished) + len(running) > 1 or self.completed_files:
+            totals = self._totals(finished + running)
+            live.append(
+                f"{'Total'.ljust(NAME_WIDTH)} {totals['files']} files "
+                f"{format_bytes(totals['bytes'])} "
+                f"{format_bytes(totals['rate'])}/s ETA {format_eta(totals['eta'])}"
+            )
+
+        out = self.out
+        if out.isatty():
+            # Overwrite the previous frame; finished files stay above it
+            if self._drawn_lines:
+                out.write(f"\x1b[{self._drawn_lines}F\x1b[J")
+            for transfer in finished:
+                out.write(self._bar_line(transfer) + "\n")
+            for line in live if running else []:
+                out.write(line + "\n")
+            self._drawn_lines = len(live) if running else 0
+        else:
+            # Logs and pipes only get the final line of each file
+            for transfer in finished:
+                out.write(self._bar_line(transfer) + "\n")
+        out.flush()
+
+    @staticmethod
+    def _bar_line(transfer: Transfer) -> str:
+        name = transfer.name[:NAME_WIDTH].ljust(NAME_WIDTH)
+        if transfer.total:
+            percent = f"{100 * transfer.done / transfer.total:5.1f}%"
+            size = f"{format_bytes(transfer.done)}/{format_bytes(transfer.total)}"
+        else:
+            percent, size = "    ?%", format_bytes(transfer.done)
+        if transfer.finished is not None:
+            status = "done" if transfer.ok else "failed"
+        else:
+            rate = format_bytes(transfer.rate)
+            status = f"{rate}/s ETA {format_eta(transfer.eta())}"
+        return f"{name} {percent} {size} {status}"
+
+
+# Shared by every download in this process so their bars do not interleave
+progress = ProgressRenderer()
+
+
+"""
+## KNOWN ERRORS: None
+
+## IMPROVEMENTS:
+- One redraw thread at a fixed rate instead of a tqdm update per chunk
+- Total throughput and ETA across concurrent transfers
+- jsonl mode for machine consumers, with totals only when they change
+
+## FUTURE TODOs:
+- Collapse finished files into a summary line when many run at once
+"""
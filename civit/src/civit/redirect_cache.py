@@ -0,0 +1,247 @@
+# FILE: src/civit/redirect_cache.py
+"""
+# PURPOSE: Cache resolved CDN redirect targets per model version.
+
+## INTERFACES:
+    RedirectCache.resolve(url: str, headers: Dict[str, str], timeout: int = 10) -> ResolvedTarget
+    RedirectCache.invalidate(url: str) -> None
+    cache_key(url: str) -> str
+    parse_expiry(url: str, now: Optional[float] = None) -> Optional[float]
+    headers_for_target(target: ResolvedTarget, headers: Dict[str, str]) -> Dict[str, str]
+    redirect_cache: Shared process-wide RedirectCache
+
+## DEPENDENCIES:
+    - requests: For the HEAD request that walks the redirect chain
+    - threading: Locks shared by retries, range segments and workers
+"""
+
+import logging
+import threading
+import time
+from calendar import timegm
+from dataclasses import dataclass, field, replace
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Re-resolve this long before a signed URL actually expires
+EXPIRY_MARGIN = 30
+# Used when the final URL carries no recognizable expiry
+DEFAULT_TTL = 300
+
+
+@dataclass
+class ResolvedTarget:
+    """Final storage URL for a download plus the headers seen when resolving it."""
+
+    source_url: str
+    final_url: str
+    expires_at: float
+    headers: Dict[str, str] = field(default_factory=dict)
+    from_cache: bool = False
+
+    def is_valid(self, now: Optional[float] = None) -> bool:
+        """True while the signed URL can still be used."""
+        return (now if now is not None else time.time()) < self.expires_at
+
+
+def cache_key(url: str) -> str:
+    """
+    Build the cache key for a download URL.
+
+    `/api/download/models/<id>` URLs are keyed by version id plus the
+    query options that select a file (type, format, size, fp).
+
+    Args:
+        url: Download URL as given by the user
+
+    Returns:
+        Key identifying the file the URL resolves to
+    """
+    parsed = urlparse(url)
+    if "/api/download/models/" in parsed.path:
+        version_id = parsed.path.rstrip("/").split("/")[-1]
+        query = parse_qs(parsed.query)
+        options = "&".join(
+            f"{k}={query[k][0]}" for k in sorted(query) if k.lower() != "token"
+        )
+        return f"{version_id}?{options}" if options else version_id
+    return url
+
+
+def parse_expiry(url: str, now: Optional[float] = None) -> Optional[float]:
+    """
+    Extract the expiry time of a signed storage URL.
+
+    Understands S3/R2 style (X-Amz-Date + X-Amz-Expires) and CloudFront/B2
+    style (Expires as a unix timestamp) signatures.
+
+    Args:
+        url: Final storage URL
+        now: Current time, for tests
+
+    Returns:
+        Expiry as a unix timestamp, or None if the URL is not signed
+    """
+    query = {k.lower(): v[0] for k, v in parse_qs(urlparse(url).query).items()}
+    try:
+        if "x-amz-expires" in query:
+            if "x-amz-date" in query:
+                signed_at = timegm(
+                    time.strptime(query["x-amz-date"], "%Y%m%dT%H%M%SZ")
+                )
+            else:
+                signed_at = now if now is not None else time.time()
+            return signed_at + int(query["x-amz-expires"])
+        if "expires" in query:
+            return float(query["expires"])
+    except ValueError:
+        logger.debug(f"Unrecognized expiry in signed URL: {url}")
+    return None
+
+
+def headers_for_target(
+    target: ResolvedTarget, headers: Dict[str, str]
+) -> Dict[str, str]:
+    """
+    Adapt request headers for a direct request to the resolved URL.
+
+    The storage host authenticates through the URL signature and rejects a
+    second auth mechanism, so the Civitai bearer token is dropped when the
+    target is on another host (requests does the same on redirects).
+
+    Args:
+        target: Resolved download target
+        headers: Headers meant for the Civitai URL
+
+    Returns:
+        Headers to send to target.final_url
+    """
+    if urlparse(target.final_url).netloc == urlparse(target.source_url).netloc:
+        return dict(headers)
+    return {k: v for k, v in headers.items() if k.lower() != "authorization"}
+
+
+class RedirectCache:
+    """
+    PURPOSE: Thread-safe cache of resolved download targets keyed per version.
+
+    Concurrent callers for the same key wait for a single resolution
+    instead of each walking the redirect chain.
+    """
+
+    def __init__(self, default_ttl: int = DEFAULT_TTL, margin: int = EXPIRY_MARGIN):
+        self.default_ttl = default_ttl
+        self.margin = margin
+        self._entries: Dict[str, ResolvedTarget] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    def get(self, url: str) -> Optional[ResolvedTarget]:
+        """Return the cached target for a URL if it has not expired."""
+        key = cache_key(url)
+        with self._lock:
+            target = self._entries.get(key)
+            if target and not target.is_valid():
+                del self._entries[key]
+                target = None
+        return target
+
+    def put(
+        self, url: str, final_url: str, headers: Dict[str, str]
+    ) -> ResolvedTarget:
+        """Store a resolved target, deriving its expiry from the signed URL."""
+        now = time.time()
+        expiry = parse_expiry(final_url, now)
+        if expiry is None:
+            expiry = now + self.default_ttl
+        expires_at = expiry - self.margin
+        target = ResolvedTarget(url, final_url, expires_at, dict(headers))
+        with self._lock:
+            self._entries[cache_key(url)] = target
+        return target
+
+    def invalidate(self, url: str) -> None:
+        """Forget the target for a URL, e.g. after the storage host returned 403."""
+        with self._lock:
+            self._entries.pop(cache_key(url), None)
+
+    def clear(self) -> None:
+        """Drop all cached targets."""
+        with self._lock:
+            self._entries.clear()
+
+    def resolve(
+        self, url: str, headers: Dict[str, str], timeout: int = 10
+    ) -> ResolvedTarget:
+        """
+        Return the final download URL, walking redirects only on a cache miss.
+
+        Args:
+            url: Civitai download URL
+            headers: Request headers, including Authorization if any
+            timeout: Timeout for the HEAD request in seconds
+
+        Returns:
+            ResolvedTarget; from_cache tells whether a request was made
+
+        Raises:
+            requests.exceptions.RequestException: If the HEAD request fails
+        """
+        cached = self.get(url)
+        if cached:
+            return replace(cached, from_cache=True)
+
+        key = cache_key(url)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                cached = self.get(url)
+                if cached:
+                    return replace(cached, from_cache=True)
+                return self._walk(url, headers, timeout)
+        finally:
+            # Key locks only exist while a resolution is in progress, so
+            # the map stays as small as the number of concurrent callers
+            with self._lock:
+                if self._key_locks.get(key) is key_lock and not key_lock.locked():
+                    del self._key_locks[key]
+
+    def _walk(
+        self, url: str, headers: Dict[str, str], timeout: int
+    ) -> ResolvedTarget:
+        with requests.head(
+            url, headers=headers, allow_redirects=True, timeout=timeout
+        ) as response:
+            seen_headers = {
+                name: response.headers[name]
+                for name in ("content-disposition", "content-length")
+                if name in response.headers
+            }
+            final_url = response.url if isinstance(response.url, str) else url
+            if response.status_code >= 400:
+                # Don't cache failures; the caller reports them on GET
+                return ResolvedTarget(url, url, time.time(), seen_headers)
+
+        logger.debug(f"Resolved {url} -> {final_url}")
+        return self.put(url, final_url, seen_headers)
+
+
+# Shared by retries, range segments and concurrent workers in this process
+redirect_cache = RedirectCache()
+
+
+"""
+## KNOWN ERRORS: None
+
+## IMPROVEMENTS:
+- Signed URL expiry parsed from X-Amz-* and Expires query parameters
+- Per-key locking so concurrent workers share a single resolution
+
+## FUTURE TODOs:
+- Persist resolved targets across invocations
+"""
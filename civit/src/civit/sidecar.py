@@ -0,0 +1,256 @@
+# FILE: src/civit/sidecar.py
+"""
+# PURPOSE: Fetch preview images and write a metadata sidecar beside a download.
+
+## INTERFACES:
+    start_extras(model_path: str, metadata: Dict, args: Any) -> Optional[ExtrasFetch]
+    ExtrasFetch(model_path: str, metadata: Dict, previews: int = 0, ...)
+    ExtrasFetch.start() -> ExtrasFetch
+    ExtrasFetch.finish(final_path: Optional[str] = None) -> List[str]
+    ExtrasFetch.discard() -> None
+    preview_urls(metadata: Dict, limit: int) -> List[str]
+    write_atomic(path: str, data: bytes) -> bool
+    shared_session() -> requests.Session
+
+## DEPENDENCIES:
+    - requests: Pooled session for the small fetches
+    - concurrent.futures: Shared worker pool that runs beside the main transfer
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+SIDECAR_SUFFIX = ".civitai.json"
+PREVIEW_SUFFIX = ".preview"
+# Small fetches share these connections; the model transfer has its own
+POOL_SIZE = 4
+TIMEOUT = 30
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def shared_session() -> requests.Session:
+    """Session whose connection pool is shared by every preview fetch."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def _shared_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(POOL_SIZE, thread_name_prefix="extras")
+        return _executor
+
+
+def _keep_existing(path: str) -> bool:
+    """True (and a warning) if an extra would overwrite a file already there."""
+    if not os.path.exists(path):
+        return False
+    logger.warning(f"Not overwriting existing file: {path}")
+    return True
+
+
+def write_atomic(path: str, data: bytes) -> bool:
+    """
+    Write a new file so readers never see it half-written.
+
+    Like downloads, extras never replace a file that already exists.
+
+    Args:
+        path: Destination path
+        data: Complete file contents
+
+    Returns:
+        True if the file was written, False if it already existed
+    """
+    if _keep_existing(path):
+        return False
+    fd, temp = tempfile.mkstemp(
+        dir=os.path.dirname(path) or ".", prefix=".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp, path)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+    return True
+
+
+def preview_urls(metadata: Dict[str, Any], limit: int) -> List[str]:
+    """
+    Pick the first preview images listed for a model version.
+
+    Args:
+        metadata: Model version metadata from the Civitai API
+        limit: Maximum number of previews
+
+    Returns:
+        Image URLs in the order Civitai lists them, videos skipped
+    """
+    urls = []
+    for image in metadata.get("images") or []:
+        if len(urls) >= limit:
+            break
+        if image.get("url") and image.get("type", "image") == "image":
+            urls.append(image["url"])
+    return urls
+
+
+def _preview_path(stem: str, index: int, url: str) -> str:
+    ext = os.path.splitext(urlparse(url).path)[1] or ".png"
+    number = "" if index == 0 else f".{index + 1}"
+    return f"{stem}{PREVIEW_SUFFIX}{number}{ext}"
+
+
+class ExtrasFetch:
+    """
+    PURPOSE: Previews and sidecar for one model, fetched during its transfer.
+
+    The jobs run on a small shared pool, so they complete inside the wall
+    time of the large download instead of after it. Files are named after
+    the model's stem and moved along if the model is renamed on completion.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        metadata: Dict[str, Any],
+        previews: int = 0,
+        sidecar: bool = True,
+        session: Optional[requests.Session] = None,
+    ):
+        self.model_path = model_path
+        self.metadata = metadata
+        self.previews = previews
+        self.sidecar = sidecar
+        self.session = session
+        self._futures: List[Future] = []
+
+    @property
+    def stem(self) -> str:
+        return os.path.splitext(self.model_path)[0]
+
+    def start(self) -> "ExtrasFetch":
+        """Schedule the sidecar write and preview downloads."""
+        executor = _shared_executor()
+        if self.sidecar:
+            self._futures.append(executor.submit(self._write_sidecar))
+        for index, url in enumerate(preview_urls(self.metadata, self.previews)):
+            path = _preview_path(self.stem, index, url)
+            self._futures.append(executor.submit(self._fetch_preview, url, path))
+        return self
+
+    def _write_sidecar(self) -> Optional[str]:
+        path = self.stem + SIDECAR_SUFFIX
+        data = json.dumps(self.metadata, indent=2, ensure_ascii=False)
+        return path if write_atomic(path, data.encode("utf-8")) else None
+
+    def _fetch_preview(self, url: str, path: str) -> Optional[str]:
+        if _keep_existing(path):
+            return None
+        session = self.session or shared_session()
+        with session.get(url, stream=True, timeout=TIMEOUT) as response:
+            response.raise_for_status()
+            return path if write_atomic(path, response.content) else None
+
+    def _wait(self) -> List[str]:
+        """Paths this fetch created; files that were already there are left out."""
+        written = []
+        for future in self._futures:
+            try:
+                path = future.result()
+                if path:
+                    written.append(path)
+            except Exception as e:
+                # Extras are best effort; the model download still counts
+                logger.warning(f"Could not save extras for {self.model_path}: {e}")
+        self._futures = []
+        return written
+
+    def finish(self, final_path: Optional[str] = None) -> List[str]:
+        """
+        Wait for the extras and follow the model if it was renamed.
+
+        Args:
+            final_path: Where the model ended up, if not at model_path
+
+        Returns:
+            Paths of the files written
+        """
+        written = self._wait()
+        if not final_path or final_path == self.model_path:
+            return written
+        new_stem = os.path.splitext(final_path)[0]
+        moved = []
+        for path in written:
+            target = new_stem + path[len(self.stem) :]
+            if _keep_existing(target):
+                os.remove(path)
+                continue
+            os.replace(path, target)
+            moved.append(target)
+        self.model_path = final_path
+        return moved
+
+    def discard(self) -> None:
+        """Wait for the extras and remove the ones this fetch created."""
+        for path in self._wait():
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def start_extras(
+    model_path: str, metadata: Dict[str, Any], args: Any
+) -> Optional[ExtrasFetch]:
+    """
+    Start fetching the extras requested on the command line.
+
+    Args:
+        model_path: Custom-named path the model is being downloaded to
+        metadata: Model version metadata
+        args: Parsed arguments (previews, sidecar)
+
+    Returns:
+        The running fetch, or None if no extras were requested
+    """
+    previews = getattr(args, "previews", 0) or 0
+    sidecar = bool(getattr(args, "sidecar", False))
+    if not metadata or not (previews or sidecar):
+        return None
+    return ExtrasFetch(model_path, metadata, previews, sidecar).start()
+
+
+"""
+## KNOWN ERRORS: None
+
+## IMPROVEMENTS:
+- Previews and sidecars download during the model transfer, not after it
+- Every extra is written atomically
+- Existing previews and sidecars are never overwritten or removed
+
+## FUTURE TODOs:
+- Fetch extras for models that are already on disk
+"""
@@ -0,0 +1,168 @@
+"""
+# PURPOSE: Tests for the AIMD transfer concurrency controller.
+
+## DEPENDENCIES:
+    - pytest: Test framework
+    - src.civit.adaptive: Module under test
+    - tests.test_utils.fake_civitai_server: Throttling Civitai stand-in
+"""
+
+import io
+import json
+import threading
+from contextlib import ExitStack
+from types import SimpleNamespace
+
+import pytest
+
+from src.civit.adaptive import AdaptiveConcurrency
+from src.civit.pipeline import DownloadPipeline
+from src.civit.progress import ProgressRenderer
+from src.civit.redirect_cache import redirect_cache
+from src.civit.scheduler import DownloadJob
+from tests.test_utils.fake_civitai_server import FakeCivitai, safetensors_bytes
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def controller():
+    """Controller driven by a manual clock, recording emitted events."""
+    clock = Clock()
+    events = []
+    aimd = AdaptiveConcurrency(
+        initial=1,
+        maximum=4,
+        window=1.0,
+        clock=clock,
+        emit=lambda event, **fields: events.append((event, fields)),
+    )
+    aimd.test_clock, aimd.test_events = clock, events
+    return aimd
+
+
+def tick(aimd, seconds=1.0):
+    aimd.test_clock.now += seconds
+    return aimd.evaluate()
+
+
+def test_increases_while_throughput_rises(controller):
+    """Test additive increase when every slot is busy and throughput grows."""
+    with controller.slot() as slot:
+        slot.done += 100
+        assert tick(controller) is None  # first window only sets a baseline
+        slot.done += 300
+        decision = tick(controller)
+
+    assert decision["reason"] == "throughput_rising"
+    assert controller.limit == 2
+    assert controller.test_events == [("concurrency", decision)]
+
+
+def test_no_increase_without_demand(controller):
+    """Test that spare slots are not added when the limit is not reached."""
+    controller.limit = 2
+    with controller.slot() as slot:
+        slot.done += 100
+        tick(controller)
+        slot.done += 300
+        assert tick(controller) is None
+    assert controller.limit == 2
+
+
+def test_throttling_halves_once_per_window(controller):
+    """Test multiplicative decrease on 429, without cascading."""
+    controller.limit = 4
+    controller.report_status(429)
+    controller.report_status(429)
+    controller.report_status(200)
+
+    assert controller.limit == 2
+    assert [d["reason"] for d in controller.decisions] == ["throttled"]
+
+    tick(controller)
+    controller.report_status(503)
+    assert controller.limit == 1
+    assert controller.decisions[-1]["reason"] == "server_error"
+
+
+def test_backs_off_on_rising_latency(controller):
+    """Test that time to first byte far above the best seen cuts the limit."""
+    controller.limit = 4
+    with controller.slot() as slot:
+        controller.report_latency(0.05)
+        slot.done += 100
+        tick(controller)
+        controller.report_latency(0.5)
+        slot.done += 100
+        decision = tick(controller)
+
+    assert decision["reason"] == "latency"
+    assert controller.limit == 2
+
+
+def test_backs_off_when_connections_split_a_flat_pipe(controller):
+    """Test that more connections with no aggregate gain cuts the limit."""
+    controller.limit = 4
+    with ExitStack() as stack:
+        first = stack.enter_context(controller.slot())
+        first.done += 1000
+        tick(controller)
+        for _ in range(2):
+            stack.enter_context(controller.slot())
+        first.done += 1000
+        decision = tick(controller)
+
+    assert decision["reason"] == "per_connection_drop"
+    assert controller.limit == 2
+
+
+def test_slots_wait_for_the_limit(controller):
+    """Test that transfers beyond the limit wait until one finishes."""
+    entered = threading.Event()
+    with controller.slot():
+
+        def second():
+            with controller.slot():
+                entered.set()
+
+        thread = threading.Thread(target=second)
+        thread.start()
+        assert not entered.wait(0.1)
+    assert entered.wait(5)
+    thread.join()
+
+
+def test_pipeline_adapts_to_throttling_cdn(tmp_path, monkeypatch):
+    """Test against a stand-in that 429s beyond two concurrent transfers."""
+    monkeypatch.setattr("src.civit.pipeline.RETRY_DELAY", 0.01)
+    monkeypatch.setattr("src.civit.pipeline.THROTTLE_RETRIES", 10)
+    versions = [str(1000 + i) for i in range(6)]
+    files = {v: (f"m{v}.safetensors", safetensors_bytes(60_000)) for v in versions}
+    telemetry = io.StringIO()
+    renderer = ProgressRenderer("jsonl", stream=telemetry)
+    aimd = AdaptiveConcurrency(initial=4, maximum=6, window=0.05, emit=renderer.emit)
+    redirect_cache.clear()
+
+    with FakeCivitai(files, storage_limit=2, rate=400_000) as fake:
+        args = SimpleNamespace(cache_url=fake.url, custom_naming=True)
+        jobs = [
+            DownloadJob(f"{fake.url}/api/download/models/{v}", i)
+            for i, v in enumerate(versions)
+        ]
+        items = DownloadPipeline(str(tmp_path), args, adaptive=aimd).run(jobs)
+    redirect_cache.clear()
+
+    assert all(item.ok for item in items), [item.error for item in items]
+    assert len(list(tmp_path.glob("*.safetensors"))) == len(versions)
+    assert fake.storage_peak <= 2
+    assert min(decision["limit"] for decision in aimd.decisions) <= 2
+    events = [json.loads(line) for line in telemetry.getvalue().splitlines()]
+    reasons = [e["reason"] for e in events if e["event"] == "concurrency"]
+    assert "throttled" in reasons
@@ -0,0 +1,174 @@
+"""
+# PURPOSE: Tests for streaming and sequential zip extraction.
+
+## DEPENDENCIES:
+    - pytest: Test framework
+    - src.civit.archive: Module under test
+"""
+
+import io
+import os
+import zipfile
+
+import pytest
+
+from src.civit.archive import StreamingZipExtractor, extract_zip, member_path
+
+MEMBERS = {
+    "embedding.pt": b"\x00\x01" * 5000,
+    "docs/readme.txt": b"trigger word: civit\n" * 50,
+}
+
+
+class Unseekable(io.RawIOBase):
+    """Write-only stream that forces zipfile to emit data descriptors."""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+
+def make_zip(compression=zipfile.ZIP_DEFLATED, seekable=True):
+    stream = io.BytesIO() if seekable else Unseekable()
+    with zipfile.ZipFile(stream, "w", compression=compression) as archive:
+        archive.writestr("docs/", b"")
+        for name, data in MEMBERS.items():
+            archive.writestr(name, data)
+    return (stream if seekable else stream.buffer).getvalue()
+
+
+def stream_into(extractor, data, chunk_size=333):
+    for start in range(0, len(data), chunk_size):
+        extractor.feed(data[start : start + chunk_size])
+
+
+@pytest.mark.parametrize(
+    "compression,seekable",
+    [
+        (zipfile.ZIP_DEFLATED, True),
+        (zipfile.ZIP_STORED, True),
+        (zipfile.ZIP_DEFLATED, False),
+    ],
+)
+def test_members_extracted_while_streaming(tmp_path, compression, seekable):
+    """Test that streamable layouts are fully extracted before finish()."""
+    data = make_zip(compression, seekable)
+    archive = tmp_path / "Pack_1.zip"
+    archive.write_bytes(data)
+    extractor = StreamingZipExtractor(str(tmp_path), "Pack_1")
+
+    stream_into(extractor, data)
+
+    assert extractor.complete and extractor.fallback_reason is None
+    assert (tmp_path / "Pack_1_embedding.pt").read_bytes() == MEMBERS["embedding.pt"]
+    assert (tmp_path / "docs" / "Pack_1_readme.txt").read_bytes() == MEMBERS[
+        "docs/readme.txt"
+    ]
+    assert sorted(extractor.finish(str(archive))) == sorted(extractor.extracted)
+    assert not list(tmp_path.rglob("*.part"))
+
+
+def test_stored_with_descriptor_falls_back_to_one_pass(tmp_path):
+    """Test that stored members with data descriptors are extracted from disk."""
+    data = make_zip(zipfile.ZIP_STORED, seekable=False)
+    archive = tmp_path / "bundle.zip"
+    archive.write_bytes(data)
+    extractor = StreamingZipExtractor(str(tmp_path))
+
+    stream_into(extractor, data)
+    assert extractor.fallback_reason and not extractor.complete
+
+    extracted = extractor.finish(str(archive))
+    assert len(extracted) == 2
+    assert (tmp_path / "embedding.pt").read_bytes() == MEMBERS["embedding.pt"]
+
+
+def test_corrupt_member_falls_back(tmp_path):
+    """Test that a CRC mismatch stops streaming and leaves no partial member."""
+    data = bytearray(make_zip(zipfile.ZIP_STORED))
+    offset = data.index(b"\x00\x01\x00\x01")
+    data[offset] = 0xFF
+    extractor = StreamingZipExtractor(str(tmp_path))
+
+    stream_into(extractor, bytes(data))
+
+    assert "CRC" in extractor.fallback_reason
+    assert not list(tmp_path.rglob("*.part"))
+
+
+def test_truncated_stream_falls_back(tmp_path):
+    """Test that finish() reads the file when the stream stopped early."""
+    data = make_zip()
+    archive = tmp_path / "bundle.zip"
+    archive.write_bytes(data)
+    extractor = StreamingZipExtractor(str(tmp_path))
+
+    stream_into(extractor, data[:100])
+    extracted = extractor.finish(str(archive))
+
+    assert "central directory" in extractor.fallback_reason
+    assert len(extracted) == 2
+
+
+def test_discard_removes_extracted_members(tmp_path):
+    """Test that a failed download does not leave extracted members behind."""
+    extractor = StreamingZipExtractor(str(tmp_path))
+    stream_into(extractor, make_zip())
+
+    extractor.discard()
+
+    assert not any(path.is_file() for path in tmp_path.rglob("*"))
+
+
+@pytest.mark.parametrize("streamed", [True, False])
+def test_existing_files_are_not_overwritten(tmp_path, streamed):
+    """Test that extraction skips members whose output file already exists."""
+    data = make_zip()
+    existing = tmp_path / "pack_embedding.pt"
+    existing.write_bytes(b"mine")
+    archive = tmp_path / "pack.zip"
+    archive.write_bytes(data)
+
+    if streamed:
+        extractor = StreamingZipExtractor(str(tmp_path), "pack")
+        stream_into(extractor, data)
+        extracted = extractor.finish(str(archive))
+        extractor.discard()
+    else:
+        extracted = extract_zip(str(archive), str(tmp_path), "pack")
+
+    assert existing.read_bytes() == b"mine"
+    assert [os.path.basename(path) for path in extracted] == ["pack_readme.txt"]
+    assert not list(tmp_path.rglob("*.part"))
+
+
+def test_extract_zip_sequential(tmp_path):
+    """Test the one-pass fallback extraction with a filename prefix."""
+    archive = tmp_path / "bundle.zip"
+    archive.write_bytes(make_zip())
+    out = tmp_path / "out"
+
+    extracted = extract_zip(str(archive), str(out), "Model_7")
+
+    assert [os.path.basename(p) for p in extracted] == [
+        "Model_7_embedding.pt",
+        "Model_7_readme.txt",
+    ]
+
+
+@pytest.mark.parametrize("member", ["../evil.pt", "/etc/passwd", "a/../../evil"])
+def test_member_path_rejects_escapes(tmp_path, member):
+    """Test that members cannot be written outside the output directory."""
+    with pytest.raises(ValueError):
+        member_path(str(tmp_path), member)
+
+
+def test_member_path_keeps_name_without_prefix(tmp_path):
+    """Test that members keep their stored names when custom naming is off."""
+    expected = str(tmp_path / "sub" / "file.pt")
+    assert member_path(str(tmp_path), "sub/file.pt") == expected
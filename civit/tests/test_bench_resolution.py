@@ -0,0 +1,40 @@
+"""
+# PURPOSE: Smoke tests for the resolution benchmark harness.
+
+## DEPENDENCIES:
+    - pytest: Test framework
+    - scripts.bench_resolution: Harness under test
+"""
+
+from scripts.bench_resolution import make_urls, percentile, run_benchmark
+from src.civit.filename_generator import extract_model_components
+from src.civit.url_validator import normalize_url, validate_url
+
+
+def test_generated_urls_pass_validation():
+    """Test that every URL shape survives the real validators."""
+    for url in make_urls(30):
+        assert validate_url(url)
+        assert normalize_url(url)
+        assert extract_model_components(url)["version_id"]
+
+
+def test_throttled_calls_are_retried_and_counted():
+    """Test that every 429 the fake API serves shows up as one retry."""
+    report = run_benchmark(
+        make_urls(40), concurrency=4, throttle=0.2, retries=20, backoff=0.001
+    )
+
+    assert report["failed"] == 0
+    assert report["throttled"] > 0
+    assert report["retries"] == report["throttled"]
+    assert report["requests"] == 2 * report["urls"] + report["throttled"]
+    assert report["p99_ms"] >= report["p50_ms"] > 0
+
+
+def test_percentile_nearest_rank():
+    """Test the percentile helper on a known distribution."""
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 99) == 0.0
@@ -0,0 +1,285 @@
+"""
+# PURPOSE: Tests for the LAN read-through cache server.
+
+## DEPENDENCIES:
+    - pytest: Test framework
+    - src.civit.cache_server: Module under test
+    - tests.test_utils.fake_civitai_server: Local Civitai stand-in
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from src.civit import cache_server
+from src.civit.cache_server import (
+    CacheRequestHandler,
+    CacheServer,
+    CacheStore,
+    parse_range,
+)
+from src.civit.download_handler import download_file, with_base_url
+from src.civit.redirect_cache import redirect_cache
+from tests.test_utils.fake_civitai_server import FakeCivitai, safetensors_bytes
+
+VERSION = "1436228"
+FILENAME = "RetroToonXL_Style-10.safetensors"
+BODY = safetensors_bytes(300_000)
+URL = f"https://civitai.com/api/download/models/{VERSION}"
+
+
+@pytest.fixture
+def upstream():
+    """Civitai stand-in serving one safetensors file."""
+    with FakeCivitai({VERSION: (FILENAME, BODY)}) as fake:
+        yield fake
+
+
+@pytest.fixture
+def cache(upstream, tmp_path):
+    """Cache server in front of the stand-in."""
+    server = CacheServer(
+        ("127.0.0.1", 0), CacheStore(str(tmp_path / "store")), upstream.url
+    )
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    redirect_cache.clear()
+    yield server
+    server.shutdown()
+    server.server_close()
+    redirect_cache.clear()
+
+
+def wait_cached(cache, key):
+    """Index entry for a key once its fill commits, after the last byte is sent."""
+    deadline = time.monotonic() + 10
+    while cache.store.lookup(key) is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return cache.store.lookup(key)
+
+
+def client_args(cache):
+    return SimpleNamespace(cache_url=cache.url, api_key=None, custom_naming=True)
+
+
+def test_upstream_fetched_once_for_many_clients(cache, upstream, tmp_path):
+    """Test that a second workstation is served from the store."""
+    for name in ("ws1", "ws2"):
+        out = tmp_path / name
+        assert download_file(URL, str(out), client_args(cache)) is True
+        (downloaded,) = out.glob("*.safetensors")
+        assert downloaded.read_bytes() == BODY
+
+    assert upstream.requests[f"GET /storage/{VERSION}"] == 1
+    objects = [p for p in (tmp_path / "store" / "objects").rglob("*") if p.is_file()]
+    assert len(objects) == 1
+
+
+def test_concurrent_clients_share_one_fetch(cache, upstream):
+    """Test that clients arriving during a fill wait and read from disk."""
+    url = with_base_url(URL, cache.url)
+    bodies = []
+
+    def fetch():
+        bodies.append(requests.get(url, timeout=10).content)
+
+    threads = [threading.Thread(target=fetch) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert bodies == [BODY] * 4
+    assert upstream.requests[f"GET /storage/{VERSION}"] == 1
+
+
+def test_range_requests_served_from_store(cache, upstream):
+    """Test that resumed downloads get exactly the requested bytes."""
+    url = with_base_url(URL, cache.url)
+    requests.get(url, timeout=10).close()
+
+    response = requests.get(url, headers={"Range": "bytes=100-199"}, timeout=10)
+    assert response.status_code == 206
+    assert response.content == BODY[100:200]
+    assert response.headers["Content-Range"] == f"bytes 100-199/{len(BODY)}"
+
+    response = requests.get(url, headers={"Range": f"bytes={len(BODY)}-"}, timeout=10)
+    assert response.status_code == 416
+
+
+def test_range_on_miss_passes_through(cache, upstream):
+    """Test that a resume request against a cold cache is answered by upstream."""
+    url = with_base_url(URL, cache.url)
+
+    response = requests.get(url, headers={"Range": "bytes=100-"}, timeout=10)
+
+    assert response.status_code == 206
+    assert response.content == BODY[100:]
+    assert response.headers["Content-Range"] == f"bytes 100-{len(BODY) - 1}/{len(BODY)}"
+    assert cache.store.lookup(VERSION) is None
+
+
+def test_clients_joining_a_fill_get_bytes_before_it_commits(tmp_path, monkeypatch):
+    """Test that a second client streams a file still being fetched."""
+    monkeypatch.setattr(cache_server, "CHUNK_SIZE", 16 * 1024)
+    with FakeCivitai({VERSION: (FILENAME, BODY)}, rate=300_000) as slow:
+        server = CacheServer(("127.0.0.1", 0), CacheStore(str(tmp_path)), slow.url)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = with_base_url(URL, server.url)
+        try:
+            first = requests.get(url, stream=True, timeout=10)
+            first_chunk = next(first.iter_content(1024))
+            with requests.get(url, stream=True, timeout=10) as second:
+                early = next(second.iter_content(1024))
+                assert server.store.lookup(VERSION) is None
+                body = early + b"".join(second.iter_content(64 * 1024))
+            assert first_chunk + b"".join(first.iter_content(64 * 1024)) == BODY
+            first.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    assert body == BODY
+    assert slow.requests[f"GET /storage/{VERSION}"] == 1
+
+
+def test_head_and_metadata_proxied(cache, upstream):
+    """Test that HEAD and API calls pass through without filling the cache."""
+    head = requests.head(with_base_url(URL, cache.url), timeout=10)
+    assert head.status_code == 200
+    assert FILENAME in head.headers["Content-Disposition"]
+    assert upstream.requests[f"GET /storage/{VERSION}"] == 0
+
+    meta = requests.get(f"{cache.url}/api/v1/model-versions/{VERSION}", timeout=10)
+    assert meta.json()["files"][0]["name"] == FILENAME
+
+
+def test_keyed_files_served_only_to_authorized_clients(cache, upstream):
+    """Test that a file fetched with a key is checked against each client's key."""
+    url = with_base_url(URL, cache.url)
+    owner = {"Authorization": "Bearer owner"}
+    assert requests.get(url, headers=owner, timeout=10).content == BODY
+    assert wait_cached(cache, VERSION)["public"] is False
+
+    other = {"Authorization": "Bearer other"}
+    for _ in range(2):
+        assert requests.get(url, headers=other, timeout=10).content == BODY
+    # Civitai is asked once per client key, then the answer is remembered
+    assert upstream.requests[f"HEAD /api/download/models/{VERSION}"] == 1
+
+    del upstream.files[VERSION]  # Civitai now refuses the download
+    assert requests.get(url, timeout=10).status_code == 404
+    assert requests.get(url, headers=other, timeout=10).content == BODY
+
+
+def test_server_key_not_lent_to_other_machines():
+    """Test that --api-key is only used for clients on the same machine."""
+    handler = object.__new__(CacheRequestHandler)
+    handler.server = SimpleNamespace(api_key="operator")
+    handler.headers = {}
+
+    handler.client_address = ("127.0.0.1", 5000)
+    assert handler._upstream_headers() == {"Authorization": "Bearer operator"}
+    handler.client_address = ("192.168.1.20", 5000)
+    assert handler._upstream_headers() == {}
+    handler.headers = {"Authorization": "Bearer own"}
+    assert handler._upstream_headers() == {"Authorization": "Bearer own"}
+
+
+class _TruncatingUpstream(BaseHTTPRequestHandler):
+    """Announces 200 bytes and hangs up after 10."""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "200")
+        self.end_headers()
+        self.wfile.write(b"x" * 10)
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_truncated_stream_closes_connection(tmp_path):
+    """Test that an upstream failure mid-stream is not followed by an error page."""
+    upstream = ThreadingHTTPServer(("127.0.0.1", 0), _TruncatingUpstream)
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    host, port = upstream.server_address[:2]
+    server = CacheServer(
+        ("127.0.0.1", 0), CacheStore(str(tmp_path)), f"http://{host}:{port}"
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with pytest.raises(requests.exceptions.RequestException):
+            requests.get(with_base_url(URL, server.url), timeout=10).content
+        assert server.store.lookup(VERSION) is None
+    finally:
+        for s in (server, upstream):
+            s.shutdown()
+            s.server_close()
+
+
+def test_upstream_errors_are_relayed_not_cached(cache, upstream):
+    """Test that a missing version returns 404 and is not stored."""
+    url = with_base_url("https://civitai.com/api/download/models/999", cache.url)
+
+    assert requests.get(url, timeout=10).status_code == 404
+    assert cache.store.lookup("999") is None
+
+
+def test_store_index_survives_restart(tmp_path):
+    """Test that the index is persisted and objects are deduplicated."""
+    store = CacheStore(str(tmp_path))
+    for key in ("1", "2"):
+        with store.new_temp() as temp:
+            temp.write(b"same bytes")
+        store.commit(key, temp.name, "ab" * 32, 10, {})
+
+    reopened = CacheStore(str(tmp_path))
+    assert reopened.lookup("1")["sha256"] == reopened.lookup("2")["sha256"]
+    assert len(list((tmp_path / "objects").rglob("ab*"))) == 2  # dir + object
+
+
+@pytest.mark.parametrize(
+    "header,expected",
+    [
+        (None, None),
+        ("bytes=0-9", (0, 9)),
+        ("bytes=90-", (90, 99)),
+        ("bytes=-10", (90, 99)),
+        ("bytes=50-500", (50, 99)),
+    ],
+)
+def test_parse_range(header, expected):
+    """Test single byte-range parsing against a 100-byte object."""
+    assert parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=5-2", "items=0-1", "bytes=-"])
+def test_parse_range_rejects_unsatisfiable(header):
+    """Test that invalid or out-of-bounds ranges raise."""
+    with pytest.raises(ValueError):
+        parse_range(header, 100)
+
+
+def test_with_base_url_only_rewrites_civitai():
+    """Test the client-side base-URL override."""
+    assert with_base_url(URL, "http://nas:8787") == (
+        f"http://nas:8787/api/download/models/{VERSION}"
+    )
+    assert with_base_url("https://example.com/x", "http://nas:8787") == (
+        "https://example.com/x"
+    )
+    assert with_base_url(URL, "https://civitai.com") == URL
+    assert with_base_url("https://evilcivitai.com/x", "http://nas:8787") == (
+        "https://evilcivitai.com/x"
+    )
+    assert with_base_url("https://api.civitai.com/x", "http://nas:8787") == (
+        "http://nas:8787/x"
+    )
@@ -0,0 +1,201 @@
+"""
+# PURPOSE: Tests for cross-process download locks and the in-flight registry.
+
+## DEPENDENCIES:
+    - pytest: Test framework
+    - src.civit.download_lock: Module under test
+"""
+
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from src.civit.download_handler import download_file
+from src.civit.download_lock import DownloadLock, in_flight, lock_path_for
+from src.civit.exceptions import DownloadError
+from src.civit.redirect_cache import ResolvedTarget, redirect_cache
+from tests.test_utils.fake_civitai_server import FakeCivitai, safetensors_bytes
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="fcntl locks only")
+
+
+def hold_and_download(target, started, delay):
+    """Child process: lock the target, 'download' it, record the result."""
+    with DownloadLock(target, "https://civitai.com/api/download/models/1") as lock:
+        started.set()
+        time.sleep(delay)
+        with open(target, "wb") as f:
+            f.write(b"model")
+        lock.release(target)
+
+
+def die_mid_download(target, started):
+    """Child process: lock the target, write part of it, then hang until killed."""
+    DownloadLock(target, "https://civitai.com/api/download/models/1").acquire()
+    with open(target, "wb") as f:
+        f.write(b"partial")
+    started.set()
+    time.sleep(60)
+
+
+def die_after_placing(target, started):
+    """Child process: place a complete target, then hang until killed."""
+    lock = DownloadLock(target, "https://civitai.com/api/download/models/1").acquire()
+    lock.mark_placed(target)
+    started.set()
+    time.sleep(60)
+
+
+def test_second_process_waits_and_reuses_result(tmp_path):
+    """Test that a waiting process sees the file the first one finished."""
+    target = str(tmp_path / "Model_1.safetensors")
+    started = multiprocessing.Event()
+    child = multiprocessing.Process(
+        target=hold_and_download, args=(target, started, 0.3)
+    )
+    child.start()
+    try:
+        assert started.wait(5)
+        with DownloadLock(target) as lock:
+            assert lock.waited
+            assert lock.reusable_result() == target
+    finally:
+        child.join(5)
+
+
+def test_uncontended_lock_does_not_wait(tmp_path):
+    """Test that the first process proceeds and must download itself."""
+    target = str(tmp_path / "a.bin")
+    with DownloadLock(target) as lock:
+        assert not lock.waited
+        assert lock.reusable_result() is None
+    assert os.path.exists(lock_path_for(target))
+
+
+def test_failed_download_is_not_reused(tmp_path):
+    """Test that a waiter downloads itself when the holder failed."""
+    target = str(tmp_path / "a.bin")
+    holder = DownloadLock(target).acquire()
+    waiter = DownloadLock(target)
+    thread = threading.Thread(target=waiter.acquire)
+    thread.start()
+    time.sleep(0.1)
+    holder.release(None)
+    thread.join(5)
+
+    assert waiter.waited
+    assert waiter.previous["status"] == "failed"
+    assert waiter.reusable_result() is None
+    waiter.release()
+
+
+def test_timeout_while_waiting(tmp_path):
+    """Test that a bounded wait raises instead of hanging."""
+    target = str(tmp_path / "a.bin")
+    with DownloadLock(target):
+        with pytest.raises(DownloadError):
+            DownloadLock(target, timeout=0.1).acquire()
+
+
+def test_in_flight_lists_held_locks(tmp_path):
+    """Test that the registry shows only downloads still in progress."""
+    first = DownloadLock(str(tmp_path / "a.bin"), "url-a").acquire()
+    DownloadLock(str(tmp_path / "b.bin"), "url-b").acquire().release("b.bin")
+
+    entries = in_flight(str(tmp_path))
+    first.release()
+
+    assert [entry["url"] for entry in entries] == ["url-a"]
+    assert entries[0]["pid"] == os.getpid()
+    assert in_flight(str(tmp_path)) == []
+
+
+def test_second_download_reuses_locked_result(tmp_path):
+    """Test that download_file waits for an in-flight download of its target."""
+    url = "https://civitai.com/api/download/models/1"
+    target = str(tmp_path / "Model1_1.bin")
+    holder = DownloadLock(target, url).acquire()
+
+    def finish():
+        time.sleep(0.2)
+        with open(target, "wb") as f:
+            f.write(b"model")
+        holder.release(target)
+
+    resolved = ResolvedTarget(
+        url, url, float("inf"), {"content-disposition": "filename=file1.bin"}
+    )
+    thread = threading.Thread(target=finish)
+    with patch(
+        "src.civit.pipeline.redirect_cache.resolve", return_value=resolved
+    ), patch(
+        "src.civit.pipeline.get_model_metadata",
+        return_value={"id": 1, "name": "Model1"},
+    ), patch(
+        "src.civit.pipeline.get_resolved"
+    ) as get_resolved:
+        thread.start()
+        assert download_file(url, str(tmp_path)) is True
+        thread.join(5)
+
+    get_resolved.assert_not_called()
+
+
+def test_target_of_killed_holder_is_downloaded_again(tmp_path):
+    """Test that a file half-written by a killed process is not taken as done."""
+    body = safetensors_bytes(20_000)
+    url = "https://civitai.com/api/download/models/1436228"
+    redirect_cache.clear()
+    with FakeCivitai({"1436228": ("model.safetensors", body)}) as civitai:
+        args = SimpleNamespace(cache_url=civitai.url, api_key=None, custom_naming=True)
+        assert download_file(url, str(tmp_path), args) is True
+        (target,) = tmp_path.glob("*.safetensors")
+
+        started = multiprocessing.Event()
+        child = multiprocessing.Process(
+            target=die_mid_download, args=(str(target), started)
+        )
+        child.start()
+        assert started.wait(5)
+        os.kill(child.pid, signal.SIGKILL)
+        child.join(5)
+
+        assert download_file(url, str(tmp_path), args) is True
+    redirect_cache.clear()
+
+    assert target.read_bytes() == body
+    assert (tmp_path / (target.name + ".corrupt")).read_bytes() == b"partial"
+    assert civitai.requests["GET /storage/1436228"] == 2
+
+
+def test_target_placed_before_holder_died_is_kept(tmp_path):
+    """Test that dying during post-processing does not discard the placed file."""
+    body = safetensors_bytes(20_000)
+    url = "https://civitai.com/api/download/models/1436228"
+    redirect_cache.clear()
+    with FakeCivitai({"1436228": ("model.safetensors", body)}) as civitai:
+        args = SimpleNamespace(cache_url=civitai.url, api_key=None, custom_naming=True)
+        assert download_file(url, str(tmp_path), args) is True
+        (target,) = tmp_path.glob("*.safetensors")
+
+        started = multiprocessing.Event()
+        child = multiprocessing.Process(
+            target=die_after_placing, args=(str(target), started)
+        )
+        child.start()
+        assert started.wait(5)
+        os.kill(child.pid, signal.SIGKILL)
+        child.join(5)
+
+        assert download_file(url, str(tmp_path), args) is True
+    redirect_cache.clear()
+
+    assert target.read_bytes() == body
+    assert not (tmp_path / (target.name + ".corrupt")).exists()
+    assert civitai.requests["GET /storage/1436228"] == 1
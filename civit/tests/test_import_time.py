@@ -0,0 +1,100 @@
+"""
+# PURPOSE: Guard civit CLI startup cost with `python -X importtime`.
+
+## DEPENDENCIES:
+    - pytest: Test framework
+    - subprocess: Fresh interpreters so earlier imports don't hide costs
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Modules that must only load once a download actually starts
+HEAVY_MODULES = ("requests", "urllib3", "tqdm", "unittest.mock")
+
+# Cumulative import budget for src.civit.cli in microseconds
+CLI_IMPORT_BUDGET_US = 100_000
+
+
+def import_times(code: str) -> dict:
+    """
+    Run code under `python -X importtime` and collect cumulative times.
+
+    Args:
+        code: Python source to run in a fresh interpreter
+
+    Returns:
+        Dict mapping module name to cumulative import time in microseconds
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "import src.civit.cli",
+        "from src.civit.cli import parse_args; parse_args(['https://x'])",
+        "import src.civit; src.civit.CivitError",
+    ],
+)
+def test_no_op_paths_skip_http_stack(code):
+    """Test that parsing arguments never imports the HTTP stack."""
+    loaded = import_times(code)
+    assert not [module for module in HEAVY_MODULES if module in loaded]
+
+
+def test_help_exits_without_http_stack():
+    """Test that `civit --help` works and stays off the HTTP stack."""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys\n"
+            "from src.civit.cli import main\n"
+            "try:\n"
+            "    main()\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            "print('requests' in sys.modules)",
+            "--help",
+        ],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert "--min-free" in result.stdout
+    assert result.stdout.strip().endswith("False")
+
+
+def test_lazy_facade_still_resolves():
+    """Test that package-level facade functions load on first access."""
+    import src.civit
+
+    assert callable(src.civit.download_file)
+    assert callable(src.civit.generate_custom_filename)
+
+
+@pytest.mark.slow
+def test_cli_import_budget():
+    """Test that importing the CLI stays within the startup budget."""
+    times = import_times("import src.civit.cli")
+    assert times["src.civit.cli"] < CLI_IMPORT_BUDGET_US
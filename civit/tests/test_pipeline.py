@@ -0,0 +1,398 @@
+"""
+# PURPOSE: Tests for the staged resolve -> fetch -> verify -> place pipeline.
+
+## DEPENDENCIES:
+    - pytest: Test framework
+    - src.civit.pipeline: Module under test
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from src.civit.download_lock import DownloadLock, lock_path_for
+from src.civit.pipeline import DownloadPipeline, expected_sha256, sha256_file
+from src.civit.redirect_cache import ResolvedTarget
+from src.civit.scheduler import DiskBudget, DownloadScheduler
+
+PAYLOADS = {
+    "https://civitai.com/api/download/models/1": b"alpha" * 100,
+    "https://civitai.com/api/download/models/2": b"beta" * 100,
+}
+
+
+class FakeResponse:
+    """Streaming response stand-in for get_resolved."""
+
+    def __init__(self, body, status_code=200, on_first_chunk=None):
+        self.body = body
+        self.status_code = status_code
+        self.headers = {"content-length": str(len(body))}
+        self.on_first_chunk = on_first_chunk
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=1):
+        if self.on_first_chunk:
+            self.on_first_chunk()
+        for start in range(0, len(self.body), 64):
+            yield self.body[start : start + 64]
+
+
+def fake_resolve(url, headers, timeout=10):
+    version = url.rsplit("/", 1)[-1]
+    return ResolvedTarget(
+        url,
+        url,
+        float("inf"),
+        {"content-disposition": f'attachment; filename="file{version}.bin"'},
+    )
+
+
+def fake_metadata(url, api_key=None, args=None):
+    version = url.rsplit("/", 1)[-1]
+    return {
+        "id": int(version),
+        "name": f"Model{version}",
+        "files": [
+            {
+                "name": f"file{version}.bin",
+                "primary": True,
+                "hashes": {"SHA256": hashlib.sha256(PAYLOADS[url]).hexdigest()},
+            }
+        ],
+    }
+
+
+@pytest.fixture
+def stages():
+    """Patch the network-facing helpers the pipeline stages call."""
+    with patch(
+        "src.civit.pipeline.redirect_cache.resolve", side_effect=fake_resolve
+    ), patch(
+        "src.civit.pipeline.get_model_metadata", side_effect=fake_metadata
+    ), patch(
+        "src.civit.pipeline.get_resolved",
+        side_effect=lambda url, headers, target: FakeResponse(PAYLOADS[url]),
+    ) as get_resolved:
+        yield get_resolved
+
+
+def make_jobs():
+    scheduler = DownloadScheduler("fifo")
+    for url in PAYLOADS:
+        scheduler.add(url)
+    return scheduler.ordered()
+
+
+def test_downloads_are_verified_and_placed(tmp_path, stages):
+    """Test that every job ends up under its custom name with no .part left."""
+    items = DownloadPipeline(str(tmp_path)).run(make_jobs())
+
+    assert all(item.ok for item in items)
+    assert (tmp_path / "Model1_1.bin").read_bytes() == PAYLOADS[make_jobs()[0].url]
+    assert (tmp_path / "Model2_2.bin").exists()
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_resolution_overlaps_transfer(tmp_path, stages):
+    """Test that the second file is resolved while the first is transferring."""
+    second_resolved = threading.Event()
+
+    def metadata(url, api_key=None, args=None):
+        if url.endswith("/2"):
+            second_resolved.set()
+        return fake_metadata(url)
+
+    def response(url, headers, target):
+        # The first transfer only proceeds once the next file has resolved
+        wait = (lambda: second_resolved.wait(5)) if url.endswith("/1") else None
+        return FakeResponse(PAYLOADS[url], on_first_chunk=wait)
+
+    stages.side_effect = response
+    with patch("src.civit.pipeline.get_model_metadata", side_effect=metadata):
+        items = DownloadPipeline(str(tmp_path)).run(make_jobs())
+
+    assert second_resolved.is_set()
+    assert all(item.ok for item in items)
+
+
+def test_hash_mismatch_fails_and_removes_part(tmp_path, stages):
+    """Test that a corrupt transfer is reported and not left for resuming."""
+    stages.side_effect = lambda url, headers, target: FakeResponse(b"corrupt")
+
+    items = DownloadPipeline(str(tmp_path)).run(make_jobs()[:1])
+
+    assert not items[0].ok
+    assert "SHA256" in items[0].error
+    assert not list(tmp_path.glob("*.bin*"))
+
+
+def test_existing_file_is_skipped(tmp_path, stages):
+    """Test that a file already in place is not downloaded again."""
+    (tmp_path / "Model1_1.bin").write_bytes(b"old")
+
+    items = DownloadPipeline(str(tmp_path)).run(make_jobs()[:1])
+
+    assert items[0].ok and items[0].skipped
+    stages.assert_not_called()
+    assert (tmp_path / "Model1_1.bin").read_bytes() == b"old"
+
+
+def test_partial_file_is_resumed(tmp_path, stages):
+    """Test that an existing .part file is continued with a Range request."""
+    url = make_jobs()[0].url
+    body = PAYLOADS[url]
+    (tmp_path / "Model1_1.bin.part").write_bytes(body[:100])
+    seen = {}
+
+    def response(url, headers, target):
+        seen.update(headers)
+        return FakeResponse(body[100:], status_code=206)
+
+    stages.side_effect = response
+    items = DownloadPipeline(str(tmp_path)).run(make_jobs()[:1])
+
+    assert items[0].ok
+    assert seen["Range"] == "bytes=100-"
+    assert (tmp_path / "Model1_1.bin").read_bytes() == body
+
+
+@pytest.mark.parametrize("extra", [b"", b"junk"])
+def test_unsatisfiable_resume(tmp_path, stages, extra):
+    """Test that a complete .part is verified and an oversized one refetched."""
+    url = make_jobs()[0].url
+    body = PAYLOADS[url]
+    (tmp_path / "Model1_1.bin.part").write_bytes(body + extra)
+    ranges = []
+
+    def response(url, headers, target):
+        ranges.append(headers.get("Range"))
+        if "Range" not in headers:
+            return FakeResponse(body)
+        refused = FakeResponse(b"", status_code=416)
+        refused.headers["content-range"] = f"bytes */{len(body)}"
+        return refused
+
+    stages.side_effect = response
+    items = DownloadPipeline(str(tmp_path)).run(make_jobs()[:1])
+
+    assert items[0].ok
+    assert (tmp_path / "Model1_1.bin").read_bytes() == body
+    assert not list(tmp_path.glob("*.part"))
+    assert ranges == [f"bytes={len(body + extra)}-"] + ([None] if extra else [])
+
+
+def test_lock_records_placed_before_post_processing(tmp_path, stages):
+    """Test that a holder dying during extras leaves its file marked complete."""
+    statuses = []
+
+    class Extras:
+        def finish(self, path):
+            with open(lock_path_for(path)) as f:
+                statuses.append(json.load(f)["status"])
+
+        def discard(self):
+            pass
+
+    with patch("src.civit.pipeline.start_extras", return_value=Extras()):
+        items = DownloadPipeline(str(tmp_path)).run(make_jobs()[:1])
+
+    assert items[0].ok
+    assert statuses == ["placed"]
+
+
+def test_budget_released_after_run(tmp_path, stages):
+    """Test that reservations are returned whether a job succeeds or fails."""
+    budget = DiskBudget(str(tmp_path))
+    jobs = make_jobs()
+    for job in jobs:
+        job.size = 500
+
+    DownloadPipeline(str(tmp_path), budget=budget).run(jobs)
+
+    assert budget.reserved == 0
+    assert budget.committed == 1000
+
+
+def test_args_control_naming(tmp_path, stages):
+    """Test that --no-custom-naming keeps the server-provided filename."""
+    args = SimpleNamespace(custom_naming=False, api_key=None)
+
+    DownloadPipeline(str(tmp_path), args).run(make_jobs()[:1])
+
+    assert (tmp_path / "file1.bin").exists()
+
+
+def test_zip_extracted_during_transfer(tmp_path, stages, monkeypatch):
+    """Test that --extract unpacks a bundle under the custom-named prefix."""
+    url = make_jobs()[0].url
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("style.pt", b"embedding" * 100)
+    monkeypatch.setitem(PAYLOADS, url, buffer.getvalue())
+    target = ResolvedTarget(
+        url, url, float("inf"), {"content-disposition": "filename=pack.zip"}
+    )
+    args = SimpleNamespace(extract=True, api_key=None)
+
+    with patch("src.civit.pipeline.redirect_cache.resolve", return_value=target):
+        items = DownloadPipeline(str(tmp_path), args).run(make_jobs()[:1])
+
+    assert items[0].ok
+    assert items[0].extractor.complete
+    assert (tmp_path / "Model1_1.zip").exists()
+    assert (tmp_path / "Model1_1_style.pt").read_bytes() == b"embedding" * 100
+
+
+def test_failed_transfer_discards_extracted_members(tmp_path, stages, monkeypatch):
+    """Test that members streamed out of a failed download are removed."""
+    url = make_jobs()[0].url
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        archive.writestr("a.pt", b"a" * 1000)
+        archive.writestr("b.pt", b"b" * 5000)
+    data = buffer.getvalue()
+    target = ResolvedTarget(
+        url, url, float("inf"), {"content-disposition": "filename=pack.zip"}
+    )
+
+    class Dropped(FakeResponse):
+        def iter_content(self, chunk_size=1):
+            yield from super().iter_content(chunk_size)
+            raise requests.ConnectionError("connection reset")
+
+    stages.side_effect = lambda url, headers, target: Dropped(data[:3000])
+    args = SimpleNamespace(extract=True, api_key=None)
+    with patch("src.civit.pipeline.redirect_cache.resolve", return_value=target):
+        items = DownloadPipeline(str(tmp_path), args).run(make_jobs()[:1])
+
+    assert "connection reset" in items[0].error
+    assert not list(tmp_path.glob("*.pt*"))
+    assert (tmp_path / "Model1_1.zip.part").exists()
+
+
+def test_item_locked_by_another_process_is_reused(tmp_path, stages):
+    """Test that the fetch stage waits for a lock and reuses the result."""
+    target = str(tmp_path / "Model1_1.bin")
+    holder = DownloadLock(target).acquire()
+
+    def finish():
+        time.sleep(0.2)
+        with open(target, "wb") as f:
+            f.write(b"from other process")
+        holder.release(target)
+
+    thread = threading.Thread(target=finish)
+    thread.start()
+    items = DownloadPipeline(str(tmp_path)).run(make_jobs()[:1])
+    thread.join(5)
+
+    assert items[0].ok and items[0].skipped
+    stages.assert_not_called()
+
+
+def test_existing_file_is_only_trusted_under_the_lock(tmp_path, stages):
+    """Test that a file still being written by a lock holder is waited for."""
+    target = tmp_path / "Model1_1.bin"
+    body = PAYLOADS[make_jobs()[0].url]
+    holder = DownloadLock(str(target)).acquire()
+    target.write_bytes(body[:10])
+    released = threading.Event()
+
+    def finish():
+        time.sleep(0.2)
+        target.write_bytes(body)
+        holder.release(str(target))
+        released.set()
+
+    thread = threading.Thread(target=finish)
+    thread.start()
+    items = DownloadPipeline(str(tmp_path)).run(make_jobs()[:1])
+    thread.join(5)
+
+    assert items[0].ok and items[0].skipped
+    assert released.is_set()
+    assert target.read_bytes() == body
+
+
+def test_failed_place_records_failure(tmp_path, stages):
+    """Test that a failure after the transfer is not published as done."""
+    budget = DiskBudget(str(tmp_path))
+    jobs = make_jobs()[:1]
+    jobs[0].size = 500
+    with patch("src.civit.pipeline.uses_header_fields", return_value=True), patch(
+        "src.civit.pipeline.apply_header_pattern", side_effect=OSError("rename failed")
+    ):
+        items = DownloadPipeline(str(tmp_path), budget=budget).run(jobs)
+
+    assert "rename failed" in items[0].error
+    assert budget.reserved == 0 and budget.committed == 0
+    with DownloadLock(str(tmp_path / "Model1_1.bin")) as lock:
+        assert lock.previous["status"] == "failed"
+        assert lock.previous["result"] is None
+
+
+def test_validation_error_survives_missing_part(tmp_path, stages):
+    """Test that a vanished .part does not mask the validation failure."""
+
+    def vanish(path):
+        os.remove(path)
+        return "0" * 64
+
+    with patch("src.civit.pipeline.sha256_file", side_effect=vanish):
+        items = DownloadPipeline(str(tmp_path)).run(make_jobs()[:1])
+
+    assert "SHA256" in items[0].error
+
+
+def test_cancel_stops_transfer_and_keeps_part(tmp_path, stages):
+    """Test that cancelling releases the item and leaves its .part to resume."""
+    # One resolver keeps the jobs in order, so the first one is cancelled
+    pipeline = DownloadPipeline(str(tmp_path), resolve_workers=1)
+    stages.side_effect = lambda url, headers, target: FakeResponse(
+        PAYLOADS[url], on_first_chunk=pipeline.cancel
+    )
+
+    items = pipeline.run(make_jobs())
+
+    assert [item.error for item in items] == ["fetch: cancelled", "cancelled"]
+    assert (tmp_path / "Model1_1.bin.part").exists()
+    assert not (tmp_path / "Model1_1.bin").exists()
+    with DownloadLock(str(tmp_path / "Model1_1.bin")) as lock:
+        assert not lock.waited
+
+
+def test_sha256_helpers(tmp_path):
+    """Test hashing and expected-hash lookup by filename and primary flag."""
+    path = tmp_path / "f.bin"
+    path.write_bytes(b"abc")
+    digest = hashlib.sha256(b"abc").hexdigest().upper()
+    metadata = {
+        "files": [
+            {"name": "other.bin", "primary": True, "hashes": {"SHA256": "AA"}},
+            {"name": "f.bin", "hashes": {"SHA256": digest}},
+        ]
+    }
+
+    assert sha256_file(str(path)) == digest
+    assert expected_sha256(metadata, "f.bin") == digest
+    assert expected_sha256(metadata, "missing.bin") == "AA"
+    assert expected_sha256({}, "f.bin") is None
+
@@ -0,0 +1,138 @@
+"""
+# PURPOSE: Tests for the shared throttled progress renderer.
+
+## DEPENDENCIES:
+    - pytest: Test framework
+    - src.civit.progress: Module under test
+"""
+
+import io
+import json
+import time
+
+import pytest
+
+from src.civit.progress import ProgressRenderer, format_bytes, format_eta
+
+
+def events(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_jsonl_reports_each_transfer_and_totals():
+    """Test that jsonl mode emits start, progress, total and done events."""
+    stream = io.StringIO()
+    renderer = ProgressRenderer("jsonl", interval=0.01, stream=stream)
+
+    with renderer.track("a.safetensors", 100) as a, renderer.track("b.zip", 50) as b:
+        a.done += 60
+        b.done += 10
+        time.sleep(0.05)
+        a.done += 40
+        b.done += 40
+    renderer.close()
+
+    records = events(stream)
+    kinds = {r["event"] for r in records}
+    assert {"start", "progress", "total", "done"} <= kinds
+    done = {r["file"]: r for r in records if r["event"] == "done"}
+    assert done["a.safetensors"]["bytes"] == 100 and done["a.safetensors"]["ok"]
+    assert done["b.zip"]["bytes"] == 50
+    totals = [r for r in records if r["event"] == "total"]
+    assert totals[-1]["files"] == 2
+    assert max(r["bytes"] for r in totals) <= 150
+
+
+def test_redraws_are_throttled():
+    """Test that many counter updates produce only a handful of frames."""
+    stream = io.StringIO()
+    renderer = ProgressRenderer("jsonl", interval=0.05, stream=stream)
+
+    with renderer.track("big.bin", 10**6) as transfer:
+        for _ in range(100000):
+            transfer.done += 10
+    renderer.close()
+
+    frames = [r for r in events(stream) if r["event"] == "progress"]
+    assert len(frames) < 20
+
+
+def test_jsonl_totals_only_when_changed():
+    """Test that a stalled transfer does not repeat the same total every tick."""
+    stream = io.StringIO()
+    renderer = ProgressRenderer("jsonl", interval=0.01, stream=stream)
+
+    with renderer.track("stalled.bin", 100):
+        time.sleep(0.2)
+    renderer.close()
+
+    totals = [r for r in events(stream) if r["event"] == "total"]
+    assert 1 <= len(totals) <= 2
+
+
+def test_bar_mode_prints_final_line_when_not_a_terminal():
+    """Test that logs and pipes get one completion line per file."""
+    stream = io.StringIO()
+    renderer = ProgressRenderer("bar", interval=0.01, stream=stream)
+
+    with renderer.track("model.safetensors", 2048) as transfer:
+        transfer.done += 2048
+    with pytest.raises(OSError):
+        with renderer.track("broken.bin", 10) as transfer:
+            raise OSError("disk full")
+    renderer.close()
+
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 2
+    assert "model.safetensors" in lines[0] and "100.0%" in lines[0]
+    assert lines[0].endswith("done")
+    assert lines[1].endswith("failed")
+
+
+def test_none_mode_tracks_without_drawing():
+    """Test that the disabled renderer neither draws nor keeps transfers."""
+    stream = io.StringIO()
+    renderer = ProgressRenderer("none", stream=stream)
+
+    with renderer.track("quiet.bin", 10) as transfer:
+        transfer.done += 10
+    renderer.close()
+
+    assert stream.getvalue() == ""
+    assert renderer.active == []
+
+
+def test_unknown_mode_rejected():
+    """Test that an invalid mode raises."""
+    with pytest.raises(ValueError):
+        ProgressRenderer("fancy")
+
+
+def test_rate_and_eta():
+    """Test throughput smoothing and time remaining for one transfer."""
+    renderer = ProgressRenderer("none")
+    transfer = renderer.track("f", total=1000)
+    start = transfer.started
+
+    transfer.done = 100
+    assert transfer.sample(start + 1) == pytest.approx(100)
+    assert transfer.eta() == pytest.approx(9)
+
+    transfer.done = 300
+    assert transfer.sample(start + 2) == pytest.approx(0.3 * 200 + 0.7 * 100)
+
+
+@pytest.mark.parametrize(
+    "size,expected",
+    [(512, "512 B"), (1536, "1.5 KiB"), (5 * 1024**3, "5.0 GiB")],
+)
+def test_format_bytes(size, expected):
+    """Test binary unit formatting."""
+    assert format_bytes(size) == expected
+
+
+def test_format_eta():
+    """Test ETA formatting with and without hours."""
+    assert format_eta(None) == "--:--"
+    assert format_eta(75) == "01:15"
+    assert format_eta(3725) == "1:02:05"
@@ -0,0 +1,126 @@
+"""
+# PURPOSE: Tests for the resolved CDN redirect cache.
+
+## DEPENDENCIES:
+    - pytest: Test framework
+    - unittest.mock: For mocking the HEAD request
+    - src.civit.redirect_cache: Module under test
+"""
+
+import time
+from unittest.mock import MagicMock, patch
+
+from src.civit.redirect_cache import (
+    RedirectCache,
+    ResolvedTarget,
+    cache_key,
+    headers_for_target,
+    parse_expiry,
+)
+
+SIGNED_URL = (
+    "https://b2.civitai.com/file/model.safetensors"
+    "?X-Amz-Date=20240101T000000Z&X-Amz-Expires=86400&X-Amz-Signature=abc"
+)
+
+
+def make_head_response(url, status_code=200):
+    """Build a mock HEAD response usable as a context manager."""
+    response = MagicMock()
+    response.url = url
+    response.status_code = status_code
+    response.headers = {
+        "content-disposition": 'attachment; filename="model.safetensors"'
+    }
+    response.__enter__.return_value = response
+    return response
+
+
+def test_cache_key_uses_version_and_file_options():
+    """Test that keys ignore tokens but keep file selection options."""
+    base = "https://civitai.com/api/download/models/1609305"
+    assert cache_key(base) == "1609305"
+    assert cache_key(f"{base}?type=Model&format=SafeTensor") == (
+        "1609305?format=SafeTensor&type=Model"
+    )
+    assert cache_key(f"{base}?format=SafeTensor&token=x&type=Model") == (
+        "1609305?format=SafeTensor&type=Model"
+    )
+
+
+def test_parse_expiry():
+    """Test expiry extraction from signed URLs."""
+    assert parse_expiry(SIGNED_URL) == 1704067200 + 86400
+    assert parse_expiry("https://cdn.example/f?Expires=1700000000") == 1700000000
+    assert parse_expiry("https://cdn.example/f") is None
+
+
+def test_resolve_reuses_cached_target():
+    """Test that only the first resolution walks the redirect chain."""
+    cache = RedirectCache()
+    url = "https://civitai.com/api/download/models/1609305"
+    final = "https://cdn.example/model.safetensors?Expires=%d" % (time.time() + 3600)
+    with patch("src.civit.redirect_cache.requests.head") as mock_head:
+        mock_head.return_value = make_head_response(final)
+        first = cache.resolve(url, {})
+        second = cache.resolve(url, {})
+
+    assert mock_head.call_count == 1
+    assert not first.from_cache
+    assert second.from_cache
+    assert second.final_url == final
+    assert "filename=" in second.headers["content-disposition"]
+
+
+def test_expired_and_invalidated_targets_are_re_resolved():
+    """Test that expiry and invalidation force a new HEAD request."""
+    cache = RedirectCache()
+    url = "https://civitai.com/api/download/models/1"
+    expired = "https://cdn.example/f?Expires=%d" % (time.time() - 10)
+    fresh = "https://cdn.example/f?Expires=%d" % (time.time() + 3600)
+    with patch("src.civit.redirect_cache.requests.head") as mock_head:
+        mock_head.side_effect = [
+            make_head_response(expired),
+            make_head_response(fresh),
+            make_head_response(fresh),
+        ]
+        cache.resolve(url, {})
+        assert cache.resolve(url, {}).final_url == fresh
+        cache.invalidate(url)
+        cache.resolve(url, {})
+
+    assert mock_head.call_count == 3
+
+
+def test_failures_are_not_cached():
+    """Test that error responses are not stored."""
+    cache = RedirectCache()
+    url = "https://civitai.com/api/download/models/2"
+    with patch("src.civit.redirect_cache.requests.head") as mock_head:
+        mock_head.return_value = make_head_response(url, status_code=401)
+        cache.resolve(url, {})
+    assert cache.get(url) is None
+
+
+def test_key_locks_do_not_accumulate():
+    """Test that per-key locks are dropped once each resolution finishes."""
+    cache = RedirectCache()
+    with patch("src.civit.redirect_cache.requests.head") as mock_head:
+        for version in range(20):
+            url = f"https://civitai.com/api/download/models/{version}"
+            mock_head.return_value = make_head_response(
+                url, status_code=404 if version % 2 else 200
+            )
+            cache.resolve(url, {})
+
+    assert cache._key_locks == {}
+
+
+def test_headers_for_target_drops_auth_for_storage_host():
+    """Test that the bearer token is not sent to the signed storage URL."""
+    headers = {"Authorization": "Bearer key", "User-Agent": "civit-cli/1.0"}
+    source = "https://civitai.com/api/download/models/1"
+    offsite = ResolvedTarget(source, SIGNED_URL, time.time() + 60)
+    onsite = ResolvedTarget(source, source, time.time() + 60)
+    assert headers_for_target(offsite, headers) == {"User-Agent": "civit-cli/1.0"}
+    assert headers_for_target(onsite, headers) == headers
@@ -0,0 +1,159 @@
+"""
+# PURPOSE: Tests for safetensors header inspection.
+
+## DEPENDENCIES:
+    - pytest: Test framework
+    - src.civit.safetensors_header: Module under test
+    - src.civit.filename_pattern: Header fields in filename patterns
+    - tests.test_utils.fake_civitai_server: Local Civitai stand-in
+"""
+
+import json
+import struct
+from types import SimpleNamespace
+
+import pytest
+
+from src.civit.download_handler import apply_header_pattern, download_file
+from src.civit.exceptions import FileValidationError
+from src.civit.filename_pattern import process_filename_pattern
+from src.civit.safetensors_header import (
+    header_fields,
+    read_safetensors_header,
+    uses_header_fields,
+    validate_safetensors_file,
+)
+from src.civit.redirect_cache import redirect_cache
+from tests.test_utils.fake_civitai_server import FakeCivitai, safetensors_bytes
+from tests.test_utils.mock_data_loader import load_mock_version_metadata
+
+
+def write_safetensors(path, truncate_by=0, metadata=None):
+    """Write a minimal two-tensor safetensors file."""
+    header = {
+        "a": {"dtype": "F16", "shape": [2, 2], "data_offsets": [0, 8]},
+        "b": {"dtype": "F16", "shape": [4], "data_offsets": [8, 16]},
+        "c": {"dtype": "F32", "shape": [1], "data_offsets": [16, 20]},
+    }
+    if metadata is not None:
+        header["__metadata__"] = metadata
+    raw = json.dumps(header).encode()
+    data = b"\0" * (20 - truncate_by)
+    path.write_bytes(struct.pack("<Q", len(raw)) + raw + data)
+    return path
+
+
+def test_read_header_fields(tmp_path):
+    """Test parsing tensor count, dtype and metadata."""
+    path = write_safetensors(
+        tmp_path / "model.safetensors",
+        metadata={"ss_base_model_version": "sdxl_base_v1-0", "modelspec.title": "X"},
+    )
+    header = read_safetensors_header(str(path))
+    assert header.tensor_count == 3
+    assert header.dtype == "F16"
+    assert header.is_complete
+
+    fields = header_fields(header)
+    assert fields["st_tensor_count"] == "3"
+    assert fields["ss_base_model"] == "sdxl_base_v1-0"
+    assert fields["modelspec_title"] == "X"
+
+
+def test_truncated_file_is_rejected(tmp_path):
+    """Test that a partial download fails validation."""
+    path = write_safetensors(tmp_path / "model.safetensors", truncate_by=5)
+    assert not read_safetensors_header(str(path)).is_complete
+    with pytest.raises(FileValidationError, match="truncated"):
+        validate_safetensors_file(str(path))
+
+
+@pytest.mark.parametrize(
+    "content",
+    [b"", b"\x01\x02", struct.pack("<Q", 1000) + b"{}", struct.pack("<Q", 2) + b"[]"],
+)
+def test_malformed_headers(tmp_path, content):
+    """Test that malformed files raise FileValidationError."""
+    path = tmp_path / "bad.safetensors"
+    path.write_bytes(content)
+    with pytest.raises(FileValidationError):
+        read_safetensors_header(str(path))
+
+
+@pytest.mark.parametrize(
+    "info",
+    [
+        {"dtype": "F16", "shape": [2], "data_offsets": ["0", "4"]},
+        {"dtype": "F16", "shape": [2], "data_offsets": [0, 4.5]},
+        {"dtype": "F16", "shape": [2], "data_offsets": [-4, 4]},
+        {"dtype": "F16", "shape": ["2"], "data_offsets": [0, 4]},
+        {"dtype": "F16", "shape": 2, "data_offsets": [0, 4]},
+        {"dtype": "F16", "shape": [True], "data_offsets": [0, 4]},
+        {"dtype": 16, "shape": [2], "data_offsets": [0, 4]},
+    ],
+)
+def test_mistyped_tensor_entries(tmp_path, info):
+    """Test that wrongly typed offsets, shapes and dtypes fail validation."""
+    raw = json.dumps({"t": info}).encode()
+    path = tmp_path / "bad.safetensors"
+    path.write_bytes(struct.pack("<Q", len(raw)) + raw + b"\0" * 4)
+    with pytest.raises(FileValidationError):
+        validate_safetensors_file(str(path))
+
+
+def test_truncated_download_is_not_kept(tmp_path):
+    """Test that a truncated download is removed and fetched again next run."""
+    body = safetensors_bytes(20_000)
+    url = "https://civitai.com/api/download/models/1436228"
+    redirect_cache.clear()
+    with FakeCivitai({"1436228": ("model.safetensors", body[:-500])}) as civitai:
+        args = SimpleNamespace(cache_url=civitai.url, api_key=None, custom_naming=True)
+        assert download_file(url, str(tmp_path), args) is False
+        assert not [p for p in tmp_path.iterdir() if p.is_file()]
+
+        civitai.files["1436228"] = ("model.safetensors", body)
+        assert download_file(url, str(tmp_path), args) is True
+    redirect_cache.clear()
+
+    (model,) = tmp_path.glob("*.safetensors")
+    assert model.read_bytes() == body
+
+
+def test_uses_header_fields():
+    """Test detection of patterns that need the file on disk."""
+    assert uses_header_fields("{model_name}-{ss_base_model}")
+    assert uses_header_fields("{st_dtype}_{model_id}")
+    assert not uses_header_fields("{model_name}_{model_id}")
+    assert not uses_header_fields(None)
+
+
+def test_pattern_with_header_fields(tmp_path):
+    """Test filling a filename pattern from the safetensors header."""
+    path = write_safetensors(
+        tmp_path / "model.safetensors", metadata={"ss_base_model_version": "sd_v1"}
+    )
+    result = process_filename_pattern(
+        "{model_name}_{ss_base_model}_{st_dtype}.{ext}",
+        {"model_name": "Test"},
+        "model.safetensors",
+        file_path=str(path),
+    )
+    assert result == "Test_sd_v1_F16.safetensors"
+
+
+def test_header_rename_uses_api_fields(tmp_path):
+    """Test that header renames fill the same API fields as custom naming."""
+    path = write_safetensors(
+        tmp_path / "model.safetensors", metadata={"ss_base_model_version": "sd_v1"}
+    )
+    metadata = load_mock_version_metadata("1436228")
+
+    renamed = apply_header_pattern(
+        str(path),
+        "{model_type}_{base_model}_{version_id}_{ss_base_model}",
+        metadata,
+        "model.safetensors",
+    )
+
+    assert renamed == str(tmp_path / "LORA_Pony_1436228_sd_v1.safetensors")
+    assert not path.exists()
@@ -0,0 +1,97 @@
+"""
+# PURPOSE: Tests for size-aware download scheduling.
+
+## DEPENDENCIES:
+    - pytest: Test framework
+    - src.civit.scheduler: Module under test
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from src.civit.redirect_cache import ResolvedTarget
+from src.civit.scheduler import (
+    DiskBudget,
+    DownloadScheduler,
+    parse_size,
+    size_from_metadata,
+)
+
+GB = 1024**3
+MB = 1024**2
+
+
+def make_scheduler(policy, budget=None):
+    """Scheduler with a big checkpoint queued ahead of small LoRAs."""
+    scheduler = DownloadScheduler(policy, budget)
+    scheduler.add("checkpoint", size=7 * GB)
+    scheduler.add("lora-a", size=20 * MB)
+    scheduler.add("unknown")
+    scheduler.add("lora-b", size=10 * MB, priority=5)
+    return scheduler
+
+
+@pytest.mark.parametrize(
+    "policy,expected",
+    [
+        ("fifo", ["checkpoint", "lora-a", "unknown", "lora-b"]),
+        ("shortest-first", ["lora-b", "lora-a", "checkpoint", "unknown"]),
+        ("largest-first", ["checkpoint", "lora-a", "lora-b", "unknown"]),
+        ("priority", ["lora-b", "lora-a", "checkpoint", "unknown"]),
+    ],
+)
+def test_policy_order(policy, expected):
+    """Test that each policy orders jobs as documented."""
+    assert [job.url for job in make_scheduler(policy).ordered()] == expected
+
+
+def test_unknown_policy_rejected():
+    """Test that an invalid policy name raises."""
+    with pytest.raises(ValueError):
+        DownloadScheduler("random")
+
+
+def test_budget_skips_jobs_that_do_not_fit(tmp_path):
+    """Test that jobs exceeding the budget are skipped, not started."""
+    budget = DiskBudget(str(tmp_path), limit=100 * MB)
+    scheduler = make_scheduler("shortest-first", budget)
+    started = []
+
+    assert not scheduler.run(lambda job: started.append(job.url) or True)
+    assert started == ["lora-b", "lora-a", "unknown"]
+    assert budget.committed == 30 * MB
+    assert budget.reserved == 0
+
+
+def test_min_free_respects_filesystem_space(tmp_path):
+    """Test that reservations keep min_free bytes available."""
+    budget = DiskBudget(str(tmp_path / "not-created-yet"), min_free=5 * GB)
+    with patch.object(DiskBudget, "free", return_value=6 * GB):
+        assert budget.try_reserve(512 * MB)
+        assert not budget.try_reserve(600 * MB)
+        budget.release(512 * MB, written=False)
+        assert budget.try_reserve(600 * MB)
+
+
+def test_probe_sizes_uses_metadata_and_head():
+    """Test that sizes come from metadata first, then Content-Length."""
+    scheduler = DownloadScheduler("shortest-first")
+    from_meta = scheduler.add("a", metadata={"files": [{"primary": True, "sizeKB": 2}]})
+    from_head = scheduler.add("b")
+    target = ResolvedTarget("b", "b", 0, {"content-length": "4096"})
+    with patch(
+        "src.civit.redirect_cache.redirect_cache.resolve", return_value=target
+    ) as head:
+        scheduler.probe_sizes({})
+    assert from_meta.size == 2048
+    assert from_head.size == 4096
+    head.assert_called_once_with("b", {})
+
+
+@pytest.mark.parametrize(
+    "value,expected", [("0", 0), ("512", 512), ("10G", 10 * GB), ("1.5M", 1.5 * MB)]
+)
+def test_parse_size(value, expected):
+    """Test human-readable size parsing."""
+    assert parse_size(value) == int(expected)
@@ -0,0 +1,152 @@
+"""
+# PURPOSE: Tests for preview images and metadata sidecars.
+
+## DEPENDENCIES:
+    - pytest: Test framework
+    - src.civit.sidecar: Module under test
+    - tests.test_utils.fake_civitai_server: Local Civitai stand-in
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.civit.download_handler import download_file
+from src.civit.pipeline import DownloadPipeline
+from src.civit.redirect_cache import redirect_cache
+from src.civit.scheduler import DownloadJob
+from src.civit.sidecar import ExtrasFetch, preview_urls
+from tests.test_utils.fake_civitai_server import FakeCivitai, safetensors_bytes
+from tests.test_utils.mock_data_loader import load_mock_version_metadata
+
+VERSIONS = ("1436228", "1447126")
+IMAGES = {"first.png": b"\x89PNG one", "second.jpeg": b"jpeg two", "third.png": b"3"}
+
+
+@pytest.fixture
+def civitai():
+    """Stand-in serving two models, each listing the same three previews."""
+    files = {v: (f"model_{v}.safetensors", safetensors_bytes(50_000)) for v in VERSIONS}
+    redirect_cache.clear()
+    with FakeCivitai(files, IMAGES) as fake:
+        yield fake
+    redirect_cache.clear()
+
+
+def extras_args(fake, **overrides):
+    args = dict(
+        cache_url=fake.url, api_key=None, custom_naming=True, previews=2, sidecar=True
+    )
+    args.update(overrides)
+    return SimpleNamespace(**args)
+
+
+def test_download_saves_previews_and_sidecar(civitai, tmp_path):
+    """Test that extras land next to the custom-named model file."""
+    url = f"https://civitai.com/api/download/models/{VERSIONS[0]}"
+    assert download_file(url, str(tmp_path), extras_args(civitai)) is True
+
+    (model,) = tmp_path.glob("*.safetensors")
+    stem = str(model)[: -len(".safetensors")]
+    assert open(stem + ".preview.png", "rb").read() == IMAGES["first.png"]
+    assert open(stem + ".preview.2.jpeg", "rb").read() == IMAGES["second.jpeg"]
+    assert civitai.requests["GET /images/third.png"] == 0
+    with open(stem + ".civitai.json") as f:
+        assert str(json.load(f)["id"]) == VERSIONS[0]
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_pipeline_fetches_extras_for_each_model(civitai, tmp_path):
+    """Test that every pipelined download gets its own extras."""
+    # The CLI rewrites URLs onto the cache base before they reach the pipeline
+    jobs = [
+        DownloadJob(f"{civitai.url}/api/download/models/{v}", i)
+        for i, v in enumerate(VERSIONS)
+    ]
+    pipeline = DownloadPipeline(str(tmp_path), extras_args(civitai, previews=1))
+
+    items = pipeline.run(jobs)
+
+    assert all(item.ok for item in items)
+    assert len(list(tmp_path.glob("*.preview.png"))) == 2
+    assert len(list(tmp_path.glob("*.civitai.json"))) == 2
+    assert civitai.requests["GET /images/first.png"] == 2
+
+
+def test_no_extras_by_default(civitai, tmp_path):
+    """Test that nothing beyond the model is fetched unless requested."""
+    url = f"https://civitai.com/api/download/models/{VERSIONS[0]}"
+    args = extras_args(civitai, previews=0, sidecar=False)
+    assert download_file(url, str(tmp_path), args) is True
+
+    assert [p.suffix for p in tmp_path.iterdir() if p.is_file()] == [".safetensors"]
+    assert not any(key.startswith("GET /images/") for key in civitai.requests)
+
+
+def test_extras_follow_renamed_model(civitai, tmp_path):
+    """Test that extras move with a model renamed after download."""
+    metadata = civitai.metadata(VERSIONS[0])
+    extras = ExtrasFetch(str(tmp_path / "a.safetensors"), metadata, previews=1)
+
+    moved = extras.start().finish(str(tmp_path / "b.safetensors"))
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "b.civitai.json",
+        "b.preview.png",
+    ]
+    assert len(moved) == 2
+
+
+def test_discard_removes_extras(civitai, tmp_path):
+    """Test that a failed model download leaves no orphaned extras."""
+    metadata = civitai.metadata(VERSIONS[0])
+    ExtrasFetch(str(tmp_path / "a.safetensors"), metadata, previews=3).start().discard()
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_existing_extras_are_kept(civitai, tmp_path):
+    """Test that extras never overwrite files, and discard leaves them alone."""
+    metadata = civitai.metadata(VERSIONS[0])
+    (tmp_path / "a.civitai.json").write_text("mine")
+    (tmp_path / "a.preview.png").write_bytes(b"mine")
+
+    extras = ExtrasFetch(str(tmp_path / "a.safetensors"), metadata, previews=2)
+    extras.start().discard()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "a.civitai.json",
+        "a.preview.png",
+    ]
+    assert (tmp_path / "a.civitai.json").read_text() == "mine"
+    assert (tmp_path / "a.preview.png").read_bytes() == b"mine"
+    assert civitai.requests["GET /images/first.png"] == 0
+    assert civitai.requests["GET /images/second.jpeg"] == 1
+
+
+def test_renamed_extras_do_not_overwrite(civitai, tmp_path):
+    """Test that extras following a renamed model skip names already taken."""
+    metadata = civitai.metadata(VERSIONS[0])
+    (tmp_path / "b.civitai.json").write_text("mine")
+    extras = ExtrasFetch(str(tmp_path / "a.safetensors"), metadata, previews=1)
+
+    moved = extras.start().finish(str(tmp_path / "b.safetensors"))
+
+    assert moved == [str(tmp_path / "b.preview.png")]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "b.civitai.json",
+        "b.preview.png",
+    ]
+    assert (tmp_path / "b.civitai.json").read_text() == "mine"
+
+
+def test_preview_urls_skip_videos():
+    """Test preview selection against real version metadata."""
+    metadata = load_mock_version_metadata("1436228")
+
+    urls = preview_urls(metadata, 2)
+
+    assert len(urls) == 2
+    assert not any(url.endswith(".mp4") for url in urls)
+    assert urls[0] == metadata["images"][1]["url"]
@@ -0,0 +1,299 @@
+"""
+Local HTTP stand-in for the Civitai API and its storage host.
+
+Serves model-version metadata (from tests/mock_data when available),
+redirects /api/download/models/<id> to signed storage URLs like the real
+site, and serves file bodies with Range support. Optional preview images
+are served under /images/ and listed in the metadata. Every request is
+counted by method and path, so tests can assert how often "upstream" was hit.
+
+For load tests it can also answer any model or version id with canned
+metadata, add latency to API calls and throttle a share of them with 429s.
+Storage can be throttled like a CDN: a per-connection byte rate, and 429s
+for connections beyond a concurrency limit.
+"""
+
+import functools
+import hashlib
+import json
+import random
+import re
+import struct
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from .mock_data_loader import get_mock_data_path
+
+
+def safetensors_bytes(
+    data_size: int, metadata: Optional[Dict[str, str]] = None
+) -> bytes:
+    """Build a valid safetensors file holding one U8 tensor of data_size bytes."""
+    header = {
+        "weight": {"dtype": "U8", "shape": [data_size], "data_offsets": [0, data_size]}
+    }
+    if metadata:
+        header["__metadata__"] = metadata
+    raw = json.dumps(header).encode()
+    return struct.pack("<Q", len(raw)) + raw + bytes(i % 251 for i in range(data_size))
+
+
+@functools.lru_cache(maxsize=None)
+def _mock_text(filename: str) -> str:
+    with open(get_mock_data_path(filename)) as f:
+        return f.read()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Benchmarks open many connections at once; the default backlog of 5
+    # would turn bursts into SYN retransmits and skew latencies
+    request_queue_size = 256
+
+
+class FakeCivitai:
+    """Threaded stand-in server; use as a context manager."""
+
+    def __init__(
+        self,
+        files: Dict[str, Tuple[str, bytes]],
+        images: Optional[Dict[str, bytes]] = None,
+        canned: bool = False,
+        latency: float = 0.0,
+        throttle: float = 0.0,
+        seed: int = 0,
+        port: int = 0,
+        storage_limit: Optional[int] = None,
+        rate: Optional[float] = None,
+    ):
+        """
+        Args:
+            files: Version id -> (filename, body) served for that version
+            images: Image name -> body, listed as every version's previews
+            canned: Answer unknown model/version ids with mock_data JSON
+            latency: Seconds added to every /api/v1/ response
+            throttle: Share of /api/v1/ requests answered with 429
+            seed: Seed for choosing which requests are throttled
+            port: Port to listen on (0 picks a free one)
+            storage_limit: Concurrent file transfers allowed before 429s
+            rate: Bytes per second sent on each file transfer
+        """
+        self.files = files
+        self.images = images
+        self.canned = canned
+        self.latency = latency
+        self.throttle = throttle
+        self.requests: Counter = Counter()
+        self.throttled = 0
+        self.storage_limit = storage_limit
+        self.rate = rate
+        self.storage_active = 0
+        self.storage_peak = 0
+        self._random = random.Random(seed)
+        self._count_lock = threading.Lock()
+        self.server = _Server(("127.0.0.1", port), _Handler)
+        self.server.fake = self
+        self._thread = threading.Thread(
+            target=self.server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            daemon=True,
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeCivitai":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, key: str) -> None:
+        """Count one request; handlers run on many threads."""
+        with self._count_lock:
+            self.requests[key] += 1
+
+    def should_throttle(self) -> bool:
+        """Decide whether to answer this API request with a 429."""
+        with self._count_lock:
+            if not self.throttle or self._random.random() >= self.throttle:
+                return False
+            self.throttled += 1
+            return True
+
+    def enter_storage(self) -> bool:
+        """Admit a file transfer, or refuse it beyond storage_limit."""
+        with self._count_lock:
+            if self.storage_limit and self.storage_active >= self.storage_limit:
+                self.throttled += 1
+                return False
+            self.storage_active += 1
+            self.storage_peak = max(self.storage_peak, self.storage_active)
+            return True
+
+    def leave_storage(self) -> None:
+        with self._count_lock:
+            self.storage_active -= 1
+
+    def canned_version(self, version_id: str) -> Dict:
+        """Mock version metadata relabelled with the requested id."""
+        names = ("test_1436228_metadata.json", "test_1447126_metadata.json")
+        data = json.loads(_mock_text(names[int(version_id) % len(names)]))
+        data["id"] = int(version_id)
+        return data
+
+    def canned_model(self, model_id: str) -> Dict:
+        """Model info in the /api/v1/models/<id> shape, built from mock data."""
+        version = self.canned_version(model_id)
+        version["modelId"] = int(model_id)
+        return {
+            "id": int(model_id),
+            "name": version["model"]["name"],
+            "type": version["model"]["type"],
+            "modelVersions": [version],
+        }
+
+    def metadata(self, version_id: str) -> Optional[Dict]:
+        """Version metadata whose primary file matches the served body."""
+        if version_id not in self.files:
+            return self.canned_version(version_id) if self.canned else None
+        try:
+            with open(get_mock_data_path(f"test_{version_id}_metadata.json")) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {
+                "id": int(version_id),
+                "name": f"v{version_id}",
+                "model": {"name": f"Model {version_id}", "type": "LORA"},
+                "files": [{"primary": True, "hashes": {}}],
+            }
+        filename, body = self.files[version_id]
+        files = data["files"]
+        primary = next((f for f in files if f.get("primary")), files[0])
+        primary.update(
+            name=filename,
+            sizeKB=len(body) / 1024,
+            downloadUrl=f"{self.url}/api/download/models/{version_id}",
+        )
+        digest = hashlib.sha256(body).hexdigest().upper()
+        primary.setdefault("hashes", {})["SHA256"] = digest
+        if self.images is not None:
+            data["images"] = [
+                {"url": f"{self.url}/images/{name}", "type": "image"}
+                for name in self.images
+            ]
+        return data
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._route(head_only=False)
+
+    def do_HEAD(self):
+        self._route(head_only=True)
+
+    def _route(self, head_only):
+        fake = self.server.fake
+        path = self.path.split("?")[0]
+        fake.count(f"{self.command} {path}")
+
+        if path.startswith("/api/v1/"):
+            if fake.latency:
+                time.sleep(fake.latency)
+            if fake.should_throttle():
+                self.send_response(429)
+                self.send_header("Retry-After", "1")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+        match = re.fullmatch(r"/api/v1/models/(\d+)", path)
+        if match and fake.canned:
+            data = fake.canned_model(match.group(1))
+            return self._send(200, json.dumps(data).encode(), head_only)
+
+        match = re.fullmatch(r"/api/v1/model-versions/(\d+)", path)
+        if match:
+            data = fake.metadata(match.group(1))
+            if data is None:
+                return self._send(404, b'{"error": "not found"}', head_only)
+            return self._send(200, json.dumps(data).encode(), head_only)
+
+        match = re.fullmatch(r"/api/download/models/(\d+)", path)
+        if match and match.group(1) in fake.files:
+            signed_at = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+            self.send_response(302)
+            self.send_header(
+                "Location",
+                f"/storage/{match.group(1)}?X-Amz-Date={signed_at}&X-Amz-Expires=3600",
+            )
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        match = re.fullmatch(r"/storage/(\d+)", path)
+        if match and match.group(1) in fake.files:
+            filename, body = fake.files[match.group(1)]
+            if head_only:
+                return self._send_file(filename, body, head_only)
+            if not fake.enter_storage():
+                return self._send(429, b"slow down", head_only, "text/plain")
+            try:
+                return self._send_file(filename, body, head_only)
+            finally:
+                fake.leave_storage()
+
+        match = re.fullmatch(r"/images/([^/]+)", path)
+        if match and match.group(1) in (fake.images or {}):
+            body = fake.images[match.group(1)]
+            return self._send(200, body, head_only, "image/png")
+
+        self._send(404, b"not found", head_only)
+
+    def _send(self, status, body, head_only, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
+
+    def _send_file(self, filename, body, head_only):
+        start, end = 0, len(body) - 1
+        range_header = self.headers.get("Range")
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", range_header or "")
+        if match and int(match.group(1)) >= len(body):
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{len(body)}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(206 if match else 200)
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else end
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Disposition", f'attachment; filename="{filename}"')
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if head_only:
+            return
+        data = body[start : end + 1]
+        if not self.server.fake.rate:
+            self.wfile.write(data)
+            return
+        step = 16 * 1024
+        for offset in range(0, len(data), step):
+            self.wfile.write(data[offset : offset + step])
+            time.sleep(step / self.server.fake.rate)
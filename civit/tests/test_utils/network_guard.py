@@ -11,6 +11,9 @@ import pytest
 
 original_socket_connect = socket.socket.connect
 
+# Local stand-in servers are not real network access
+LOOPBACK_HOSTS = ("127.0.0.1", "::1", "localhost")
+
 
 class RealNetworkAccessError(Exception):
     """Exception raised when a test attempts to make real network calls."""
@@ -23,7 +26,7 @@ def disable_network():
 
     def guarded_connect(self, *args, **kwargs):
         host = args[0][0] if args and isinstance(args[0], tuple) else "unknown"
-        if os.environ.get("ALLOW_NETWORK_TESTS") != "1":
+        if os.environ.get("ALLOW_NETWORK_TESTS") != "1" and host not in LOOPBACK_HOSTS:
             raise RealNetworkAccessError(
                 f"Test attempted real network connection to {host}. "
                 "All HTTP requests should be mocked in tests."
@@ -0,0 +1,146 @@
+"""
+# PURPOSE: Compare database size and cold-cache search time with plain and compressed metadata
+## INTERFACES:
+- main(): Build both databases from the same synthetic models and print a report
+## DEPENDENCIES:
+- hugsearch.database: Schema, batched writes, search and the metadata codec
+
+Run from the hugsearch directory:
+    PYTHONPATH=src python benchmarks/metadata_storage.py --models 50000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from hugsearch.database import close_pools, get_model_metadata, search_models, setup_database, upsert_models
+from hugsearch.database.codec import decode_metadata
+
+QUERIES = ['llama', 'chat', 'qwen OR mistral', 'tag:gguf instruct', 'coder NOT tag:gguf']
+FAMILIES = ['Llama-3', 'Qwen2.5', 'Mistral', 'Phi-3', 'gemma-2', 'falcon', 'bert', 'deepseek-coder', 'stablelm']
+VARIANTS = ['Instruct', 'chat', 'base', 'GGUF', 'AWQ', 'GPTQ', 'coder', 'finetuned', 'lora', 'v0.1', 'v2']
+TAGS = [
+    'transformers', 'safetensors', 'pytorch', 'gguf', 'text-generation', 'conversational', 'en',
+    'license:apache-2.0', 'license:mit', 'license:llama3', 'region:us', 'endpoints_compatible',
+    'autotrain_compatible', 'text-generation-inference', 'generated_from_trainer', '4-bit', 'peft',
+]
+
+
+def synthetic_models(count: int, seed: int = 0) -> List[Dict]:
+    """Records shaped like scheduler.model_to_record() output"""
+    rng = random.Random(seed)
+    models = []
+    for i in range(count):
+        author = f"user{rng.randrange(count // 20 + 1)}"
+        name = f"{rng.choice(FAMILIES)}-{rng.choice([1, 3, 7, 8, 13, 70])}B-{rng.choice(VARIANTS)}-{i}"
+        models.append({
+            'id': f"{author}/{name}",
+            'name': name,
+            'author': author,
+            'sha': '%040x' % rng.getrandbits(160),
+            'downloads': int(rng.paretovariate(1.2) * 10),
+            'likes': int(rng.paretovariate(1.5)),
+            'pipeline_tag': rng.choice(['text-generation', 'text-classification', None]),
+            'library_name': rng.choice(['transformers', 'gguf', 'peft', None]),
+            'tags': rng.sample(TAGS, rng.randrange(3, 12)) + [f"base_model:{rng.choice(FAMILIES)}"],
+            'lastModified': f"2024-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}T10:00:00+00:00",
+        })
+    return models
+
+
+def decompress_copy(source: Path, target: Path) -> None:
+    """Copy a database, storing metadata as the JSON text written before compression"""
+    shutil.copyfile(source, target)
+    with sqlite3.connect(target) as db:
+        rows = db.execute("SELECT rowid, metadata FROM models").fetchall()
+        db.executemany(
+            "UPDATE models SET metadata = ? WHERE rowid = ?",
+            [(json.dumps(decode_metadata(metadata)), rowid) for rowid, metadata in rows]
+        )
+    vacuum(target)
+
+
+def vacuum(db_path: Path) -> None:
+    """Compact the database and re-point the name index at the renumbered rows"""
+    with sqlite3.connect(db_path) as db:
+        db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    db = sqlite3.connect(db_path, isolation_level=None)
+    db.execute("VACUUM")
+    # VACUUM may renumber the implicit rowids of models, which the external
+    # content FTS table is keyed on
+    db.execute("INSERT INTO model_names (model_names) VALUES ('rebuild')")
+    db.close()
+
+
+def drop_os_cache(db_path: Path) -> None:
+    """Ask the kernel to evict the database files from its page cache"""
+    for path in (db_path, Path(f"{db_path}-wal")):
+        if path.exists() and hasattr(os, 'posix_fadvise'):
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+
+
+async def cold_search_ms(db_path: Path, query: str, repeats: int) -> float:
+    """Median time for a fresh connection to fetch a page of results and hydrate it"""
+    timings = []
+    for _ in range(repeats):
+        await close_pools()
+        drop_os_cache(db_path)
+        start = time.perf_counter()
+        page = await search_models(db_path, query, limit=20)
+        await get_model_metadata(db_path, [result.id for result in page])
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def run(count: int, repeats: int) -> None:
+    workdir = Path(tempfile.mkdtemp(prefix='hugsearch-bench-'))
+    try:
+        compressed = workdir / 'compressed.db'
+        plain = workdir / 'plain.db'
+        await setup_database(compressed)
+        await upsert_models(compressed, synthetic_models(count))
+        await close_pools()
+        vacuum(compressed)
+        decompress_copy(compressed, plain)
+
+        with sqlite3.connect(compressed) as db:
+            blob_bytes, = db.execute("SELECT SUM(length(metadata)) FROM models").fetchone()
+        with sqlite3.connect(plain) as db:
+            text_bytes, = db.execute("SELECT SUM(length(CAST(metadata AS BLOB))) FROM models").fetchone()
+
+        print(f"{count} models")
+        print(f"{'':30}{'plain':>12}{'compressed':>12}")
+        print(f"{'metadata bytes':30}{text_bytes:>12,}{blob_bytes:>12,}")
+        print(f"{'database file bytes':30}{plain.stat().st_size:>12,}{compressed.stat().st_size:>12,}")
+        for query in QUERIES:
+            before = await cold_search_ms(plain, query, repeats)
+            after = await cold_search_ms(compressed, query, repeats)
+            print(f"{'cold ' + repr(query) + ' ms':30}{before:>12.1f}{after:>12.1f}")
+        await close_pools()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1].lstrip('# '))
+    parser.add_argument('--models', type=int, default=50000, help='Synthetic models to store')
+    parser.add_argument('--repeats', type=int, default=5, help='Cold runs per query; the median is reported')
+    args = parser.parse_args()
+    asyncio.run(run(args.models, args.repeats))
+
+
+if __name__ == '__main__':
+    main()
@@ -20,6 +20,7 @@ from typing import Optional, List
 from . import database
 from . import scheduler
 from .config import get_config
+from .exceptions import QueryError
 from .cli_args import configure_logging
 from .commands import version, check
 
@@ -27,7 +28,13 @@ console = Console()
 
 def run_async(coro):
     """Wrapper to run async functions in click commands"""
-    return asyncio.get_event_loop().run_until_complete(coro)
+    async def run_and_close():
+        try:
+            return await coro
+        finally:
+            # Pooled connections' threads would otherwise keep the process alive
+            await database.close_pools()
+    return asyncio.get_event_loop().run_until_complete(run_and_close())
 
 @click.group()
 @click.version_option()
@@ -50,7 +57,10 @@ cli.add_command(check.command)
 @click.option('--exact', '-e', is_flag=True, help='Require exact matches')
 @click.option('--json', '-j', is_flag=True, help='Output results in JSON format')
 @click.option('--filter', '-f', multiple=True, help='Add filters (e.g., -f "tags=gpt")')
-def search(query: str, case_sensitive: bool, exact: bool, json: bool, filter: tuple):
+@click.option('--limit', '-n', type=click.IntRange(min=1), default=20, show_default=True,
+              help='Results per page')
+@click.option('--after', help='Page cursor printed after the previous page')
+def search(query: str, case_sensitive: bool, exact: bool, json: bool, filter: tuple, limit: int, after: Optional[str]):
     """Search for models in the local cache"""
     # Parse filters
     filters = {}
@@ -60,17 +70,22 @@ def search(query: str, case_sensitive: bool, exact: bool, json: bool, filter: tu
             filters[key.strip()] = value.strip()
 
     # Perform search
-    results = run_async(database.search_models(
-        get_config().db_path,
-        query,
-        case_sensitive=case_sensitive,
-        exact_match=exact,
-        filters=filters
-    ))
+    try:
+        results = run_async(database.search_models(
+            get_config().db_path,
+            query,
+            case_sensitive=case_sensitive,
+            exact_match=exact,
+            filters=filters,
+            limit=limit,
+            after=after
+        ))
+    except QueryError as e:
+        raise click.BadParameter(str(e), param_hint='QUERY')
 
     if json:
         import json as json_lib
-        click.echo(json_lib.dumps(results, indent=2))
+        click.echo(json_lib.dumps([result.as_dict() for result in results], indent=2))
     else:
         table = Table(show_header=True)
         table.add_column("Name")
@@ -80,23 +95,37 @@ def search(query: str, case_sensitive: bool, exact: bool, json: bool, filter: tu
 
         for result in results:
             table.add_row(
-                result['name'],
-                result['author'],
-                str(result.get('downloads', 'N/A')),
-                result['last_modified']
+                result.name,
+                result.author,
+                str(result.downloads),
+                result.last_modified or 'N/A'
             )
 
         console.print(table)
 
+    if len(results) == limit:
+        click.echo(f"Next page: --after '{database.encode_cursor(results[-1])}'", err=True)
+
 @cli.command()
 @click.argument('items', nargs=-1)
 @click.option('--type', '-t', type=click.Choice(['model', 'user', 'search']),
               default='model', help='Type of items to refresh')
-def refresh(items: tuple, type: str):
+@click.option('--concurrency', '-c', type=click.IntRange(min=1), default=scheduler.DEFAULT_FETCH_CONCURRENCY,
+              help='Items fetched from Hugging Face at once')
+@click.option('--rate', type=float, default=scheduler.DEFAULT_REQUESTS_PER_SECOND,
+              help='Maximum Hugging Face requests per second')
+def refresh(items: tuple, type: str, concurrency: int, rate: float):
     """Manually refresh specific models, users, or searches"""
-    sched = run_async(scheduler.create_scheduler(get_config().db_path))
-    run_async(sched.refresh_models(list(items), type))
-    click.echo(f"Refreshed {len(items)} {type}(s)")
+    sched = run_async(scheduler.create_scheduler(
+        get_config().db_path, fetch_concurrency=concurrency, requests_per_second=rate
+    ))
+    report = run_async(sched.refresh_models(list(items), type))
+    run_async(sched.stop())
+    failed = report['failed']
+    click.echo(f"Refreshed {len(items) - len(failed)} {type}(s): "
+               f"{report['new']} new, {report['changed']} changed, {report['unchanged']} unchanged models")
+    if failed:
+        click.echo(f"Failed to fetch: {', '.join(failed)}", err=True)
 
 @cli.command()
 @click.argument('creator')
@@ -4,19 +4,34 @@
 - setup_database(): Initialize and migrate database
 - search(): Main search interface
 - save_model(): Save or update a model
+- get_connection(): Borrow a pooled database connection
+- get_writer(): Shared batching writer for model ingestion
+- get_model_metadata(): Full metadata for search results, loaded by id
+- SearchCache: LRU cache of search results for as-you-type search
 ## DEPENDENCIES:
+- cache: Search result cache
+- connection: Pooled database connections
 - schema: Database schema management
 - models: Model CRUD operations
+- records: Compact search result rows
 - search: Search functionality
 - tags: Tag management
+- writer: Batched model writer queue
 """
 from pathlib import Path
 from typing import Dict, List, Optional, Union
 
+from .connection import get_connection, close_pools
 from .schema import init_db, migrate_schema
-from .models import upsert_model, get_model, delete_model
+from .models import (
+    upsert_model, upsert_models, sync_models, get_model, get_model_metadata, delete_model, write_generation
+)
+from .records import ModelSummary
 from .search import search_models
+from .query import encode_cursor
 from .tags import search_by_tag, get_model_tags, get_all_tags
+from .writer import ModelWriter, get_writer, close_writers
+from .cache import SearchCache
 
 # Expose key functionality at package level
 async def setup_database(db_path: Union[str, Path]) -> None:
@@ -29,32 +44,12 @@ async def search(
     query: str,
     case_sensitive: bool = False,
     exact_match: bool = False,
-    filters: Optional[Dict] = None
-) -> List[Dict]:
-    """Search models with optional filters"""
-    # Handle tag filter separately for efficiency
-    if filters and 'tags' in filters:
-        tag_results = await search_by_tag(
-            db_path,
-            filters['tags'],
-            case_sensitive=case_sensitive
-        )
-        if not query:  # If only filtering by tag
-            return tag_results
-
-        # Get IDs from tag search for filtering
-        tag_ids = {r['id'] for r in tag_results}
-
-        # Get text search results
-        search_results = await search_models(
-            db_path, query, case_sensitive, exact_match
-        )
-
-        # Return only results that match both conditions
-        return [r for r in search_results if r['id'] in tag_ids]
-
-    # No tag filter, just do text search
-    return await search_models(db_path, query, case_sensitive, exact_match)
+    filters: Optional[Dict] = None,
+    limit: Optional[int] = None,
+    after: Optional[str] = None
+) -> List[ModelSummary]:
+    """Search models with optional filters, all applied in a single ranked query"""
+    return await search_models(db_path, query, case_sensitive, exact_match, filters, limit, after)
 
 async def save_model(db_path: Union[str, Path], model_data: Dict) -> None:
     """Save or update a model"""
@@ -65,8 +60,22 @@ __all__ = [
     'setup_database',
     'search',
     'save_model',
+    'upsert_model',
+    'upsert_models',
+    'sync_models',
+    'search_models',
+    'encode_cursor',
+    'ModelSummary',
+    'SearchCache',
+    'get_connection',
+    'close_pools',
+    'ModelWriter',
+    'get_writer',
+    'close_writers',
     'get_model',
+    'get_model_metadata',
     'delete_model',
+    'write_generation',
     'get_model_tags',
     'get_all_tags'
 ]
\ No newline at end of file
@@ -0,0 +1,141 @@
+"""
+# PURPOSE: In-memory LRU cache of search results, invalidated by model writes
+## INTERFACES:
+- SearchCache: Serve repeated searches of one database from memory
+- cache_key(): Normalized key for a search and its options
+## DEPENDENCIES:
+- models: Write generation counter
+- query: Parser used to normalize queries
+- search: Searches run on a cache miss
+"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Tuple, Union
+
+from .models import write_generation
+from .query import And, Node, Not, Or, Term, parse_query
+from .records import ModelSummary
+from .search import search_models
+
+DEFAULT_CACHE_SIZE = 256
+
+
+def _normalize(node: Node, case_sensitive: bool) -> Node:
+    """Syntax tree with term text lowercased when case is ignored anyway"""
+    if isinstance(node, Term):
+        return node if case_sensitive else node._replace(text=node.text.lower())
+    if isinstance(node, (And, Or)):
+        return type(node)(_normalize(node.left, case_sensitive), _normalize(node.right, case_sensitive))
+    if isinstance(node, Not):
+        return Not(_normalize(node.child, case_sensitive))
+    return node
+
+
+def cache_key(
+    query: str,
+    case_sensitive: bool = False,
+    exact_match: bool = False,
+    filters: Optional[Dict] = None,
+    limit: Optional[int] = None,
+    after: Optional[str] = None
+) -> Tuple[Hashable, ...]:
+    """
+    Key under which a search is cached
+
+    Queries are keyed by their parsed form, so spacing, redundant
+    parentheses and an explicit AND between terms do not cause misses.
+    Raises QueryError for malformed queries, as searching would.
+    """
+    tree = _normalize(parse_query(query), case_sensitive)
+    filter_items = tuple(sorted(
+        (key, value if case_sensitive else str(value).lower()) for key, value in (filters or {}).items()
+    ))
+    return tree, case_sensitive, exact_match, filter_items, limit, after
+
+
+class SearchCache:
+    """
+    PURPOSE: Remember recent search results for one database
+
+    Meant for as-you-type search, where typing and backspacing repeat the
+    same queries. Entries are dropped least recently used first, and all at
+    once when write_generation() shows models were written since they were
+    cached. Writes by other processes are not seen; clear() drops entries
+    explicitly.
+    """
+    def __init__(self, db_path: Union[str, Path], maxsize: int = DEFAULT_CACHE_SIZE):
+        self.db_path = db_path
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple, List[ModelSummary]]" = OrderedDict()
+        self._generation = write_generation(db_path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def search(
+        self,
+        query: str,
+        case_sensitive: bool = False,
+        exact_match: bool = False,
+        filters: Optional[Dict] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None
+    ) -> List[ModelSummary]:
+        """search_models(), answered from memory when the same search is cached and current"""
+        key = cache_key(query, case_sensitive, exact_match, filters, limit, after)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        self.misses += 1
+        generation = self._generation
+        results = await search_models(self.db_path, query, case_sensitive, exact_match, filters, limit, after)
+        self._expire()
+        # Results that raced a write may already be stale, so they are not kept
+        if self._generation == generation:
+            self._entries[key] = results
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return list(results)
+
+    def get(
+        self,
+        query: str,
+        case_sensitive: bool = False,
+        exact_match: bool = False,
+        filters: Optional[Dict] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None
+    ) -> Optional[List[ModelSummary]]:
+        """Cached results of a search, or None without searching; only hits are counted"""
+        return self._lookup(cache_key(query, case_sensitive, exact_match, filters, limit, after))
+
+    def _lookup(self, key: Tuple) -> Optional[List[ModelSummary]]:
+        self._expire()
+        if key not in self._entries:
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return list(self._entries[key])
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Hit and miss counts, hit rate and number of cached searches"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'size': len(self._entries),
+        }
+
+    def clear(self) -> None:
+        """Drop every cached search"""
+        self._entries.clear()
+
+    def _expire(self) -> None:
+        generation = write_generation(self.db_path)
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
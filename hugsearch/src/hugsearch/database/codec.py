@@ -0,0 +1,64 @@
+"""
+# PURPOSE: Compact binary encoding of the model metadata stored with each row
+## INTERFACES:
+- encode_metadata(): Model dict to the compressed blob stored in models.metadata
+- decode_metadata(): Stored metadata, compressed or legacy JSON text, back to a dict
+- metadata_json(): Stored metadata as JSON text
+## DEPENDENCIES:
+- zlib: Deflate with a preset dictionary
+"""
+import json
+import zlib
+from typing import Dict, Union
+
+# First byte of every compressed blob; a new dictionary or codec gets a new
+# format byte so rows written by older versions stay readable
+FORMAT_DEFLATE_V1 = 1
+COMPRESSION_LEVEL = 6
+
+# Preset dictionary shared by every row: the keys and common values of the
+# records model_to_record() builds. Deflate finds matches for them from the
+# first byte, which is most of the win on rows of a few hundred bytes.
+# Later entries are cheaper to reference, so the most frequent come last.
+# Never edit in place: rows written with it could no longer be decoded.
+_DICTIONARY_V1 = ''.join((
+    '"library_name":"sentence-transformers","pipeline_tag":"sentence-similarity",',
+    '"pipeline_tag":"text-to-image","library_name":"diffusers","stable-diffusion",',
+    '"pipeline_tag":"automatic-speech-recognition","pipeline_tag":"image-classification",',
+    '"pipeline_tag":"feature-extraction","pipeline_tag":"fill-mask","pipeline_tag":"token-classification",',
+    '"pipeline_tag":"text2text-generation","pipeline_tag":"text-classification",',
+    '"library_name":"peft","library_name":"timm","library_name":"gguf","gguf",',
+    '"lora","tensorboard","onnx","jax","tf","bert","t5","gpt2","qwen2","mistral","llama",',
+    '"generated_from_trainer","model-index","custom_code","4-bit","8-bit","bitsandbytes",',
+    '"license:other","license:llama2","license:llama3","license:cc-by-4.0","license:openrail",',
+    '"license:mit","license:apache-2.0","base_model:finetune:","base_model:quantized:",',
+    '"base_model:adapter:","dataset:","arxiv:","en","region:us","endpoints_compatible",',
+    '"autotrain_compatible","text-generation-inference","conversational","safetensors",',
+    '"pytorch","transformers","text-generation","pipeline_tag":"text-generation",',
+    '"library_name":"transformers","downloads":0,"likes":0,"pipeline_tag":null,',
+    '"library_name":null,"description":"","sha":null,"tags":[],',
+    '{"id":"","name":"","author":"","sha":"","downloads":,"likes":,"pipeline_tag":"',
+    '","library_name":"","tags":["","lastModified":"2025-01-01T00:00:00+00:00"}',
+)).encode()
+
+
+def encode_metadata(model_data: Dict) -> bytes:
+    """Compact JSON, deflated against the preset dictionary, behind a format byte"""
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=_DICTIONARY_V1)
+    text = json.dumps(model_data, separators=(',', ':')).encode()
+    return bytes((FORMAT_DEFLATE_V1,)) + compressor.compress(text) + compressor.flush()
+
+
+def metadata_json(value: Union[str, bytes]) -> str:
+    """JSON text of stored metadata; rows written before compression are TEXT already"""
+    if isinstance(value, str):
+        return value
+    if not value or value[0] != FORMAT_DEFLATE_V1:
+        raise ValueError(f"Unknown metadata format {value[:1]!r}")
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=_DICTIONARY_V1)
+    return (decompressor.decompress(value[1:]) + decompressor.flush()).decode()
+
+
+def decode_metadata(value: Union[str, bytes]) -> Dict:
+    """Model dict from stored metadata"""
+    return json.loads(metadata_json(value))
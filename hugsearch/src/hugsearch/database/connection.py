@@ -0,0 +1,153 @@
+"""
+# PURPOSE: Long-lived pooled SQLite connections shared by all database functions
+## INTERFACES:
+- get_connection(): Async context manager yielding a warm pooled connection
+- get_pool(): The pool for a database path on the running event loop
+- close_pools(): Close every pooled connection on the running event loop
+- ConnectionPool: Small pool of tuned aiosqlite connections for one database
+## DEPENDENCIES:
+- aiosqlite: Async SQLite operations
+"""
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+import aiosqlite
+
+POOL_SIZE = 4
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KIB = 64 * 1024
+MMAP_SIZE = 256 * 1024 * 1024
+
+# Applied to every new connection; WAL lets searches read while a sync writes
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    f"PRAGMA cache_size = -{CACHE_SIZE_KIB}",
+    f"PRAGMA mmap_size = {MMAP_SIZE}",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA foreign_keys = ON",
+)
+
+# Connections held by the current task, so nested calls reuse them. Tasks
+# start with a copy of their creator's context, so each entry names the task
+# that owns it: a task spawned inside a get_connection() block gets its own
+# connection rather than one its creator commits, rolls back and releases.
+_held: ContextVar[Optional[Dict[str, Tuple[Optional[asyncio.Task], aiosqlite.Connection]]]] = ContextVar(
+    "hugsearch_held_connections", default=None
+)
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, ConnectionPool]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+class ConnectionPool:
+    """
+    PURPOSE: Keep a few warm connections to one database file open and reuse them
+
+    Each open connection runs a worker thread, so close the pools with
+    close_pools() before the event loop ends or the interpreter cannot exit.
+    """
+    def __init__(self, db_path: Union[str, Path], size: int = POOL_SIZE):
+        self.db_path = str(db_path)
+        # Every :memory: connection is its own database, so share exactly one
+        self.size = 1 if self.db_path == ":memory:" else max(1, size)
+        self._idle: List[aiosqlite.Connection] = []
+        self._slots = asyncio.Semaphore(self.size)
+        self.opened = 0
+
+    async def _open(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+        for pragma in PRAGMAS:
+            await conn.execute(pragma)
+        self.opened += 1
+        return conn
+
+    async def acquire(self) -> aiosqlite.Connection:
+        """Take an idle connection, opening one if the pool is not yet full"""
+        await self._slots.acquire()
+        try:
+            return self._idle.pop() if self._idle else await self._open()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, conn: aiosqlite.Connection) -> None:
+        """Return a connection, discarding work its caller did not commit"""
+        try:
+            if conn.in_transaction:
+                await conn.rollback()
+            conn.row_factory = None
+            self._idle.append(conn)
+        except Exception:
+            # A broken connection is dropped; the next acquire opens a new one
+            self.opened -= 1
+            await _close_quietly(conn)
+        finally:
+            self._slots.release()
+
+    async def close(self) -> None:
+        """Close the idle connections"""
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await _close_quietly(conn)
+        self.opened -= len(idle)
+
+
+async def _close_quietly(conn: aiosqlite.Connection) -> None:
+    try:
+        await conn.close()
+    except Exception:
+        pass
+
+
+def _pool_key(db_path: Union[str, Path]) -> str:
+    path = str(db_path)
+    return path if path == ":memory:" else str(Path(path).resolve())
+
+
+def get_pool(db_path: Union[str, Path]) -> ConnectionPool:
+    """Get or create the pool for a database on the running event loop"""
+    pools = _pools.setdefault(asyncio.get_running_loop(), {})
+    key = _pool_key(db_path)
+    if key not in pools:
+        pools[key] = ConnectionPool(db_path)
+    return pools[key]
+
+
+@asynccontextmanager
+async def get_connection(db_path: Union[str, Path]) -> AsyncIterator[aiosqlite.Connection]:
+    """
+    PURPOSE: Borrow a pooled connection for the duration of the block
+
+    A task that already holds a connection to the same database gets that
+    one back, so nested database calls never wait on the pool they share.
+    Tasks it spawns, including gather()ed ones, borrow their own. Set row
+    factories on cursors, not on the shared connection.
+    """
+    key = _pool_key(db_path)
+    task = asyncio.current_task()
+    held = _held.get() or {}
+    if key in held and held[key][0] is task:
+        yield held[key][1]
+        return
+
+    pool = get_pool(db_path)
+    conn = await pool.acquire()
+    token = _held.set({**held, key: (task, conn)})
+    try:
+        yield conn
+    finally:
+        _held.reset(token)
+        await pool.release(conn)
+
+
+async def close_pools() -> None:
+    """Close all pooled connections opened on the running event loop"""
+    pools = _pools.pop(asyncio.get_running_loop(), {})
+    for pool in pools.values():
+        await pool.close()
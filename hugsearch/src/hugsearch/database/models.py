@@ -2,77 +2,262 @@
 # PURPOSE: Handle model data operations (CRUD)
 ## INTERFACES:
 - upsert_model(): Insert or update a model
+- upsert_models(): Insert or update many models in batched transactions
+- sync_models(): Batched upsert that skips models unchanged upstream
+- tokenize_name(): Split a model name into words for exact word search
+- popularity_fields(): Downloads, likes and the popularity prior used in ranking
 - get_model(): Retrieve a single model
+- get_model_metadata(): Full metadata for models by id, for hydrating search results
 - delete_model(): Remove a model
+- write_generation(): Counter bumped by every model write, for cache invalidation
 ## DEPENDENCIES:
 - aiosqlite: Async SQLite operations
+- codec: Compressed metadata encoding
+- connection: Pooled database connections
 """
 import json
+import math
+import re
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional, Union
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
 import aiosqlite
 
+from .codec import decode_metadata, encode_metadata, metadata_json
+from .connection import _pool_key, get_connection
+
+DEFAULT_BATCH_SIZE = 500
+
+# Model writes made by this process, per database
+_generations: Dict[str, int] = {}
+
+# Word boundaries in model names, including the slash in author/model ids
+TOKEN_SEPARATORS = re.compile(r"[\s\-_/]+")
+
+def write_generation(db_path: Union[str, Path]) -> int:
+    """
+    How many times models in a database have been written by this process
+
+    Caches of search results compare it to detect that they are stale.
+    """
+    return _generations.get(_pool_key(db_path), 0)
+
+def _bump_generation(db_path: Union[str, Path]) -> None:
+    key = _pool_key(db_path)
+    _generations[key] = _generations.get(key, 0) + 1
+
+def tokenize_name(name: str) -> List[str]:
+    """Split a model name into its distinct words, in order"""
+    return list(dict.fromkeys(token for token in TOKEN_SEPARATORS.split(name) if token))
+
+def popularity_fields(model_data: Dict) -> Tuple[int, int, float]:
+    """Downloads, likes and a log-scaled popularity prior for ranking"""
+    downloads = int(model_data.get('downloads') or 0)
+    likes = int(model_data.get('likes') or 0)
+    return downloads, likes, math.log1p(max(downloads, 0)) + math.log1p(max(likes, 0))
+
 async def upsert_model(db_path: Union[str, Path], model_data: Dict) -> None:
     """Insert or update a model record"""
-    async with aiosqlite.connect(db_path) as db:
-        async with db.execute('BEGIN TRANSACTION') as cursor:
-            # Extract core fields
-            model_id = model_data['id']
-            name = model_data['name']
-            name_lower = name.lower()
-            author = model_data['author']
-            author_lower = author.lower()  # Add author_lower
-            last_modified = model_data.get('lastModified', datetime.now().isoformat())
-            description = model_data.get('description', '')
-
-            # Store core model data
-            await cursor.execute("""
-                INSERT OR REPLACE INTO models
-                (id, name, name_lower, author, author_lower, last_modified, metadata, last_checked)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                model_id, name, name_lower, author, author_lower, last_modified,
-                json.dumps(model_data), datetime.now().isoformat()
-            ))
-
-            # Store description for text search
-            await cursor.execute("""
-                INSERT OR REPLACE INTO model_descriptions (model_id, description)
-                VALUES (?, ?)
-            """, (model_id, description))
-
-            # Update tags
-            await cursor.execute("DELETE FROM model_tags WHERE model_id = ?", (model_id,))
-            if 'tags' in model_data and model_data['tags']:
-                await cursor.executemany(
-                    "INSERT INTO model_tags (model_id, tag, tag_lower) VALUES (?, ?, ?)",
-                    [(model_id, tag, tag.lower()) for tag in model_data['tags']]
-                )
+    await upsert_models(db_path, [model_data])
 
-        await db.commit()
+async def upsert_models(
+    db_path: Union[str, Path],
+    models: Iterable[Dict],
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> int:
+    """
+    Insert or update many models, committing once per batch
+
+    A model repeated within a batch is written once, with its last data.
+    Returns the number of model rows written.
+    """
+    written = 0
+    batch: Dict[str, Dict] = {}
+    async with get_connection(db_path) as db:
+        for model_data in models:
+            batch[model_data['id']] = model_data
+            if len(batch) >= batch_size:
+                written += await _write_batch(db, list(batch.values()))
+                _bump_generation(db_path)
+                batch = {}
+        if batch:
+            written += await _write_batch(db, list(batch.values()))
+            _bump_generation(db_path)
+    return written
+
+async def sync_models(
+    db_path: Union[str, Path],
+    models: Iterable[Dict],
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> Dict[str, int]:
+    """
+    Write only models that are new or changed upstream
+
+    A model is unchanged when its lastModified matches the stored one, or,
+    lacking a lastModified, when its sha does. Unchanged models only have
+    last_checked bumped. Returns counts of new, changed and unchanged models.
+    """
+    counts = {'new': 0, 'changed': 0, 'unchanged': 0}
+    batch: Dict[str, Dict] = {}
+    async with get_connection(db_path) as db:
+        for model_data in models:
+            batch[model_data['id']] = model_data
+            if len(batch) >= batch_size:
+                if await _sync_batch(db, list(batch.values()), counts):
+                    _bump_generation(db_path)
+                batch = {}
+        if batch and await _sync_batch(db, list(batch.values()), counts):
+            _bump_generation(db_path)
+    return counts
+
+async def _sync_batch(db: aiosqlite.Connection, batch: List[Dict], counts: Dict[str, int]) -> int:
+    """Classify one batch against the stored rows, write the difference and return how many rows changed"""
+    now = datetime.now().isoformat()
+    cursor = await db.execute("""
+        SELECT id, last_modified, sha FROM models
+        WHERE id IN (SELECT value FROM json_each(?))
+    """, (json.dumps([model_data['id'] for model_data in batch]),))
+    stored = {row[0]: (row[1], row[2]) for row in await cursor.fetchall()}
+
+    unchanged = []
+    changed = []
+    for model_data in batch:
+        if model_data['id'] not in stored:
+            counts['new'] += 1
+            changed.append(model_data)
+        elif _is_unchanged(model_data, *stored[model_data['id']]):
+            counts['unchanged'] += 1
+            unchanged.append((now, *popularity_fields(model_data), model_data['id']))
+        else:
+            counts['changed'] += 1
+            changed.append(model_data)
+
+    await db.execute('BEGIN TRANSACTION')
+    if unchanged:
+        # Downloads and likes move without lastModified changing; they feed only
+        # the popularity prior, not the name indexes, so refreshing them is cheap
+        await db.executemany(
+            "UPDATE models SET last_checked = ?, downloads = ?, likes = ?, popularity = ? WHERE id = ?",
+            unchanged
+        )
+    written = await _write_rows(db, changed, now)
+    await db.commit()
+    return written
+
+def _is_unchanged(model_data: Dict, last_modified: str, sha: Optional[str]) -> bool:
+    if model_data.get('lastModified'):
+        return model_data['lastModified'] == last_modified
+    return bool(model_data.get('sha')) and model_data['sha'] == sha
+
+async def _write_batch(db: aiosqlite.Connection, batch: List[Dict]) -> int:
+    """Write one batch of models in a single transaction"""
+    await db.execute('BEGIN TRANSACTION')
+    written = await _write_rows(db, batch, datetime.now().isoformat())
+    await db.commit()
+    return written
+
+async def _write_rows(db: aiosqlite.Connection, batch: List[Dict], now: str) -> int:
+    """Write models, descriptions and tags with one executemany each"""
+    if not batch:
+        return 0
+    model_rows = []
+    description_rows = []
+    tag_rows = []
+    token_rows = []
+    for model_data in batch:
+        # Extract core fields
+        model_id = model_data['id']
+        name = model_data['name']
+        author = model_data['author']
+        last_modified = model_data.get('lastModified', now)
+        model_rows.append((
+            model_id, name, name.lower(), author, author.lower(), last_modified,
+            encode_metadata(model_data), model_data.get('sha'), now, *popularity_fields(model_data)
+        ))
+        description_rows.append((model_id, model_data.get('description') or ''))
+        tag_rows.extend((model_id, tag, tag.lower()) for tag in model_data.get('tags') or [])
+        token_rows.extend((model_id, token, token.lower()) for token in tokenize_name(name))
+    # FTS5 tables have no unique key, so stale descriptions are deleted explicitly
+    ids = json.dumps([row[0] for row in model_rows])
+
+    # An upsert keeps the rowid and fires the update trigger that maintains
+    # the name index; REPLACE would delete the row without firing it
+    await db.executemany("""
+        INSERT INTO models
+        (id, name, name_lower, author, author_lower, last_modified, metadata, sha, last_checked,
+         downloads, likes, popularity)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (id) DO UPDATE SET
+            name = excluded.name,
+            name_lower = excluded.name_lower,
+            author = excluded.author,
+            author_lower = excluded.author_lower,
+            last_modified = excluded.last_modified,
+            metadata = excluded.metadata,
+            sha = excluded.sha,
+            last_checked = excluded.last_checked,
+            downloads = excluded.downloads,
+            likes = excluded.likes,
+            popularity = excluded.popularity
+    """, model_rows)
+    await db.execute(
+        "DELETE FROM model_descriptions WHERE model_id IN (SELECT value FROM json_each(?))", (ids,)
+    )
+    await db.executemany(
+        "INSERT INTO model_descriptions (model_id, description) VALUES (?, ?)", description_rows
+    )
+    await db.execute("DELETE FROM model_tags WHERE model_id IN (SELECT value FROM json_each(?))", (ids,))
+    await db.executemany(
+        "INSERT OR IGNORE INTO model_tags (model_id, tag, tag_lower) VALUES (?, ?, ?)", tag_rows
+    )
+    await db.execute("DELETE FROM name_tokens WHERE model_id IN (SELECT value FROM json_each(?))", (ids,))
+    await db.executemany(
+        "INSERT INTO name_tokens (model_id, token, token_lower) VALUES (?, ?, ?)", token_rows
+    )
+    return len(model_rows)
 
 async def get_model(db_path: Union[str, Path], model_id: str) -> Optional[Dict]:
     """Retrieve a single model by ID"""
-    async with aiosqlite.connect(db_path) as db:
-        db.row_factory = aiosqlite.Row
-
+    async with get_connection(db_path) as db:
         # Get model core data
         cursor = await db.execute(
             "SELECT * FROM models WHERE id = ?",
             (model_id,)
         )
+        cursor.row_factory = aiosqlite.Row
         model = await cursor.fetchone()
         if not model:
             return None
 
-        # Convert to dict and return
-        return dict(model)
+        # Convert to dict, metadata as JSON text whichever way it is stored
+        model = dict(model)
+        model['metadata'] = metadata_json(model['metadata'])
+        return model
+
+async def get_model_metadata(
+    db_path: Union[str, Path],
+    model_ids: Union[str, Iterable[str]]
+) -> Dict[str, Dict]:
+    """
+    Load and decode the stored metadata of models by id
+
+    Searches return compact rows; this fetches the rest for the few a
+    caller actually shows in detail. Takes one id or many and returns a
+    dict keyed by id, leaving out ids that are not stored.
+    """
+    ids = [model_ids] if isinstance(model_ids, str) else list(dict.fromkeys(model_ids))
+    async with get_connection(db_path) as db:
+        cursor = await db.execute(
+            "SELECT id, metadata FROM models WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(ids),)
+        )
+        rows = await cursor.fetchall()
+    return {model_id: decode_metadata(metadata) for model_id, metadata in rows}
 
 async def delete_model(db_path: Union[str, Path], model_id: str) -> bool:
     """Delete a model by ID"""
-    async with aiosqlite.connect(db_path) as db:
+    async with get_connection(db_path) as db:
         async with db.execute('BEGIN TRANSACTION') as cursor:
             # Check if model exists first
             cursor = await db.execute(
@@ -86,4 +271,5 @@ async def delete_model(db_path: Union[str, Path], model_id: str) -> bool:
             await cursor.execute("DELETE FROM models WHERE id = ?", (model_id,))
 
         await db.commit()
+        _bump_generation(db_path)
         return True
\ No newline at end of file
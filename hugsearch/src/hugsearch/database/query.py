@@ -0,0 +1,337 @@
+"""
+# PURPOSE: Parse boolean search queries and compile them into a single SQL statement
+## INTERFACES:
+- parse_query(): Parse a query string into a syntax tree
+- tokenize_query(): Split a query into parentheses, operators and terms
+- compile_query(): Compile a query and filters into ranked, paginated SQL
+- encode_cursor(): Keyset cursor for the page after a result row
+- name_ids_sql(): SQL selecting the ids of models whose name matches a term
+## DEPENDENCIES:
+- models: Name tokenizer for whole word search
+- records: Columns of the compact result rows
+- schema: Shortest query the trigram name index can serve
+"""
+import json
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from ..exceptions import QueryError
+from .models import tokenize_name
+from .records import SUMMARY_COLUMNS
+from .schema import TRIGRAM_MIN_LENGTH
+
+OPERATORS = ('AND', 'OR', 'NOT')
+# Filter keys accepted by search_models, mapped to query fields
+FILTER_FIELDS = {'tags': 'tag', 'author': 'author'}
+# Score contributions: per query term matching the name exactly, as a whole
+# word or as a substring, or a tag; per unit of description bm25; and per
+# unit of the log-scaled downloads and likes prior
+RANK_WEIGHTS = {
+    'name_exact': 10.0,
+    'name_word': 4.0,
+    'name_substring': 2.0,
+    'tag': 3.0,
+    'description': 1.0,
+    'popularity': 0.25,
+}
+
+_TOKEN = re.compile(r'''
+    \s*(?:
+        (?P<paren>[()])
+      | (?:(?P<field>tag|author):)?(?:"(?P<phrase>[^"]*)"|(?P<word>[^\s()"]+))
+    )
+''', re.VERBOSE)
+
+
+class Term(NamedTuple):
+    """A word or quoted phrase, optionally restricted to a field"""
+    text: str
+    field: Optional[str] = None
+    phrase: bool = False
+
+
+class And(NamedTuple):
+    left: 'Node'
+    right: 'Node'
+
+
+class Or(NamedTuple):
+    left: 'Node'
+    right: 'Node'
+
+
+class Not(NamedTuple):
+    child: 'Node'
+
+
+class MatchAll(NamedTuple):
+    """The empty query, which matches every model"""
+
+
+Node = Union[Term, And, Or, Not, MatchAll]
+
+
+def tokenize_query(query: str) -> List[Union[str, Term]]:
+    """Split a query into parentheses, operators and terms"""
+    tokens: List[Union[str, Term]] = []
+    pos = 0
+    query = query.rstrip()
+    while pos < len(query):
+        match = _TOKEN.match(query, pos)
+        if not match:
+            raise QueryError(f"Unterminated quote at position {query.index(chr(34), pos)}")
+        pos = match.end()
+        if match['paren']:
+            tokens.append(match['paren'])
+        elif match['phrase'] is not None:
+            tokens.append(Term(match['phrase'], match['field'], phrase=True))
+        elif match['word'] in OPERATORS and not match['field']:
+            tokens.append(match['word'])
+        else:
+            tokens.append(Term(match['word'], match['field']))
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive descent over:
+        or    := and ('OR' and)*
+        and   := unary (['AND'] unary)*
+        unary := 'NOT' unary | '(' or ')' | term
+    """
+    def __init__(self, tokens: List[Union[str, Term]]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> Union[str, Term, None]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self) -> Union[str, Term, None]:
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def parse(self) -> Node:
+        if not self.tokens:
+            return MatchAll()
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise QueryError(f"Unexpected {self.peek()!r}")
+        return node
+
+    def parse_or(self) -> Node:
+        node = self.parse_and()
+        while self.peek() == 'OR':
+            self.take()
+            node = Or(node, self.parse_and())
+        return node
+
+    def parse_and(self) -> Node:
+        node = self.parse_unary()
+        while self.peek() not in (None, 'OR', ')'):
+            if self.peek() == 'AND':
+                self.take()
+            node = And(node, self.parse_unary())
+        return node
+
+    def parse_unary(self) -> Node:
+        token = self.take()
+        if token == 'NOT':
+            return Not(self.parse_unary())
+        if token == '(':
+            node = self.parse_or()
+            if self.take() != ')':
+                raise QueryError("Missing closing parenthesis")
+            return node
+        if isinstance(token, Term):
+            return token
+        raise QueryError("Query ends early" if token is None else f"Unexpected {token!r}")
+
+
+def parse_query(query: str) -> Node:
+    """
+    Parse a search query into a syntax tree
+
+    Supports AND, OR and NOT (upper case), parentheses, "quoted phrases"
+    and tag:/author: fields. Adjacent terms are ANDed. Raises QueryError
+    on malformed queries.
+    """
+    return _Parser(tokenize_query(query)).parse()
+
+
+def name_ids_sql(text: str, case_sensitive: bool = False, exact_match: bool = False) -> Tuple[str, List]:
+    """SQL selecting the ids of models whose name matches a term, and its parameters"""
+    if exact_match:
+        # Whole words are indexed equality lookups; a multi-word term needs every word
+        tokens = tokenize_name(text) if case_sensitive else tokenize_name(text.lower())
+        column = 'token' if case_sensitive else 'token_lower'
+        return f"""
+            SELECT model_id FROM name_tokens
+            WHERE {column} IN (SELECT value FROM json_each(?))
+            GROUP BY model_id
+            HAVING COUNT(DISTINCT {column}) = ?
+        """, [json.dumps(tokens), len(tokens)]
+    if case_sensitive:
+        return """
+            SELECT id FROM models
+            WHERE name = ? OR name GLOB ? OR name GLOB ? OR name GLOB ?
+        """, [text, f"* {text} *", f"{text} *", f"* {text}"]
+    if len(text) >= TRIGRAM_MIN_LENGTH:
+        # A trigram phrase is a case-insensitive substring match answered from
+        # the index alone; LIKE would also re-read every candidate row
+        return """
+            SELECT id FROM models
+            WHERE rowid IN (SELECT rowid FROM model_names WHERE model_names MATCH ?)
+        """, ['name : "' + text.replace('"', '""') + '"']
+    return "SELECT id FROM models WHERE name_lower LIKE ?", [f"%{text.lower()}%"]
+
+
+def _fts_phrase(term: Term) -> str:
+    """FTS5 expression for a term against descriptions; words match as prefixes"""
+    quoted = '"' + term.text.replace('"', '""') + '"'
+    return f"description : {quoted}" if term.phrase else f"description : {quoted} *"
+
+
+class _Compiler:
+    """Turns each node into a CTE of model ids, children before parents"""
+    def __init__(self, case_sensitive: bool, exact_match: bool):
+        self.case_sensitive = case_sensitive
+        self.exact_match = exact_match
+        self.ctes: List[str] = []
+        self.params: List = []
+
+    def add(self, sql: str, params: List) -> str:
+        name = f"q{len(self.ctes)}"
+        self.ctes.append(f"{name}(id) AS ({sql})")
+        self.params.extend(params)
+        return name
+
+    def visit(self, node: Node) -> str:
+        if isinstance(node, Term):
+            return self.term(node)
+        if isinstance(node, MatchAll):
+            return self.add("SELECT id FROM models", [])
+        if isinstance(node, Not):
+            child = self.visit(node.child)
+            return self.add(f"SELECT id FROM models EXCEPT SELECT id FROM {child}", [])
+        left = self.visit(node.left)
+        if isinstance(node, And) and isinstance(node.right, Not):
+            right = self.visit(node.right.child)
+            return self.add(f"SELECT id FROM {left} EXCEPT SELECT id FROM {right}", [])
+        right = self.visit(node.right)
+        operator = 'INTERSECT' if isinstance(node, And) else 'UNION'
+        return self.add(f"SELECT id FROM {left} {operator} SELECT id FROM {right}", [])
+
+    def term(self, term: Term) -> str:
+        tag_column, author_column = ('tag', 'author') if self.case_sensitive else ('tag_lower', 'author_lower')
+        value = term.text if self.case_sensitive else term.text.lower()
+        tag_sql = f"SELECT model_id FROM model_tags WHERE {tag_column} = ?"
+        if term.field == 'tag':
+            return self.add(tag_sql, [value])
+        if term.field == 'author':
+            return self.add(f"SELECT id FROM models WHERE {author_column} = ?", [value])
+
+        sql, params = name_ids_sql(term.text, self.case_sensitive, self.exact_match)
+        # Descriptions are only searched by the fuzzy, case-insensitive mode
+        if not self.exact_match and not self.case_sensitive and re.search(r'\w', term.text):
+            sql += " UNION SELECT model_id FROM model_descriptions WHERE model_descriptions MATCH ?"
+            params.append(_fts_phrase(term))
+        sql += f" UNION {tag_sql}"
+        params.append(value)
+        return self.add(sql, params)
+
+
+def _ranking_terms(node: Node) -> List[Term]:
+    """Terms a result matched by, ignoring everything under NOT"""
+    if isinstance(node, Term):
+        return [node] if node.field != 'author' else []
+    if isinstance(node, (And, Or)):
+        return _ranking_terms(node.left) + _ranking_terms(node.right)
+    return []
+
+
+def encode_cursor(row: Dict) -> str:
+    """Keyset cursor for the page after this result row"""
+    return f"{row['score']!r}:{row['id']}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """Score and id from a cursor made by encode_cursor(); raises QueryError if malformed"""
+    score, separator, model_id = cursor.partition(':')
+    try:
+        if separator:
+            return float(score), model_id
+    except ValueError:
+        pass
+    raise QueryError(f"Invalid page cursor {cursor!r}")
+
+
+def compile_query(
+    query: str,
+    case_sensitive: bool = False,
+    exact_match: bool = False,
+    filters: Optional[Dict] = None,
+    limit: Optional[int] = None,
+    after: Optional[str] = None
+) -> Tuple[str, List]:
+    """
+    Compile a query and filters into one SQL statement selecting ranked models
+
+    Returns the SQL and its parameters. Filters ('tags', 'author') are ANDed
+    with the query, as tag:/author: terms would be. Rows come best first
+    as ModelSummary columns plus a `score`; `limit` and an `after` cursor
+    from encode_cursor() select one page by keyset rather than offset.
+    """
+    tree = parse_query(query)
+    for key, value in (filters or {}).items():
+        if key in FILTER_FIELDS:
+            tree = And(tree, Term(value, FILTER_FIELDS[key]))
+    compiler = _Compiler(case_sensitive, exact_match)
+    root = compiler.visit(tree)
+    params = list(compiler.params)
+
+    terms = _ranking_terms(tree)
+    phrases = [_fts_phrase(term) for term in terms if term.field is None and re.search(r'\w', term.text)]
+    ctes = compiler.ctes + ["terms(term) AS (SELECT value FROM json_each(?))"]
+    params.append(json.dumps(list(dict.fromkeys(term.text.lower() for term in terms))))
+
+    # Every signal is a row of (id, points), summed per matching model. Kept
+    # set-wise, so no index is probed once per result; bm25() is negative,
+    # better matches being more negative
+    signals = [
+        f"SELECT id, 0 FROM {root}",
+        f"SELECT model_id, {RANK_WEIGHTS['name_word']} * COUNT(DISTINCT token_lower) FROM name_tokens"
+        " WHERE token_lower IN (SELECT term FROM terms) GROUP BY model_id",
+        f"SELECT model_id, {RANK_WEIGHTS['tag']} * COUNT(DISTINCT tag_lower) FROM model_tags"
+        " WHERE tag_lower IN (SELECT term FROM terms) GROUP BY model_id",
+    ]
+    if phrases:
+        signals.append(
+            f"SELECT model_id, -{RANK_WEIGHTS['description']} * bm25(model_descriptions) FROM model_descriptions"
+            " WHERE model_descriptions MATCH ?"
+        )
+        params.append(' OR '.join(phrases))
+    ctes.append(f"signals(id, points) AS ({' UNION ALL '.join(signals)})")
+    ctes.append(f"""ranked AS (
+        SELECT {SUMMARY_COLUMNS}, s.points
+            + {RANK_WEIGHTS['name_exact']} * (SELECT COUNT(*) FROM terms WHERE term = m.name_lower)
+            + {RANK_WEIGHTS['name_substring']} * (SELECT COUNT(*) FROM terms WHERE instr(m.name_lower, term) > 0)
+            + {RANK_WEIGHTS['popularity']} * m.popularity AS score
+        FROM (
+            SELECT id, SUM(points) AS points FROM signals
+            WHERE id IN (SELECT id FROM {root})
+            GROUP BY id
+        ) s
+        JOIN models m ON m.id = s.id
+    )""")
+
+    sql = f"WITH {', '.join(ctes)} SELECT * FROM ranked"
+    if after is not None:
+        score, model_id = decode_cursor(after)
+        sql += " WHERE score < ? OR (score = ? AND id > ?)"
+        params.extend([score, score, model_id])
+    sql += " ORDER BY score DESC, id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, params
@@ -0,0 +1,75 @@
+"""
+# PURPOSE: Compact result rows returned by searches
+## INTERFACES:
+- ModelSummary: Slotted record of the fields a result list shows
+- SUMMARY_COLUMNS: SELECT list producing ModelSummary rows from `models m`
+## DEPENDENCIES: None
+"""
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Column order matches ModelSummary.__slots__, minus the trailing score
+SUMMARY_COLUMNS = "m.id, m.name, m.author, m.last_modified, m.downloads, m.likes"
+
+
+class ModelSummary:
+    """
+    PURPOSE: One search result without its metadata blob
+
+    Searches select only these columns, so a result costs a few small
+    objects rather than a dict plus the full parsed-from-JSON metadata.
+    Load the rest by id with get_model_metadata() when it is needed.
+    Fields read as attributes or, like the dict rows searches used to
+    return, by key.
+    """
+    __slots__ = ('id', 'name', 'author', 'last_modified', 'downloads', 'likes', 'score')
+
+    def __init__(
+        self,
+        id: str,
+        name: str,
+        author: str,
+        last_modified: Optional[str],
+        downloads: int = 0,
+        likes: int = 0,
+        score: Optional[float] = None
+    ):
+        self.id = id
+        self.name = name
+        self.author = author
+        self.last_modified = last_modified
+        self.downloads = downloads
+        self.likes = likes
+        self.score = score
+
+    @classmethod
+    def from_row(cls, cursor: Any, row: Tuple) -> "ModelSummary":
+        """Row factory for cursors selecting SUMMARY_COLUMNS, optionally then a score"""
+        return cls(*row)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.__slots__
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Plain dict of the fields, e.g. for JSON output"""
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ModelSummary):
+            return NotImplemented
+        return all(getattr(self, key) == getattr(other, key) for key in self.__slots__)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"ModelSummary(id={self.id!r}, name={self.name!r}, score={self.score!r})"
@@ -5,18 +5,104 @@
 - migrate_schema(): Handle schema migrations
 ## DEPENDENCIES:
 - aiosqlite: Async SQLite operations
+- codec: Compressed metadata encoding
+- connection: Pooled database connections
 """
-import aiosqlite
 from pathlib import Path
 from typing import Union
 
-SCHEMA_VERSION = 2
+from .codec import decode_metadata, encode_metadata
+from .connection import get_connection
+from .models import popularity_fields, tokenize_name
+
+SCHEMA_VERSION = 6
+
+# Rows rewritten per transaction when compressing existing metadata
+METADATA_MIGRATION_BATCH_SIZE = 1000
+
+POPULARITY_COLUMNS = {
+    'downloads': 'INTEGER NOT NULL DEFAULT 0',
+    'likes': 'INTEGER NOT NULL DEFAULT 0',
+    'popularity': 'REAL NOT NULL DEFAULT 0',
+}
+
+# Queries shorter than a trigram cannot use the name index
+TRIGRAM_MIN_LENGTH = 3
+
+async def _create_name_tokens(db) -> None:
+    """Inverted index of the words in each model name, for exact word search"""
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS name_tokens (
+            model_id TEXT NOT NULL,
+            token TEXT NOT NULL,
+            token_lower TEXT NOT NULL,
+            PRIMARY KEY (model_id, token),
+            FOREIGN KEY (model_id) REFERENCES models(id) ON DELETE CASCADE
+        )
+    """)
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_name_tokens ON name_tokens(token)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_name_tokens_lower ON name_tokens(token_lower)")
+
+async def _create_name_index(db) -> None:
+    """Trigram index over model names and authors, kept in sync with models by triggers"""
+    await db.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS model_names USING fts5(
+            name,
+            author,
+            content='models',
+            tokenize='trigram'
+        )
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS model_names_insert AFTER INSERT ON models BEGIN
+            INSERT INTO model_names (rowid, name, author) VALUES (new.rowid, new.name, new.author);
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS model_names_delete AFTER DELETE ON models BEGIN
+            INSERT INTO model_names (model_names, rowid, name, author)
+            VALUES ('delete', old.rowid, old.name, old.author);
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS model_names_update AFTER UPDATE OF name, author ON models BEGIN
+            INSERT INTO model_names (model_names, rowid, name, author)
+            VALUES ('delete', old.rowid, old.name, old.author);
+            INSERT INTO model_names (rowid, name, author) VALUES (new.rowid, new.name, new.author);
+        END
+    """)
+
+async def _compress_metadata(db) -> None:
+    """
+    Rewrite metadata stored as JSON text into compressed blobs, filling in sha
+
+    Commits the earlier migrations first, then each batch on its own, so a
+    large database is never rewritten in one transaction. Only TEXT rows
+    are selected, so an interrupted run picks up where it stopped.
+    """
+    await db.execute("UPDATE schema_version SET version = 5")
+    await db.commit()
+    last_rowid = 0
+    while True:
+        cursor = await db.execute("""
+            SELECT rowid, metadata FROM models
+            WHERE rowid > ? AND typeof(metadata) = 'text'
+            ORDER BY rowid LIMIT ?
+        """, (last_rowid, METADATA_MIGRATION_BATCH_SIZE))
+        rows = await cursor.fetchall()
+        if not rows:
+            break
+        updates = []
+        for rowid, metadata in rows:
+            model_data = decode_metadata(metadata)
+            updates.append((encode_metadata(model_data), model_data.get('sha'), rowid))
+        await db.executemany("UPDATE models SET metadata = ?, sha = ? WHERE rowid = ?", updates)
+        await db.commit()
+        last_rowid = rows[-1][0]
 
 async def init_db(db_path: Union[str, Path]) -> None:
     """Initialize database schema"""
-    async with aiosqlite.connect(db_path) as db:
-        await db.execute("PRAGMA foreign_keys = ON")
-
+    async with get_connection(db_path) as db:
         # Version tracking
         await db.execute("""
             CREATE TABLE IF NOT EXISTS schema_version (
@@ -33,8 +119,12 @@ async def init_db(db_path: Union[str, Path]) -> None:
                 author TEXT NOT NULL,
                 author_lower TEXT NOT NULL,
                 last_modified TEXT NOT NULL,
-                metadata TEXT NOT NULL,
-                last_checked TEXT NOT NULL
+                metadata BLOB NOT NULL,
+                sha TEXT,
+                last_checked TEXT NOT NULL,
+                downloads INTEGER NOT NULL DEFAULT 0,
+                likes INTEGER NOT NULL DEFAULT 0,
+                popularity REAL NOT NULL DEFAULT 0
             )
         """)
         await db.execute("CREATE INDEX IF NOT EXISTS idx_models_name ON models(name)")
@@ -62,6 +152,10 @@ async def init_db(db_path: Union[str, Path]) -> None:
             )
         """)
 
+        # Substring and whole word name search
+        await _create_name_index(db)
+        await _create_name_tokens(db)
+
         # Creator following
         await db.execute("""
             CREATE TABLE IF NOT EXISTS followed_creators (
@@ -70,14 +164,16 @@ async def init_db(db_path: Union[str, Path]) -> None:
             )
         """)
 
-        # Set initial schema version
-        await db.execute("INSERT OR REPLACE INTO schema_version (version) VALUES (?)",
-                        (SCHEMA_VERSION,))
+        # Set initial schema version; an existing database keeps its own for migrate_schema
+        await db.execute("""
+            INSERT INTO schema_version (version)
+            SELECT ? WHERE NOT EXISTS (SELECT 1 FROM schema_version)
+        """, (SCHEMA_VERSION,))
         await db.commit()
 
 async def migrate_schema(db_path: Union[str, Path]) -> None:
     """Handle any necessary schema migrations"""
-    async with aiosqlite.connect(db_path) as db:
+    async with get_connection(db_path) as db:
         cursor = await db.execute("SELECT version FROM schema_version")
         row = await cursor.fetchone()
         current_version = row[0] if row else 0
@@ -129,6 +225,40 @@ async def migrate_schema(db_path: Union[str, Path]) -> None:
             await db.execute("UPDATE models SET author_lower = lower(author)")
             await db.execute("CREATE INDEX IF NOT EXISTS idx_models_author_lower ON models(author_lower)")
 
+        if current_version < 3:
+            await _create_name_index(db)
+            await db.execute("INSERT INTO model_names (model_names) VALUES ('rebuild')")
+
+        if current_version < 4:
+            await _create_name_tokens(db)
+            cursor = await db.execute("SELECT id, name FROM models")
+            while rows := await cursor.fetchmany(1000):
+                await db.executemany(
+                    "INSERT OR IGNORE INTO name_tokens (model_id, token, token_lower) VALUES (?, ?, ?)",
+                    [(model_id, token, token.lower()) for model_id, name in rows for token in tokenize_name(name)]
+                )
+
+        if current_version < 5:
+            # Ranking reads these per result, so they live outside the metadata blob
+            cursor = await db.execute("PRAGMA table_info(models)")
+            existing = {row[1] for row in await cursor.fetchall()}
+            for column, definition in POPULARITY_COLUMNS.items():
+                if column not in existing:
+                    await db.execute(f"ALTER TABLE models ADD COLUMN {column} {definition}")
+            cursor = await db.execute("SELECT id, metadata FROM models")
+            while rows := await cursor.fetchmany(1000):
+                await db.executemany(
+                    "UPDATE models SET downloads = ?, likes = ?, popularity = ? WHERE id = ?",
+                    [(*popularity_fields(decode_metadata(metadata)), model_id) for model_id, metadata in rows]
+                )
+
+        if current_version < 6:
+            # sha moves out of the blob so sync can compare it without decoding
+            cursor = await db.execute("PRAGMA table_info(models)")
+            if 'sha' not in {row[1] for row in await cursor.fetchall()}:
+                await db.execute("ALTER TABLE models ADD COLUMN sha TEXT")
+            await _compress_metadata(db)
+
         if current_version < SCHEMA_VERSION:
             await db.execute("UPDATE schema_version SET version = ?", (SCHEMA_VERSION,))
             await db.commit()
\ No newline at end of file
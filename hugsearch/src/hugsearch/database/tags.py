@@ -6,15 +6,18 @@
 - get_all_tags(): List all known tags
 ## DEPENDENCIES:
 - aiosqlite: Async SQLite operations
+- connection: Pooled database connections
+- records: Compact result rows
 """
 from pathlib import Path
 from typing import List, Dict, Union
 
-import aiosqlite
+from .connection import get_connection
+from .records import SUMMARY_COLUMNS, ModelSummary
 
 async def get_model_tags(db_path: Union[str, Path], model_id: str) -> List[str]:
     """Get all tags for a specific model"""
-    async with aiosqlite.connect(db_path) as db:
+    async with get_connection(db_path) as db:
         cursor = await db.execute(
             "SELECT tag FROM model_tags WHERE model_id = ? ORDER BY tag",
             (model_id,)
@@ -26,34 +29,33 @@ async def search_by_tag(
     db_path: Union[str, Path],
     tag: str,
     case_sensitive: bool = False
-) -> List[Dict]:
+) -> List[ModelSummary]:
     """Find all models with a specific tag"""
-    async with aiosqlite.connect(db_path) as db:
-        db.row_factory = aiosqlite.Row
+    async with get_connection(db_path) as db:
         if case_sensitive:
-            cursor = await db.execute("""
-                SELECT m.* FROM models m
+            cursor = await db.execute(f"""
+                SELECT {SUMMARY_COLUMNS} FROM models m
                 JOIN model_tags t ON m.id = t.model_id
                 WHERE t.tag = ?
                 ORDER BY m.name
             """, (tag,))
         else:
-            cursor = await db.execute("""
-                SELECT m.* FROM models m
+            cursor = await db.execute(f"""
+                SELECT {SUMMARY_COLUMNS} FROM models m
                 JOIN model_tags t ON m.id = t.model_id
                 WHERE t.tag_lower = ?
                 ORDER BY m.name
             """, (tag.lower(),))
 
-        rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+        cursor.row_factory = ModelSummary.from_row
+        return await cursor.fetchall()
 
 async def get_all_tags(
     db_path: Union[str, Path],
     include_counts: bool = False
 ) -> Union[List[str], List[Dict[str, Union[str, int]]]]:
     """Get all known tags, optionally with usage counts"""
-    async with aiosqlite.connect(db_path) as db:
+    async with get_connection(db_path) as db:
         if include_counts:
             cursor = await db.execute("""
                 SELECT tag, COUNT(*) as count
@@ -0,0 +1,112 @@
+"""
+# PURPOSE: Single writer queue that funnels concurrent producers into batched upserts
+## INTERFACES:
+- get_writer(): The shared writer for a database on the running event loop
+- close_writers(): Drain and stop every writer on the running event loop
+- ModelWriter: Queue consumer writing new and changed models with sync_models()
+## DEPENDENCIES:
+- models: Batched incremental model sync
+"""
+import asyncio
+import logging
+import weakref
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from .connection import _pool_key
+from .models import DEFAULT_BATCH_SIZE, sync_models
+
+logger = logging.getLogger(__name__)
+
+_writers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, ModelWriter]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+class ModelWriter:
+    """
+    PURPOSE: Own all model writes to one database
+
+    Producers put() models and keep going; one consumer task writes whatever
+    has queued up since its last commit as a single batch. A slow disk thus
+    turns into larger transactions rather than more of them, and the bounded
+    queue holds producers back once it is full. Models unchanged upstream
+    only have last_checked bumped; `counts` tallies new, changed and
+    unchanged models since the writer was created.
+    """
+    def __init__(self, db_path: Union[str, Path], batch_size: int = DEFAULT_BATCH_SIZE):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.counts = {'new': 0, 'changed': 0, 'unchanged': 0}
+        self.batches = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=batch_size * 2)
+        self._task: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+
+    @property
+    def written(self) -> int:
+        """Models whose rows were written, as opposed to only checked"""
+        return self.counts['new'] + self.counts['changed']
+
+    async def put(self, model_data: Dict) -> None:
+        """Queue a model for writing, waiting while the queue is full"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        await self._queue.put(model_data)
+
+    async def flush(self) -> None:
+        """
+        Wait until everything queued so far has been committed
+
+        Raises the first error a batch hit since the last flush.
+        """
+        await self._queue.join()
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    async def close(self) -> None:
+        """Flush, then stop the consumer task"""
+        try:
+            await self.flush()
+        finally:
+            if self._task is not None:
+                self._task.cancel()
+                try:
+                    await self._task
+                except asyncio.CancelledError:
+                    pass
+                self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                counts = await sync_models(self.db_path, batch, self.batch_size)
+                for key, value in counts.items():
+                    self.counts[key] += value
+                self.batches += 1
+            except Exception as e:
+                logger.error("Failed to write %d models: %s", len(batch), e)
+                self._error = self._error or e
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+def get_writer(db_path: Union[str, Path], batch_size: int = DEFAULT_BATCH_SIZE) -> ModelWriter:
+    """Get or create the shared writer for a database on the running event loop"""
+    writers = _writers.setdefault(asyncio.get_running_loop(), {})
+    key = _pool_key(db_path)
+    if key not in writers:
+        writers[key] = ModelWriter(db_path, batch_size)
+    return writers[key]
+
+
+async def close_writers() -> None:
+    """Drain and stop all writers created on the running event loop"""
+    writers = _writers.pop(asyncio.get_running_loop(), {})
+    for writer in writers.values():
+        await writer.close()
@@ -9,6 +9,7 @@
  - NotADirectoryError
  - AnalysisError
  - ConfigError
+ - QueryError
 
 ## DEPENDENCIES:
  - None
@@ -35,4 +36,8 @@ class AnalysisError(ZerothLawError):
 
 class ConfigError(ZerothLawError):
     """Raised when there is an error with the configuration."""
-    pass
\ No newline at end of file
+    pass
+
+class QueryError(ZerothLawError):
+    """Raised when a search query cannot be parsed."""
+    pass
@@ -5,27 +5,97 @@
 - setup_scheduler(): Initializes the scheduler with daily updates
 - refresh_models(specific_items: Optional[List] = None): Manually refresh specific models/users/searches
 - check_for_updates(): Check for updates from followed creators
+- model_to_record(): Convert a Hugging Face ModelInfo into a database record
+- RateLimiter: Thread-safe spacing of Hugging Face API requests
 
 ## DEPENDENCIES:
 - apscheduler: Scheduling updates
 - huggingface_hub: HF API interactions
+- concurrent.futures: Thread pool for the blocking HF client
 """
 import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Optional, Union
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
 from pathlib import Path
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from huggingface_hub import HfApi
 from . import database
+from .database.models import DEFAULT_BATCH_SIZE
 from .config import get_config
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_FETCH_CONCURRENCY = 8
+DEFAULT_REQUESTS_PER_SECOND = 5.0
+# Listings omit lastModified and sha unless asked; incremental sync compares them
+LIST_FIELDS = ['author', 'downloads', 'likes', 'lastModified', 'sha', 'tags', 'pipeline_tag', 'library_name']
+
+class RateLimiter:
+    """
+    PURPOSE: Space out request starts across threads to at most `rate` per second
+    """
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self) -> None:
+        """
+        PURPOSE: Block the calling thread until its request may start
+        """
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+def model_to_record(model: Any) -> Dict:
+    """
+    PURPOSE: Convert a Hugging Face ModelInfo into the dict upsert_models() stores
+
+    Dicts are passed through unchanged.
+    """
+    if isinstance(model, dict):
+        return model
+    model_id = model.id
+    record = {
+        'id': model_id,
+        'name': model_id.split('/')[-1],
+        'author': model.author or (model_id.split('/')[0] if '/' in model_id else ''),
+        'sha': getattr(model, 'sha', None),
+        'downloads': getattr(model, 'downloads', None),
+        'likes': getattr(model, 'likes', None),
+        'pipeline_tag': getattr(model, 'pipeline_tag', None),
+        'library_name': getattr(model, 'library_name', None),
+        'tags': list(getattr(model, 'tags', None) or []),
+    }
+    last_modified = getattr(model, 'last_modified', None)
+    if last_modified is not None:
+        record['lastModified'] = last_modified.isoformat()
+    return record
+
 class UpdateScheduler:
     """
     PURPOSE: Handles scheduled and manual updates of model data
     """
-    def __init__(self, db_path: Union[str, Path]):
+    def __init__(
+        self,
+        db_path: Union[str, Path],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        fetch_concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+        requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND
+    ):
         self.db_path = Path(db_path)
+        self.batch_size = batch_size
+        # HfApi is blocking; its calls run here so the event loop stays free
+        self.executor = ThreadPoolExecutor(max_workers=fetch_concurrency, thread_name_prefix='hf-fetch')
+        self.rate_limiter = RateLimiter(requests_per_second)
         self.scheduler = AsyncIOScheduler()
         self.hf_api = HfApi()
         self._setup_scheduler()
@@ -51,7 +121,9 @@ class UpdateScheduler:
         """
         PURPOSE: Stop the scheduler gracefully
         """
-        self.scheduler.shutdown()
+        if self.scheduler.running:
+            self.scheduler.shutdown()
+        self.executor.shutdown(wait=False)
 
     async def check_for_updates(self) -> None:
         """
@@ -65,18 +137,20 @@ class UpdateScheduler:
                 )
                 creator_list = [row[0] for row in await creators.fetchall()]
 
-            # Update each creator's models
-            for creator in creator_list:
-                models = self.hf_api.list_models(author=creator)
-                for model in models:
-                    await database.upsert_model(self.db_path, model)
+            # Update each creator's models, several creators at a time
+            report = await self._fetch_all({
+                creator: lambda creator=creator: self.hf_api.list_models(author=creator, expand=LIST_FIELDS)
+                for creator in creator_list
+            })
+            failed = report['failed']
+            logger.info("Update check: %(new)d new, %(changed)d changed, %(unchanged)d unchanged models", report)
 
-            # Update last checked timestamp
+            # Update last checked timestamp of the creators that were fetched
             now = datetime.now().isoformat()
             async with database.get_connection(self.db_path) as db:
-                await db.execute(
-                    "UPDATE followed_creators SET last_checked = ?",
-                    (now,)
+                await db.executemany(
+                    "UPDATE followed_creators SET last_checked = ? WHERE author = ?",
+                    [(now, creator) for creator in creator_list if creator not in failed]
                 )
                 await db.commit()
 
@@ -88,7 +162,7 @@ class UpdateScheduler:
         self,
         specific_items: Optional[List[str]] = None,
         item_type: str = 'model'  # 'model', 'user', or 'search'
-    ) -> None:
+    ) -> Dict[str, Any]:
         """
         PURPOSE: Manually refresh specific models, users, or search results
 
@@ -96,34 +170,80 @@ class UpdateScheduler:
         - specific_items: List of items to refresh (model IDs, usernames, or search queries)
         - item_type: Type of items to refresh ('model', 'user', or 'search')
 
-        RETURNS: None
+        RETURNS: Counts of new, changed and unchanged models, and the items that failed
         """
+        calls: Dict[str, Callable[[], Iterable]] = {}
         if item_type == 'model' and specific_items:
-            for model_id in specific_items:
-                model_info = self.hf_api.model_info(model_id)
-                await database.upsert_model(self.db_path, model_info)
+            calls = {
+                model_id: lambda model_id=model_id: [self.hf_api.model_info(model_id)]
+                for model_id in specific_items
+            }
 
         elif item_type == 'user' and specific_items:
-            for username in specific_items:
-                models = self.hf_api.list_models(author=username)
-                for model in models:
-                    await database.upsert_model(self.db_path, model)
+            calls = {
+                username: lambda username=username: self.hf_api.list_models(author=username, expand=LIST_FIELDS)
+                for username in specific_items
+            }
 
         elif item_type == 'search' and specific_items:
-            for query in specific_items:
-                models = self.hf_api.list_models(search=query)
-                for model in models:
-                    await database.upsert_model(self.db_path, model)
+            calls = {
+                query: lambda query=query: self.hf_api.list_models(search=query, expand=LIST_FIELDS)
+                for query in specific_items
+            }
+
+        return await self._fetch_all(calls)
+
+    def _writer(self) -> database.ModelWriter:
+        """
+        PURPOSE: The shared writer every producer for this database funnels into
+        """
+        return database.get_writer(self.db_path, self.batch_size)
 
-async def create_scheduler(db_path: Union[str, Path]) -> UpdateScheduler:
+    async def _fetch_all(self, calls: Dict[str, Callable[[], Iterable]]) -> Dict[str, Any]:
+        """
+        PURPOSE: Run HF calls on the thread pool, streaming models into the writer
+
+        PARAMS:
+        - calls: Item name to a blocking call returning models
+
+        RETURNS: New, changed and unchanged counts, and 'failed' items; the
+        other items are still written
+        """
+        loop = asyncio.get_running_loop()
+        writer = self._writer()
+        before = dict(writer.counts)
+
+        def fetch(call: Callable[[], Iterable]) -> None:
+            self.rate_limiter.wait()
+            for model in call():
+                # Waits while the writer queue is full, so fetching never outruns the disk
+                asyncio.run_coroutine_threadsafe(writer.put(model_to_record(model)), loop).result()
+
+        results = await asyncio.gather(
+            *(loop.run_in_executor(self.executor, fetch, call) for call in calls.values()),
+            return_exceptions=True
+        )
+        failed = []
+        for item, result in zip(calls, results):
+            if isinstance(result, Exception):
+                logger.error("Failed to fetch %s: %s", item, result)
+                failed.append(item)
+        await writer.flush()
+        # The writer is shared, so counts include other producers running alongside
+        report: Dict[str, Any] = {key: writer.counts[key] - before[key] for key in before}
+        report['failed'] = failed
+        return report
+
+async def create_scheduler(db_path: Union[str, Path], **options: Any) -> UpdateScheduler:
     """
     PURPOSE: Factory function to create and start a scheduler
 
     PARAMS:
     - db_path: Path to the SQLite database
+    - options: UpdateScheduler tuning (batch_size, fetch_concurrency, requests_per_second)
 
     RETURNS: Running UpdateScheduler instance
     """
-    scheduler = UpdateScheduler(db_path)
+    scheduler = UpdateScheduler(db_path, **options)
     await scheduler.start()
     return scheduler
@@ -4,20 +4,44 @@
 ## INTERFACES:
 - HugSearchApp: Main application class
 - SearchInput: Search input widget with as-you-type functionality
-- ResultsList: Scrollable results view with mouse support
+- ResultsList: Virtualized, scrollable results view with mouse support
+- ResultsSource: Windowed, page-by-page view of one query's results
 - StatusBar: Shows update status and search info
+- format_result(): One line of the results list
+- refine_results(): Provisional results for a query extending the previous one
 
 ## DEPENDENCIES:
 - textual: TUI framework
 - rich: Text formatting
+- database: Cached model search
 """
+import asyncio
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+from rich.text import Text
+from textual import events
 from textual.app import App, ComposeResult
 from textual.containers import Container, Vertical
-from textual.widgets import Input, ListView, Footer, Header
+from textual.geometry import Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from textual.widgets import Input, Footer, Header, Static
 from textual.screen import Screen
 from textual.binding import Binding
 from textual.message import Message
-from typing import List, Dict
+from typing import List, Dict, Optional, Set, Union
+
+from .database import ModelSummary, SearchCache, close_pools, encode_cursor
+from .database.query import And, Node, Not, Or, Term, parse_query, tokenize_query
+from .exceptions import QueryError
+
+# Results fetched per page; the first page is what typing searches for
+PAGE_SIZE = 100
+# Pages a results list keeps in memory; others are fetched again when scrolled back to
+MAX_CACHED_PAGES = 10
+# Quiet time after a keystroke before the database is searched
+DEBOUNCE_SECONDS = 0.12
 
 class SearchInput(Input):
     """
@@ -32,15 +56,323 @@ class SearchInput(Input):
         """Emit search changed event for real-time search"""
         self.post_message(self.SearchChanged(self.value))
 
-class ResultsList(ListView):
+def format_result(result: ModelSummary) -> Text:
+    """One line of the results list; model names are not parsed as markup"""
+    return Text.assemble(
+        result.name, (f"  {result.author} | {result.downloads:,} downloads", "dim"), no_wrap=True, end=''
+    )
+
+def _may_match(node: Node, result: ModelSummary) -> Optional[bool]:
+    """Whether a result matches by name and author; None where tags or descriptions decide"""
+    if isinstance(node, Term):
+        if node.field == 'tag':
+            return None
+        if node.field == 'author':
+            return result.author.lower() == node.text.lower()
+        # Without the name, the description or a tag may still match
+        return True if node.text.lower() in result.name.lower() else None
+    if isinstance(node, Not):
+        child = _may_match(node.child, result)
+        return None if child is None else not child
+    if isinstance(node, (And, Or)):
+        sides = (_may_match(node.left, result), _may_match(node.right, result))
+        decisive = isinstance(node, Or)
+        if decisive in sides:
+            return decisive
+        return None if None in sides else not decisive
+    return True
+
+def _narrows(previous_query: str, query: str) -> bool:
+    """
+    Whether a query typed on from the previous one can only match fewer models
+
+    Added terms are ANDed, which narrows; a new OR or NOT widens. Typing on
+    into the last term narrows a plain term, whose name and description
+    matches are substring and prefix ones, but not a negated, tag: or
+    author: term, or one that turns into a field qualifier.
+    """
+    try:
+        before, after = tokenize_query(previous_query), tokenize_query(query)
+    except QueryError:
+        return False
+    if any(after.count(op) != before.count(op) for op in ('OR', 'NOT')):
+        return False
+    last = len(before) - 1
+    if after[:last] != before[:last]:
+        return False
+    if last < 0 or after[last] == before[last]:
+        return True
+    old, new = before[last], after[last]
+    return (
+        isinstance(old, Term) and isinstance(new, Term)
+        and old.field is None and new.field is None and not new.phrase
+        and new.text.startswith(old.text)
+        and (last == 0 or before[last - 1] != 'NOT')
+    )
+
+def refine_results(
+    previous_query: str,
+    previous_results: List[ModelSummary],
+    query: str,
+    limit: int = PAGE_SIZE
+) -> Optional[List[ModelSummary]]:
+    """
+    Narrow the previous results in memory while the database search runs
+
+    Applies when the query only adds to the end of the previous one in a
+    way that narrows it, and the previous results were complete, i.e. fewer
+    than `limit`. Rows carry no descriptions or tags, so only rows whose
+    name or author rules them out are dropped; the database search that
+    follows has the final word. Returns None when the results cannot be
+    refined.
+    """
+    if not previous_query.strip() or not query.startswith(previous_query) or len(previous_results) >= limit:
+        return None
+    if not _narrows(previous_query, query):
+        return None
+    try:
+        tree = parse_query(query)
+    except QueryError:
+        return None
+    return [result for result in previous_results if _may_match(tree, result) is not False]
+
+class ResultsSource:
+    """
+    PURPOSE: Windowed view of one query's results, fetched a page at a time
+
+    Pages come from SearchCache.search() with keyset cursors. The cursor of
+    each page is kept once reached, so any page can be fetched again. Only
+    the most recently used pages are held, so memory stays flat however far
+    the list is scrolled. The total is unknown until the last page arrives.
+    Without a cache the source is just the rows it was given.
+    """
+    def __init__(
+        self,
+        cache: Optional[SearchCache],
+        query: str,
+        first_page: List[ModelSummary],
+        page_size: Optional[int] = None,
+        max_pages: Optional[int] = None
+    ):
+        self.cache = cache
+        self.query = query
+        self.page_size = page_size or PAGE_SIZE
+        self.max_pages = max_pages or MAX_CACHED_PAGES
+        self.complete = cache is None
+        self._pages: "OrderedDict[int, List[ModelSummary]]" = OrderedDict()
+        # Cursor each page starts after; the last one is the next page to fetch
+        self._cursors: List[Optional[str]] = [None]
+        self._last_length = len(first_page)
+        self._store(0, first_page)
+
+    @property
+    def row_count(self) -> int:
+        """Rows known so far; all of them once `complete`"""
+        return (len(self._cursors) - 1) * self.page_size + (self._last_length if self.complete else 0)
+
+    @property
+    def pages_held(self) -> int:
+        return len(self._pages)
+
+    def row(self, index: int) -> Optional[ModelSummary]:
+        """The row at an index, or None while its page is not in memory"""
+        page, offset = divmod(index, self.page_size)
+        rows = self._pages.get(page)
+        if rows is None or offset >= len(rows):
+            return None
+        self._pages.move_to_end(page)
+        return rows[offset]
+
+    def needs(self, page: int) -> bool:
+        """Whether a page can be fetched and is not held"""
+        return self.cache is not None and page not in self._pages and page < len(self._cursors)
+
+    async def load(self, page: int) -> None:
+        """Fetch a page by its cursor"""
+        rows = await self.cache.search(self.query, limit=self.page_size, after=self._cursors[page])
+        self._store(page, rows)
+
+    def _store(self, page: int, rows: List[ModelSummary]) -> None:
+        self._pages[page] = rows
+        self._pages.move_to_end(page)
+        if len(rows) < self.page_size:
+            self.complete = True
+            self._last_length = len(rows)
+            del self._cursors[page + 1:]
+        elif page + 1 == len(self._cursors) and not self.complete:
+            self._cursors.append(encode_cursor(rows[-1]))
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+
+class ResultsList(ScrollView, can_focus=True):
     """
     PURPOSE: Display search results with mouse interaction
+
+    Rows are drawn from a ResultsSource as they scroll into view instead of
+    being mounted as widgets, so render time and memory do not grow with
+    the number of results. Scrolling or resizing onto rows whose page is not
+    held fetches it, and reaching the end of the known rows fetches the next.
+    Each fetched page is announced with PageLoaded, each failure with
+    LoadFailed.
     """
-    def on_list_view_selected(self, selected: ListView.Selected) -> None:
-        """Handle result selection"""
-        self.post_message(self.Selected(selected.item))
+    BINDINGS = [
+        Binding("up", "move(-1)", "Up", show=False),
+        Binding("down", "move(1)", "Down", show=False),
+        Binding("pageup", "page(-1)", "Page up", show=False),
+        Binding("pagedown", "page(1)", "Page down", show=False),
+        Binding("home", "first", "First", show=False),
+        Binding("end", "last", "Last", show=False),
+        Binding("enter", "select", "Select", show=False),
+    ]
+    COMPONENT_CLASSES = {"results-list--highlight"}
+    DEFAULT_CSS = """
+    ResultsList > .results-list--highlight {
+        background: $accent 50%;
+    }
+    """
+
+    class Selected(Message):
+        """A result was chosen with enter or a click"""
+        def __init__(self, result: ModelSummary) -> None:
+            self.result = result
+            super().__init__()
+
+    class PageLoaded(Message):
+        """A page of the shown results arrived, so the count may have changed"""
+        def __init__(self, source: ResultsSource) -> None:
+            self.source = source
+            super().__init__()
+
+    class LoadFailed(Message):
+        """A page could not be fetched; scrolling to it again retries"""
+        def __init__(self, error: Exception) -> None:
+            self.error = error
+            super().__init__()
 
-class StatusBar(Footer):
+    def __init__(self) -> None:
+        super().__init__()
+        self.source: Optional[ResultsSource] = None
+        self.highlighted = 0
+        self._loading: Set[int] = set()
+
+    def show(self, source: ResultsSource) -> None:
+        """Display a new set of results from the top, abandoning pages still loading for the old ones"""
+        self.app.workers.cancel_group(self, 'result-pages')
+        self.source = source
+        self.highlighted = 0
+        self._loading = set()
+        self.scroll_to(y=0, animate=False)
+        self._resize()
+        self.refresh()
+        self._fetch_visible()
+
+    @property
+    def row_count(self) -> int:
+        return self.source.row_count if self.source else 0
+
+    def _resize(self) -> None:
+        # One extra line stands for the rows past the last fetched page
+        more = self.source is not None and not self.source.complete
+        self.virtual_size = Size(self.size.width, self.row_count + more)
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        index = scroll_y + y
+        width = self.size.width
+        base_style = self.rich_style
+        if self.source is None or index > self.row_count or (index == self.row_count and self.source.complete):
+            return Strip.blank(width, base_style)
+
+        row = self.source.row(index) if index < self.row_count else None
+        if row is None:
+            text = Text("Loading…" if index < self.row_count else "Loading more…", style="dim", end='')
+        else:
+            text = format_result(row)
+        text.stylize_before(base_style)
+        if index == self.highlighted and row is not None:
+            text.stylize(self.get_component_rich_style("results-list--highlight"))
+        strip = Strip(text.render(self.app.console), text.cell_len)
+        return strip.crop_extend(scroll_x, scroll_x + width, base_style)
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        super().watch_scroll_y(old_value, new_value)
+        if round(old_value) != round(new_value):
+            self._fetch_visible()
+
+    def on_resize(self, event: events.Resize) -> None:
+        self._fetch_visible()
+
+    def _fetch_visible(self) -> None:
+        """Fetch the pages of the rows in view and the row below, so showing the last known row fetches the next page"""
+        if self.source is None:
+            return
+        top = self.scroll_offset.y
+        below = min(top + self.scrollable_content_region.height, self.row_count)
+        for page in range(top // self.source.page_size, below // self.source.page_size + 1):
+            self._request(page)
+
+    def _request(self, page: int) -> None:
+        source = self.source
+        if source is not None and page not in self._loading and source.needs(page):
+            self._loading.add(page)
+            self.run_worker(self._load(source, page), group='result-pages')
+
+    async def _load(self, source: ResultsSource, page: int) -> None:
+        try:
+            await source.load(page)
+        except sqlite3.OperationalError as e:
+            # Such as "database is locked" during a sync; the list stays usable
+            if source is self.source:
+                self._loading.discard(page)
+                self.post_message(self.LoadFailed(e))
+            return
+        if source is self.source:
+            self._loading.discard(page)
+            self._resize()
+            self.refresh()
+            self._fetch_visible()
+            self.post_message(self.PageLoaded(source))
+
+    def action_move(self, delta: int) -> None:
+        """Move the highlight, scrolling to keep it in view"""
+        if not self.row_count:
+            return
+        self.highlighted = max(0, min(self.row_count - 1, self.highlighted + delta))
+        top = self.scroll_offset.y
+        height = self.scrollable_content_region.height
+        if self.highlighted < top:
+            self.scroll_to(y=self.highlighted, animate=False)
+        elif self.highlighted >= top + height:
+            self.scroll_to(y=self.highlighted - height + 1, animate=False)
+        self.refresh()
+
+    def action_page(self, direction: int) -> None:
+        self.action_move(direction * max(1, self.scrollable_content_region.height - 1))
+
+    def action_first(self) -> None:
+        self.action_move(-self.highlighted)
+
+    def action_last(self) -> None:
+        """Jump to the last known row; if more exist, the next page loads"""
+        self.action_move(self.row_count - 1 - self.highlighted)
+
+    def action_select(self) -> None:
+        row = self.source.row(self.highlighted) if self.source else None
+        if row is not None:
+            self.post_message(self.Selected(row))
+
+    def on_click(self, event: events.Click) -> None:
+        """Highlight and select the clicked row"""
+        offset = event.get_content_offset(self)
+        if offset is None or self.source is None:
+            return
+        index = self.scroll_offset.y + offset.y
+        if index < self.row_count:
+            self.highlighted = index
+            self.refresh()
+            self.action_select()
+
+class StatusBar(Static):
     """
     PURPOSE: Show status updates and search information
     """
@@ -50,7 +382,8 @@ class StatusBar(Footer):
 
     def update_status(self, message: str) -> None:
         """Update status message"""
-        self.highlight_key = message
+        self.message = message
+        self.update(message)
 
 class SearchScreen(Screen):
     """
@@ -63,6 +396,14 @@ class SearchScreen(Screen):
         Binding("ctrl+h", "toggle_help", "Help", show=True),
     ]
 
+    def __init__(self, db_path: Union[str, Path]) -> None:
+        super().__init__()
+        # Typing and backspacing repeat queries, so results are served from memory when possible
+        self.cache = SearchCache(db_path)
+        # Last results from the database, which later keystrokes refine
+        self._searched_query = ''
+        self._searched_results: List[ModelSummary] = []
+
     def compose(self) -> ComposeResult:
         yield Header()
         yield Container(
@@ -73,20 +414,68 @@ class SearchScreen(Screen):
             ),
             StatusBar()
         )
+        yield Footer()
 
-    async def on_search_input_search_changed(self, message: SearchInput.SearchChanged) -> None:
+    def on_search_input_search_changed(self, message: SearchInput.SearchChanged) -> None:
         """
         Handle real-time search updates
+
+        Each keystroke replaces the search in flight: the exclusive worker
+        group cancels the previous one, whether it is still debouncing or
+        already running its SQL.
         """
-        # Update results list based on search
-        await self.update_results(message.query)
+        self.run_worker(self.update_results(message.query), group='search', exclusive=True)
 
     async def update_results(self, query: str) -> None:
         """
         Update results based on search query
+
+        Cached results show at once. Otherwise the previous results, refined
+        in memory, show at once and the database is searched once typing
+        pauses.
         """
-        # TODO: Implement actual search using database.search_models
-        pass
+        status = self.query_one(StatusBar)
+        try:
+            results = self.cache.get(query, limit=PAGE_SIZE)
+        except QueryError as e:
+            # Half-typed queries such as "llama AND" keep the previous results
+            status.update_status(f"Incomplete query: {e}")
+            return
+        if results is None:
+            refined = refine_results(self._searched_query, self._searched_results, query)
+            if refined is not None:
+                self.show_results(ResultsSource(None, query, refined), "refining")
+            await asyncio.sleep(DEBOUNCE_SECONDS)
+            try:
+                results = await self.cache.search(query, limit=PAGE_SIZE)
+            except sqlite3.OperationalError as e:
+                # Such as "database is locked" during a sync; the next keystroke retries
+                status.update_status(f"Search failed: {e}")
+                return
+        self._searched_query, self._searched_results = query, results
+        self.show_results(ResultsSource(self.cache, query, results))
+
+    def show_results(self, source: ResultsSource, note: str = '') -> None:
+        """Replace the listed results and report them"""
+        self.query_one(ResultsList).show(source)
+        self.report_results(source, note)
+
+    def report_results(self, source: ResultsSource, note: str = '') -> None:
+        """Report the number of results known so far with the cache stats"""
+        stats = self.cache.stats()
+        count = f"{source.row_count}{'' if source.complete else '+'} results"
+        self.query_one(StatusBar).update_status(
+            f"{count}{f' ({note})' if note else ''} | cache {stats['hits']} hits, "
+            f"{stats['misses']} misses ({stats['hit_rate']:.0%})"
+        )
+
+    def on_results_list_page_loaded(self, message: ResultsList.PageLoaded) -> None:
+        """Update the count as pages arrive, dropping the "+" once the last one has"""
+        if message.source is self.query_one(ResultsList).source:
+            self.report_results(message.source)
+
+    def on_results_list_load_failed(self, message: ResultsList.LoadFailed) -> None:
+        self.query_one(StatusBar).update_status(f"Could not load results: {message.error}")
 
     async def action_refresh(self) -> None:
         """
@@ -121,8 +510,18 @@ class HugSearchApp(App):
     }
     """
 
+    def __init__(self, db_path: Union[str, Path]) -> None:
+        super().__init__()
+        self.db_path = db_path
+
     def on_mount(self) -> None:
         """
         Initialize application
         """
-        self.push_screen(SearchScreen())
\ No newline at end of file
+        self.push_screen(SearchScreen(self.db_path))
+
+    async def on_unmount(self) -> None:
+        """
+        Close pooled database connections before the event loop ends
+        """
+        await close_pools()
\ No newline at end of file
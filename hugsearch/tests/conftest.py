@@ -3,10 +3,13 @@
 
 ## INTERFACES: None - pytest uses this file automatically
 
-## DEPENDENCIES: pytest
+## DEPENDENCIES: pytest, pytest-asyncio
 """
 
 import pytest
+import pytest_asyncio
+
+from hugsearch.database import close_pools
 
 # Add any shared fixtures here
 @pytest.fixture(scope="session")
@@ -17,3 +20,13 @@ def base_fixture():
     RETURNS: None - placeholder for actual test resources
     """
     return None
+
+@pytest_asyncio.fixture(autouse=True)
+async def close_database_pools():
+    """
+    PURPOSE: Close the pooled connections a test opened
+
+    RETURNS: None - their worker threads would otherwise keep pytest from exiting
+    """
+    yield
+    await close_pools()
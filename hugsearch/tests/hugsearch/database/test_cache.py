@@ -0,0 +1,68 @@
+"""
+# PURPOSE: Test the search result cache
+## INTERFACES: None (test module)
+"""
+import pytest
+import pytest_asyncio
+
+from hugsearch.database import close_pools
+from hugsearch.database.cache import SearchCache, cache_key
+from hugsearch.database.models import upsert_model, delete_model, write_generation
+from hugsearch.database.schema import init_db
+
+@pytest_asyncio.fixture
+async def test_db(tmp_path):
+    """Create a database with a few models"""
+    db_path = tmp_path / "test_cache.db"
+    await init_db(db_path)
+    await upsert_model(db_path, {"id": "m1", "name": "Llama-7B", "author": "meta", "tags": ["llm"]})
+    await upsert_model(db_path, {"id": "m2", "name": "Qwen-7B", "author": "qwen", "tags": ["llm"]})
+    yield db_path
+    await close_pools()
+
+def test_equivalent_queries_share_a_key():
+    """Test that spacing, parentheses, implicit AND and ignored case do not change the key"""
+    assert cache_key("llama  7b") == cache_key("(Llama) AND 7B")
+    assert cache_key("Llama", case_sensitive=True) != cache_key("llama", case_sensitive=True)
+    assert cache_key("llama", filters={"tags": "LLM"}) == cache_key("llama", filters={"tags": "llm"})
+    assert cache_key("llama") != cache_key("llama", exact_match=True)
+
+@pytest.mark.asyncio
+async def test_repeated_queries_are_hits(test_db):
+    """Test that typing and backspacing serve earlier queries from memory"""
+    cache = SearchCache(test_db)
+    for query in ["l", "ll", "lla", "ll", "l", "lla"]:
+        await cache.search(query)
+    assert (cache.hits, cache.misses) == (3, 3)
+    assert [r.id for r in await cache.search("LLA")] == ["m1"]
+    assert cache.stats() == {"hits": 4, "misses": 3, "hit_rate": 4 / 7, "size": 3}
+
+@pytest.mark.asyncio
+async def test_writes_invalidate(test_db):
+    """Test that upserts and deletes bump the write generation and empty the cache"""
+    cache = SearchCache(test_db)
+    assert [r.id for r in await cache.search("7b")] == ["m1", "m2"]
+
+    generation = write_generation(test_db)
+    await upsert_model(test_db, {"id": "m3", "name": "Mistral-7B", "author": "mistralai"})
+    assert write_generation(test_db) == generation + 1
+    assert {r.id for r in await cache.search("7b")} == {"m1", "m2", "m3"}
+
+    await delete_model(test_db, "m1")
+    assert not await delete_model(test_db, "m1")
+    assert write_generation(test_db) == generation + 2
+    assert {r.id for r in await cache.search("7b")} == {"m2", "m3"}
+    assert cache.misses == 3
+
+@pytest.mark.asyncio
+async def test_least_recently_used_is_evicted(test_db):
+    """Test that the cache stays within maxsize, dropping the oldest lookup"""
+    cache = SearchCache(test_db, maxsize=2)
+    await cache.search("llama")
+    await cache.search("qwen")
+    await cache.search("llama")
+    await cache.search("meta")
+    assert len(cache) == 2
+    await cache.search("llama")
+    await cache.search("qwen")
+    assert (cache.hits, cache.misses) == (2, 4)
@@ -0,0 +1,40 @@
+"""
+# PURPOSE: Test the compressed metadata encoding
+## INTERFACES: None (test module)
+"""
+import json
+import pytest
+
+from hugsearch.database.codec import FORMAT_DEFLATE_V1, decode_metadata, encode_metadata, metadata_json
+
+MODEL = {
+    "id": "TheBloke/Llama-2-13B-chat-GGUF",
+    "name": "Llama-2-13B-chat-GGUF",
+    "author": "TheBloke",
+    "sha": "4458acc949de0a9914c3eab623904d4fe999050a",
+    "downloads": 123456,
+    "likes": 789,
+    "pipeline_tag": "text-generation",
+    "library_name": "transformers",
+    "tags": ["transformers", "gguf", "llama", "text-generation", "en", "license:llama2", "region:us"],
+    "lastModified": "2023-09-27T12:47:55+00:00",
+    "description": "Llama 2 13B chat, quantized — ünïcode included",
+}
+
+def test_round_trip_is_smaller_than_json():
+    """Test that encoding round-trips and beats plain JSON by a wide margin"""
+    blob = encode_metadata(MODEL)
+    assert blob[0] == FORMAT_DEFLATE_V1
+    assert decode_metadata(blob) == MODEL
+    assert len(blob) * 2 < len(json.dumps(MODEL).encode())
+
+def test_legacy_text_is_read_as_is():
+    """Test that rows stored before compression decode unchanged"""
+    text = json.dumps(MODEL)
+    assert metadata_json(text) is text
+    assert decode_metadata(text) == MODEL
+
+def test_unknown_format_is_rejected():
+    """Test that blobs from an unknown codec fail loudly rather than decode to garbage"""
+    with pytest.raises(ValueError):
+        decode_metadata(b"\x7f" + encode_metadata(MODEL)[1:])
@@ -0,0 +1,131 @@
+"""
+# PURPOSE: Test the pooled connection manager
+## INTERFACES: None (test module)
+"""
+import asyncio
+import pytest
+import pytest_asyncio
+
+from hugsearch.database import connection
+from hugsearch.database.connection import get_connection, get_pool, close_pools
+from hugsearch.database.models import upsert_model, delete_model
+from hugsearch.database.schema import init_db
+from hugsearch.database.search import search_models
+
+@pytest_asyncio.fixture
+async def test_db(tmp_path):
+    """Create an empty database and close its pool afterwards"""
+    db_path = tmp_path / "test_connection.db"
+    await init_db(db_path)
+    yield db_path
+    await close_pools()
+
+@pytest.mark.asyncio
+async def test_connection_settings(test_db):
+    """Test that pooled connections are tuned on open"""
+    async with get_connection(test_db) as db:
+        cursor = await db.execute("PRAGMA journal_mode")
+        assert (await cursor.fetchone())[0] == "wal"
+        cursor = await db.execute("PRAGMA foreign_keys")
+        assert (await cursor.fetchone())[0] == 1
+        cursor = await db.execute("PRAGMA busy_timeout")
+        assert (await cursor.fetchone())[0] == connection.BUSY_TIMEOUT_MS
+        cursor = await db.execute("PRAGMA cache_size")
+        assert (await cursor.fetchone())[0] == -connection.CACHE_SIZE_KIB
+
+@pytest.mark.asyncio
+async def test_connections_are_reused(test_db):
+    """Test that sequential and nested calls share warm connections"""
+    async with get_connection(test_db) as first:
+        async with get_connection(test_db) as nested:
+            assert nested is first
+    async with get_connection(str(test_db)) as again:
+        assert again is first
+
+    await upsert_model(test_db, {"id": "m1", "name": "Model", "author": "a", "tags": ["x"]})
+    await search_models(test_db, "model")
+    assert get_pool(test_db).opened == 1
+
+@pytest.mark.asyncio
+async def test_pool_size_bounds_concurrency(test_db):
+    """Test that concurrent tasks get distinct connections up to the pool size"""
+    held = set()
+    peak = 0
+
+    async def borrow():
+        nonlocal peak
+        async with get_connection(test_db) as db:
+            held.add(db)
+            peak = max(peak, len(held))
+            await asyncio.sleep(0.01)
+            held.discard(db)
+
+    await asyncio.gather(*(borrow() for _ in range(connection.POOL_SIZE * 3)))
+    assert peak == connection.POOL_SIZE
+    assert get_pool(test_db).opened == connection.POOL_SIZE
+
+@pytest.mark.asyncio
+async def test_uncommitted_work_is_rolled_back(test_db):
+    """Test that a connection returns to the pool without open transactions"""
+    async with get_connection(test_db) as db:
+        await db.execute("INSERT INTO followed_creators VALUES ('someone', 'now')")
+
+    async with get_connection(test_db) as db:
+        assert not db.in_transaction
+        cursor = await db.execute("SELECT COUNT(*) FROM followed_creators")
+        assert (await cursor.fetchone())[0] == 0
+
+@pytest.mark.asyncio
+async def test_delete_cascades_to_tags(test_db):
+    """Test that foreign keys are enforced on pooled connections"""
+    await upsert_model(test_db, {"id": "m1", "name": "Model", "author": "a", "tags": ["x", "y"]})
+    assert await delete_model(test_db, "m1")
+
+    async with get_connection(test_db) as db:
+        cursor = await db.execute("SELECT COUNT(*) FROM model_tags")
+        assert (await cursor.fetchone())[0] == 0
+
+@pytest.mark.asyncio
+async def test_close_pools(test_db):
+    """Test that closing drops the pools for the running loop"""
+    async with get_connection(test_db) as first:
+        pass
+    await close_pools()
+    async with get_connection(test_db) as second:
+        assert second is not first
+
+@pytest.mark.asyncio
+async def test_spawned_tasks_borrow_their_own_connection(test_db):
+    """Test that tasks created inside a block do not share its connection"""
+    async def borrow():
+        async with get_connection(test_db) as db:
+            return db
+
+    async with get_connection(test_db) as outer:
+        children = await asyncio.gather(borrow(), asyncio.create_task(borrow()))
+        assert outer not in children
+        assert await borrow() is outer
+
+@pytest.mark.asyncio
+async def test_writer_started_inside_block_outlives_it(test_db):
+    """Test that a writer task first started by a caller holding a connection keeps working"""
+    from hugsearch.database.writer import ModelWriter
+
+    writer = ModelWriter(test_db)
+    async with get_connection(test_db):
+        await writer.put({"id": "m1", "name": "One", "author": "a"})
+        await writer.flush()
+    # Closes every idle connection, including the one the block returned
+    await close_pools()
+    await writer.put({"id": "m2", "name": "Two", "author": "a"})
+    await writer.close()
+    assert writer.counts['new'] == 2
+
+@pytest.mark.asyncio
+async def test_row_factory_stays_on_cursor(test_db):
+    """Test that nested searches do not change how the caller's rows come back"""
+    await upsert_model(test_db, {"id": "m1", "name": "Model", "author": "a"})
+    async with get_connection(test_db) as db:
+        await search_models(test_db, "model")
+        cursor = await db.execute("SELECT id FROM models")
+        assert await cursor.fetchall() == [("m1",)]
@@ -7,7 +7,10 @@ import pytest
 import pytest_asyncio
 from pathlib import Path
 
-from hugsearch.database.models import upsert_model, get_model, delete_model
+from hugsearch.database.connection import get_connection
+from hugsearch.database.models import upsert_model, upsert_models, sync_models, get_model, delete_model, popularity_fields
+from hugsearch.database.search import search_models
+from hugsearch.database.tags import get_model_tags
 from hugsearch.database.schema import init_db
 
 @pytest_asyncio.fixture
@@ -80,3 +83,62 @@ async def test_model_metadata(test_db):
     # Check core fields are properly stored
     assert saved_model["name"] == model_data["name"]
     assert saved_model["author"] == model_data["author"]
+
+@pytest.mark.asyncio
+async def test_upsert_models_batches(test_db):
+    """Test bulk upsert across several batches"""
+    models = (
+        {"id": f"m{i}", "name": f"Model {i}", "author": "bulk", "description": f"model number {i}", "tags": ["bulk", f"t{i % 3}"]}
+        for i in range(25)
+    )
+    assert await upsert_models(test_db, models, batch_size=10) == 25
+
+    assert (await get_model(test_db, "m24"))["name"] == "Model 24"
+    assert await get_model_tags(test_db, "m7") == ["bulk", "t1"]
+    assert len(await search_models(test_db, "bulk")) == 25
+
+@pytest.mark.asyncio
+async def test_upsert_models_replaces_rows(test_db):
+    """Test that re-upserting leaves one description and the new tags"""
+    model = {"id": "m1", "name": "Model", "author": "a", "description": "first words", "tags": ["old", "old"]}
+    await upsert_models(test_db, [model])
+    updated = dict(model, description="second words", tags=["new"])
+    # The last copy of a model within a batch wins
+    await upsert_models(test_db, [model, updated])
+
+    async with get_connection(test_db) as db:
+        cursor = await db.execute("SELECT description FROM model_descriptions WHERE model_id = 'm1'")
+        assert await cursor.fetchall() == [("second words",)]
+    assert await get_model_tags(test_db, "m1") == ["new"]
+
+@pytest.mark.asyncio
+async def test_sync_models_counts_changes(test_db):
+    """Test incremental sync by lastModified, falling back to sha"""
+    models = [
+        {"id": "dated", "name": "Dated", "author": "a", "lastModified": "2024-01-01", "tags": ["x"]},
+        {"id": "hashed", "name": "Hashed", "author": "a", "sha": "abc"},
+    ]
+    assert await sync_models(test_db, models) == {"new": 2, "changed": 0, "unchanged": 0}
+    before = await get_model(test_db, "dated")
+
+    assert await sync_models(test_db, models) == {"new": 0, "changed": 0, "unchanged": 2}
+    after = await get_model(test_db, "dated")
+    assert after["metadata"] == before["metadata"]
+    assert after["last_checked"] > before["last_checked"]
+
+    models[0] = dict(models[0], lastModified="2024-02-01", tags=["y"])
+    models[1] = dict(models[1], sha="def")
+    assert await sync_models(test_db, models) == {"new": 0, "changed": 2, "unchanged": 0}
+    assert await get_model_tags(test_db, "dated") == ["y"]
+
+@pytest.mark.asyncio
+async def test_sync_models_refreshes_popularity_of_unchanged(test_db):
+    """Test that unchanged models still pick up new download and like counts"""
+    model = {"id": "m1", "name": "Model", "author": "a", "lastModified": "2024-01-01", "downloads": 10, "likes": 1}
+    await sync_models(test_db, [model])
+    counts = await sync_models(test_db, [dict(model, downloads=5000, likes=40)])
+    assert counts["unchanged"] == 1
+
+    async with get_connection(test_db) as db:
+        cursor = await db.execute("SELECT downloads, likes, popularity FROM models WHERE id = 'm1'")
+        assert await cursor.fetchone() == popularity_fields({"downloads": 5000, "likes": 40})
@@ -0,0 +1,73 @@
+"""
+# PURPOSE: Test the boolean query parser and compiler
+## INTERFACES: None (test module)
+"""
+import pytest
+import pytest_asyncio
+
+from hugsearch.database.models import upsert_models
+from hugsearch.database.query import And, MatchAll, Not, Or, Term, compile_query, parse_query
+from hugsearch.database.schema import init_db
+from hugsearch.database.search import search_models
+from hugsearch.exceptions import QueryError
+
+@pytest_asyncio.fixture
+async def test_db(tmp_path):
+    """Create test database with sample data"""
+    db_path = tmp_path / "test_query.db"
+    await init_db(db_path)
+    await upsert_models(db_path, [
+        {"id": "meta/llama-7b", "name": "llama-7b", "author": "meta",
+         "description": "A foundational language model", "tags": ["llm", "base"]},
+        {"id": "meta/codellama", "name": "CodeLlama", "author": "meta",
+         "description": "Code specialized model", "tags": ["llm", "code"]},
+        {"id": "mistralai/mistral-7b", "name": "Mistral-7B", "author": "mistralai",
+         "description": "Efficient language model", "tags": ["llm"]},
+        {"id": "openai/whisper", "name": "whisper", "author": "openai",
+         "description": "Speech recognition", "tags": ["audio"]},
+    ])
+    return db_path
+
+async def ids(db_path, query, **kwargs):
+    return {r["id"] for r in await search_models(db_path, query, **kwargs)}
+
+def test_parse_precedence():
+    """Test that NOT binds tighter than AND, and AND tighter than OR"""
+    assert parse_query('a OR b c AND NOT tag:x') == Or(
+        Term("a"), And(And(Term("b"), Term("c")), Not(Term("x", "tag")))
+    )
+    assert parse_query('(a OR b) "c d"') == And(Or(Term("a"), Term("b")), Term("c d", phrase=True))
+    assert parse_query('  ') == MatchAll()
+
+@pytest.mark.parametrize("query", ['a AND', '(a OR b', 'a )', '"unterminated', 'NOT'])
+def test_parse_errors(query):
+    """Test that malformed queries raise QueryError"""
+    with pytest.raises(QueryError):
+        parse_query(query)
+
+def test_compiles_to_one_statement():
+    """Test that the query and filters become a single WITH statement selecting compact rows"""
+    sql, params = compile_query('llama OR author:openai', filters={"tags": "llm"})
+    assert sql.startswith("WITH ") and sql.count("SELECT m.id, m.name") == 1
+    assert "m.*" not in sql and "metadata" not in sql
+    assert sql.count("?") == len(params)
+
+@pytest.mark.asyncio
+async def test_boolean_queries(test_db):
+    """Test set algebra done by the database"""
+    assert await ids(test_db, "llama") == {"meta/llama-7b", "meta/codellama"}
+    assert await ids(test_db, "llama NOT tag:code") == {"meta/llama-7b"}
+    assert await ids(test_db, "(llama OR mistral) AND 7b") == {"meta/llama-7b", "mistralai/mistral-7b"}
+    assert await ids(test_db, "NOT tag:llm") == {"openai/whisper"}
+    assert await ids(test_db, "author:meta OR whisper") == {"meta/llama-7b", "meta/codellama", "openai/whisper"}
+    assert await ids(test_db, '"language model"') == {"meta/llama-7b", "mistralai/mistral-7b"}
+    assert await ids(test_db, '"model language"') == set()
+
+@pytest.mark.asyncio
+async def test_filters_and_case_modes(test_db):
+    """Test filters and case sensitivity inside the compiled query"""
+    assert await ids(test_db, "", filters={"tags": "code"}) == {"meta/codellama"}
+    assert await ids(test_db, "llm", filters={"author": "META"}) == {"meta/llama-7b", "meta/codellama"}
+    assert await ids(test_db, "tag:LLM", case_sensitive=True) == set()
+    assert await ids(test_db, "lla", exact_match=True) == set()
+    assert await ids(test_db, "llama AND 7b", exact_match=True) == {"meta/llama-7b"}
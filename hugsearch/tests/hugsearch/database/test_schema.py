@@ -2,11 +2,15 @@
 # PURPOSE: Test database schema management
 ## INTERFACES: None (test module)
 """
+import json
 import pytest
 import pytest_asyncio
 import aiosqlite
 from pathlib import Path
 
+from hugsearch.database import schema
+from hugsearch.database.connection import close_pools
+from hugsearch.database.models import get_model, get_model_metadata, sync_models
 from hugsearch.database.schema import init_db, migrate_schema, SCHEMA_VERSION
 
 @pytest_asyncio.fixture(scope="function")
@@ -75,3 +79,62 @@ async def test_schema_migration(test_db):
         cursor = await db.execute("SELECT version FROM schema_version")
         row = await cursor.fetchone()
         assert row[0] == SCHEMA_VERSION
+
+@pytest.mark.asyncio
+async def test_name_index_migration(test_db):
+    """Test that upgrading a version 2 database indexes existing names and words"""
+    await init_db(test_db)
+    async with aiosqlite.connect(test_db) as db:
+        for trigger in ("model_names_insert", "model_names_delete", "model_names_update"):
+            await db.execute(f"DROP TRIGGER {trigger}")
+        await db.execute("DROP TABLE model_names")
+        await db.execute("DROP TABLE name_tokens")
+        await db.execute("""
+            INSERT INTO models (id, name, name_lower, author, author_lower, last_modified, metadata, last_checked)
+            VALUES ('m1', 'Falcon-40B', 'falcon-40b', 'tii', 'tii', '2024', '{}', '2024')
+        """)
+        await db.execute("UPDATE schema_version SET version = 2")
+        await db.commit()
+
+    await init_db(test_db)
+    await migrate_schema(test_db)
+
+    async with aiosqlite.connect(test_db) as db:
+        cursor = await db.execute("SELECT version FROM schema_version")
+        assert await cursor.fetchall() == [(SCHEMA_VERSION,)]
+        cursor = await db.execute("SELECT rowid FROM model_names WHERE name LIKE '%con-4%'")
+        assert len(await cursor.fetchall()) == 1
+        cursor = await db.execute("SELECT token, token_lower FROM name_tokens WHERE model_id = 'm1'")
+        assert await cursor.fetchall() == [("40B", "40b"), ("Falcon", "falcon")]
+
+@pytest.mark.asyncio
+async def test_metadata_compression_migration(test_db, monkeypatch):
+    """Test that upgrading a version 5 database compresses metadata in batches and fills sha"""
+    monkeypatch.setattr(schema, "METADATA_MIGRATION_BATCH_SIZE", 2)
+    await init_db(test_db)
+    models = [
+        {"id": f"m{i}", "name": f"Model {i}", "author": "a", "sha": f"sha{i}", "lastModified": "2024"}
+        for i in range(5)
+    ]
+    async with aiosqlite.connect(test_db) as db:
+        await db.executemany("""
+            INSERT INTO models (id, name, name_lower, author, author_lower, last_modified, metadata, last_checked)
+            VALUES (?, ?, ?, 'a', 'a', '2024', ?, '2024')
+        """, [(m["id"], m["name"], m["name"].lower(), json.dumps(m)) for m in models])
+        await db.execute("UPDATE schema_version SET version = 5")
+        await db.commit()
+
+    await migrate_schema(test_db)
+
+    async with aiosqlite.connect(test_db) as db:
+        cursor = await db.execute("SELECT DISTINCT typeof(metadata) FROM models")
+        assert await cursor.fetchall() == [("blob",)]
+        cursor = await db.execute("SELECT version FROM schema_version")
+        assert await cursor.fetchall() == [(SCHEMA_VERSION,)]
+    assert (await get_model_metadata(test_db, "m3"))["m3"] == models[3]
+    assert json.loads((await get_model(test_db, "m4"))["metadata"]) == models[4]
+
+    # The migrated sha lets sync recognise the models as unchanged
+    counts = await sync_models(test_db, [{**m, "lastModified": None} for m in models])
+    assert counts["unchanged"] == 5
+    await close_pools()
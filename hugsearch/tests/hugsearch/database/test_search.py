@@ -2,12 +2,16 @@
 # PURPOSE: Test search functionality
 ## INTERFACES: None (test module)
 """
+import asyncio
+import importlib
 import pytest
 import pytest_asyncio
 from pathlib import Path
 
-from hugsearch.database import search_models
-from hugsearch.database.models import upsert_model
+from hugsearch.database import search_models, encode_cursor, ModelSummary
+from hugsearch.database.connection import get_connection
+from hugsearch.database.models import upsert_model, delete_model, get_model_metadata
+from hugsearch.database.search import search_by_name
 from hugsearch.database.schema import init_db
 
 @pytest_asyncio.fixture
@@ -110,3 +114,109 @@ async def test_boolean_operators(test_db):
     results = await search_models(test_db, "llama AND 7B")
     assert len(results) == 1
     assert results[0]["name"] == "LLAMA 7B"
+
+@pytest.mark.asyncio
+async def test_substring_name_search_uses_trigram_index(test_db):
+    """Test substring search via the trigram index and its short-query fallback"""
+    assert [r["id"] for r in await search_by_name(test_db, "lLaMa-3")] == ["model3"]
+    assert {r["id"] for r in await search_by_name(test_db, "7b")} == {"model1", "model2"}
+
+    async with get_connection(test_db) as db:
+        cursor = await db.execute(
+            "EXPLAIN QUERY PLAN SELECT rowid FROM model_names WHERE model_names MATCH ?", ('name : "llama"',)
+        )
+        plan = " ".join(row[3] for row in await cursor.fetchall())
+    assert "VIRTUAL TABLE INDEX" in plan
+
+@pytest.mark.asyncio
+async def test_trigram_index_follows_updates(test_db):
+    """Test that renamed and deleted models leave the name index"""
+    await upsert_model(test_db, {"id": "model2", "name": "Mixtral-8x7B", "author": "mistralai"})
+    assert [r["id"] for r in await search_by_name(test_db, "mixtral")] == ["model2"]
+    assert await search_by_name(test_db, "mistral-7") == []
+
+    await delete_model(test_db, "model2")
+    assert await search_by_name(test_db, "mixtral") == []
+    async with get_connection(test_db) as db:
+        await db.execute("INSERT INTO model_names (model_names) VALUES ('integrity-check')")
+
+@pytest.mark.asyncio
+async def test_exact_word_search_uses_name_tokens(test_db):
+    """Test whole word matching across separators and both case modes"""
+    await upsert_model(test_db, {"id": "model4", "name": "TheBloke/llama_2-13B GGUF", "author": "TheBloke"})
+
+    assert {r["id"] for r in await search_by_name(test_db, "llama", exact_match=True)} == {"model1", "model4"}
+    assert [r["id"] for r in await search_by_name(test_db, "thebloke", exact_match=True)] == ["model4"]
+    assert [r["id"] for r in await search_by_name(test_db, "13b gguf", exact_match=True)] == ["model4"]
+    assert [r["id"] for r in await search_by_name(test_db, "LLAMA", case_sensitive=True, exact_match=True)] == ["model1"]
+    assert [r["id"] for r in await search_by_name(test_db, "llama", case_sensitive=True, exact_match=True)] == ["model4"]
+    assert await search_by_name(test_db, "-", exact_match=True) == []
+
+    async with get_connection(test_db) as db:
+        cursor = await db.execute(
+            "EXPLAIN QUERY PLAN SELECT model_id FROM name_tokens WHERE token_lower IN (SELECT value FROM json_each(?))",
+            ('["llama"]',)
+        )
+        plan = " ".join(row[3] for row in await cursor.fetchall())
+    assert "idx_name_tokens_lower" in plan
+
+@pytest.mark.asyncio
+async def test_name_tokens_follow_updates(test_db):
+    """Test that renames and deletes replace a model's tokens"""
+    await upsert_model(test_db, {"id": "model1", "name": "Llama-2 7B", "author": "meta"})
+    assert await search_by_name(test_db, "LLAMA 7B", exact_match=True) != []
+    assert [r["id"] for r in await search_by_name(test_db, "2", exact_match=True)] == ["model1"]
+
+    await delete_model(test_db, "model1")
+    assert await search_by_name(test_db, "2", exact_match=True) == []
+
+@pytest.mark.asyncio
+async def test_results_ranked_by_relevance(test_db):
+    """Test that name matches outrank description-only matches, popularity breaking ties"""
+    await upsert_model(test_db, {"id": "model5", "name": "Tiny", "author": "x", "description": "mistral distilled"})
+    results = await search_models(test_db, "mistral")
+    assert [r["id"] for r in results] == ["model2", "model5"]
+    assert results[0]["score"] > results[1]["score"]
+
+    results = await search_models(test_db, "llm")
+    assert [r["id"] for r in results] == ["model3", "model1", "model2"]
+
+@pytest.mark.asyncio
+async def test_keyset_pagination(test_db):
+    """Test that pages follow each other without gaps or repeats"""
+    everything = await search_models(test_db, "model")
+    first = await search_models(test_db, "model", limit=2)
+    second = await search_models(test_db, "model", limit=2, after=encode_cursor(first[-1]))
+    assert first + second == everything
+    assert await search_models(test_db, "model", limit=2, after=encode_cursor(second[-1])) == []
+
+@pytest.mark.asyncio
+async def test_results_are_compact_and_hydrate_by_id(test_db):
+    """Test that results leave metadata behind and load it on demand"""
+    results = await search_models(test_db, "codellama")
+    assert isinstance(results[0], ModelSummary)
+    assert (results[0].id, results[0]["author"], results[0].downloads) == ("model3", "meta", 1500)
+    assert not hasattr(results[0], "__dict__")
+
+    metadata = await get_model_metadata(test_db, [r.id for r in results] + ["missing"])
+    assert list(metadata) == ["model3"]
+    assert metadata["model3"]["description"] == "Code specialized 34B parameter model"
+    assert (await get_model_metadata(test_db, "model1"))["model1"]["likes"] == 500
+
+@pytest.mark.asyncio
+async def test_cancelled_search_stops_its_sql(test_db, monkeypatch):
+    """Test that cancelling a search interrupts the statement instead of leaving it running"""
+    endless = "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n) SELECT x FROM n WHERE x < 0"
+    # The package's search() function shadows its search module as an attribute
+    search_module = importlib.import_module("hugsearch.database.search")
+    monkeypatch.setattr(search_module, "compile_query", lambda *args: (endless, []))
+    task = asyncio.create_task(search_models(test_db, "llama"))
+    await asyncio.sleep(0.1)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    # The connection went back to the pool idle, not still stepping the statement
+    async with get_connection(test_db) as db:
+        cursor = await asyncio.wait_for(db.execute("SELECT COUNT(*) FROM models"), timeout=2)
+        assert (await cursor.fetchone())[0] == 3
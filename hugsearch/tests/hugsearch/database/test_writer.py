@@ -0,0 +1,61 @@
+"""
+# PURPOSE: Test the batching model writer queue
+## INTERFACES: None (test module)
+"""
+import asyncio
+import pytest
+import pytest_asyncio
+
+from hugsearch.database.models import get_model
+from hugsearch.database.schema import init_db
+from hugsearch.database.writer import ModelWriter, get_writer, close_writers
+
+@pytest_asyncio.fixture
+async def test_db(tmp_path):
+    """Create an empty database"""
+    db_path = tmp_path / "test_writer.db"
+    await init_db(db_path)
+    return db_path
+
+def make_model(producer: int, i: int) -> dict:
+    return {"id": f"p{producer}-{i}", "name": f"Model {i}", "author": f"author{producer}", "tags": ["x"]}
+
+@pytest.mark.asyncio
+async def test_concurrent_producers_share_batches(test_db):
+    """Test that several producers funnel into a few large transactions"""
+    writer = ModelWriter(test_db, batch_size=50)
+
+    async def produce(producer: int):
+        for i in range(100):
+            await writer.put(make_model(producer, i))
+            if i % 10 == 0:
+                await asyncio.sleep(0)
+
+    await asyncio.gather(*(produce(p) for p in range(4)))
+    await writer.close()
+
+    assert writer.written == 400
+    assert writer.batches < 40
+    assert await get_model(test_db, "p3-99") is not None
+
+@pytest.mark.asyncio
+async def test_flush_reports_write_errors(test_db):
+    """Test that a failed batch surfaces on flush and the writer keeps going"""
+    writer = ModelWriter(test_db)
+    await writer.put({"id": "broken"})
+    with pytest.raises(KeyError):
+        await writer.flush()
+
+    await writer.put(make_model(0, 0))
+    await writer.close()
+    assert await get_model(test_db, "p0-0") is not None
+
+@pytest.mark.asyncio
+async def test_get_writer_is_shared(test_db):
+    """Test that producers for the same database get the same writer"""
+    writer = get_writer(test_db)
+    assert get_writer(str(test_db)) is writer
+    await writer.put(make_model(1, 1))
+    await close_writers()
+    assert await get_model(test_db, "p1-1") is not None
+    assert get_writer(test_db) is not writer
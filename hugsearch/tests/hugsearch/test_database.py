@@ -17,7 +17,7 @@ import pytest_asyncio
 import aiosqlite
 from pathlib import Path
 import json
-from hugsearch.database import init_db, upsert_model, search_models
+from hugsearch.database import init_db, upsert_model, search_models, close_pools
 
 @pytest_asyncio.fixture
 async def test_db():
@@ -72,6 +72,8 @@ async def test_db():
         yield db_path
 
     finally:
+        # Closing the pooled connections checkpoints the WAL into the file
+        await close_pools()
         # Ensure cleanup happens even if test fails
         if db_path.exists():
             try:
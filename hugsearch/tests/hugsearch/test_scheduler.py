@@ -8,21 +8,151 @@
  - pytest
  - hugsearch.scheduler
 """
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
 import pytest
 
-# Import the module to test
-from hugsearch.scheduler import *
+from hugsearch.database import get_connection, get_model, get_model_tags, setup_database, close_writers
+from hugsearch.scheduler import RateLimiter, UpdateScheduler, model_to_record
+
+
+def hf_model(model_id: str, **fields) -> SimpleNamespace:
+    """Stand-in for huggingface_hub ModelInfo with the attributes the scheduler reads"""
+    author = model_id.split('/')[0]
+    return SimpleNamespace(id=model_id, author=author, tags=["text-generation"], downloads=10,
+                           last_modified=datetime(2024, 1, 1, tzinfo=timezone.utc), **fields)
+
+
+class FakeHfApi:
+    """Serves a fixed model list per author, recording how many calls overlap"""
+    def __init__(self, models_by_author, delay=0.0):
+        self.models_by_author = models_by_author
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def list_models(self, author=None, search=None, expand=None):
+        if author not in self.models_by_author:
+            raise ValueError(f"unknown author {author}")
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return iter(self.models_by_author[author])
+
+    def model_info(self, model_id):
+        return hf_model(model_id)
+
+
+def test_model_to_record():
+    """Test conversion of a ModelInfo into a database record"""
+    record = model_to_record(hf_model("meta/llama-7b", sha="abc"))
+    assert record["id"] == "meta/llama-7b"
+    assert record["name"] == "llama-7b"
+    assert record["author"] == "meta"
+    assert record["sha"] == "abc"
+    assert record["lastModified"] == "2024-01-01T00:00:00+00:00"
+    assert model_to_record(record) is record
+
+
+@pytest.mark.asyncio
+async def test_refresh_models_ingests_users(tmp_path):
+    """Test that refreshing users writes every listed model in batches"""
+    db_path = tmp_path / "scheduler.db"
+    await setup_database(db_path)
+    sched = UpdateScheduler(db_path, batch_size=7)
+    sched.hf_api = FakeHfApi({
+        "meta": [hf_model(f"meta/model-{i}") for i in range(20)],
+        "google": [hf_model("google/gemma")],
+    })
+
+    report = await sched.refresh_models(["meta", "google"], "user")
+
+    assert report == {"new": 21, "changed": 0, "unchanged": 0, "failed": []}
+    assert (await get_model(db_path, "meta/model-19"))["author"] == "meta"
+    assert await get_model_tags(db_path, "google/gemma") == ["text-generation"]
+    await close_writers()
+
+
+@pytest.mark.asyncio
+async def test_followed_creators_fetched_concurrently(tmp_path):
+    """Test that the daily job fetches creators in parallel and keeps going past failures"""
+    db_path = tmp_path / "scheduler.db"
+    await setup_database(db_path)
+    creators = [f"creator{i}" for i in range(12)]
+    async with get_connection(db_path) as db:
+        await db.executemany("INSERT INTO followed_creators VALUES (?, '1970-01-01')",
+                             [(c,) for c in creators + ["missing"]])
+        await db.commit()
+    sched = UpdateScheduler(db_path, fetch_concurrency=4, requests_per_second=0)
+    sched.hf_api = FakeHfApi({c: [hf_model(f"{c}/model")] for c in creators}, delay=0.05)
+
+    started = time.monotonic()
+    await sched.check_for_updates()
+
+    assert time.monotonic() - started < 12 * 0.05
+    assert sched.hf_api.peak == 4
+    assert await get_model(db_path, "creator11/model") is not None
+    async with get_connection(db_path) as db:
+        cursor = await db.execute("SELECT author FROM followed_creators WHERE last_checked = '1970-01-01'")
+        assert await cursor.fetchall() == [("missing",)]
+    await sched.stop()
+    await close_writers()
+
+
+@pytest.mark.asyncio
+async def test_refresh_reports_failed_items(tmp_path):
+    """Test that refresh returns the items it could not fetch"""
+    db_path = tmp_path / "scheduler.db"
+    await setup_database(db_path)
+    sched = UpdateScheduler(db_path)
+    sched.hf_api = FakeHfApi({"meta": [hf_model("meta/llama")]})
+
+    report = await sched.refresh_models(["meta", "nobody"], "user")
+    assert report["failed"] == ["nobody"]
+    assert await get_model(db_path, "meta/llama") is not None
+    await close_writers()
+
+
+def test_rate_limiter_spaces_requests():
+    """Test that requests from several threads start at most `rate` per second"""
+    limiter = RateLimiter(50)
+    starts = []
+
+    def request():
+        limiter.wait()
+        starts.append(time.monotonic())
+
+    threads = [threading.Thread(target=request) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    starts.sort()
+    assert starts[-1] - starts[0] >= 5 * 0.02 * 0.9
+
 
-def test_scheduler_exists():
-    """
-    ZEROTH LAW VIOLATION: This is a placeholder test.
+@pytest.mark.asyncio
+async def test_refresh_skips_unchanged_models(tmp_path):
+    """Test that a second sync only rewrites models modified upstream"""
+    db_path = tmp_path / "scheduler.db"
+    await setup_database(db_path)
+    sched = UpdateScheduler(db_path)
+    models = [hf_model(f"meta/model-{i}") for i in range(5)]
+    sched.hf_api = FakeHfApi({"meta": models})
+    await sched.refresh_models(["meta"], "user")
 
-    This file was auto-generated by the Zeroth Law test coverage tool.
-    Replace this with actual tests for the scheduler module.
+    models[0].last_modified = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    models.append(hf_model("meta/model-new"))
+    report = await sched.refresh_models(["meta"], "user")
 
-    According to Zeroth Law section 6.1:
-    - Test Coverage: >90% business logic coverage
-    - Each feature should have a corresponding pytest for testing
-    """
-    # TODO: Replace with actual tests
-    assert True, "Replace this with actual tests for the scheduler module"
+    assert report == {"new": 1, "changed": 1, "unchanged": 4, "failed": []}
+    assert (await get_model(db_path, "meta/model-0"))["last_modified"].startswith("2024-06-01")
+    await close_writers()